@@ -1,73 +1,160 @@
 import os
+import json
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor, as_completed
 import pandas as pd
 import numpy as np
 from datetime import datetime, timedelta
 import matplotlib.pyplot as plt
-from angle_cal import calculate_all_angles  #angle_cal_pxy是缺少C7 的坐标系
+from angle_cal import calculate_all_angles, REQUIRED_MARKERS  #angle_cal_pxy是缺少C7 的坐标系
 #from angle_cal_double import calculate_all_angles  #angle_cal_pxy是缺少C7 的坐标系
 from read_opticla import read_optical_data
 #from read_snesor_data import read_sensor_data
 from read_sensor_6ch import read_sensor_data
 #from read_sensor_16ch import read_sensor_data
 from get_intersection_data import get_intersection_data #6sensor用get_intersection_data_pxy
+from session_cache import load_or_build_cache
+from pairing import plan_pairs
+from recording_index import load_or_update_index
 
 
-def process_single_data_group(optical_filepath, sensor_filepath, output_angle_dir,output_dft_dir):
+def write_csv_atomic(df, path):
+    """先写临时文件再替换，多进程同时写同一输出文件时不会得到半截文件。"""
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    df.to_csv(tmp_path, index=False)
+    os.replace(tmp_path, path)
+
+
+def process_single_data_group(optical_filepath, sensor_filepath, output_angle_dir,output_dft_dir, align_mode='nearest',
+                              sync=False):
     # 读取光捕数据
-    df_o = read_optical_data(optical_filepath)
+    df_o = read_optical_data(optical_filepath, columns=REQUIRED_MARKERS)  # 只读取计算角度所需的标记点
     # 计算光捕角度
 
     df_o = calculate_all_angles(df_o) # 肩关节角度
-    df_angle = df_o[['Frame','Time','angle1','angle2','angle3','angle4','angle5','angle6','angle7','angle8','angle9','angle10','angle11','angle12','angle13','angle14','angle15','angle16','angle17','angle18']]
+    angle_cols = [col for col in df_o.columns if col.startswith('angle')]
+    df_angle = df_o[['Frame','Time'] + angle_cols]
+    #df_angle = df_o[['Frame','Time','angle1','angle2','angle3','angle4','angle5','angle6','angle7','angle8','angle9','angle10','angle11','angle12','angle13','angle14','angle15','angle16','angle17','angle18']]
     #df_angle = df_o[['Frame','Time','angle1','angle2','angle3','angle4','angle5','angle6','angle7','angle8','angle9']]
     
     # 输出角度数据
     angle_output_path = os.path.join(output_angle_dir, os.path.basename(optical_filepath).replace('.csv', 'angle.csv'))
-    df_angle.to_csv(angle_output_path, index=False)
+    write_csv_atomic(df_angle, angle_output_path)
     
     # 读取传感器数据
     df_s, df_s_resampled = read_sensor_data(sensor_filepath)
     
     # 数据对齐（交集）
-    datafinal = get_intersection_data(df_angle, df_s_resampled)
+    datafinal = get_intersection_data(df_angle, df_s_resampled, mode=align_mode, sync=sync)
     
     # 合并数据写出
     final_output_path = os.path.join(output_dft_dir, os.path.basename(sensor_filepath).replace('.txt', 'dft.csv'))
-    datafinal.to_csv(final_output_path, index=False)
+    write_csv_atomic(datafinal, final_output_path)
     
     return datafinal
 
 
-def batch_process(optical_dir, sensor_dir,  output_angle_dir, output_dft_dir):
+def process_sensor_group(sensor_filepath, optical_filepaths, output_angle_dir, output_dft_dir, align_mode='nearest',
+                         sync=False):
+    """
+    处理同一个传感器文件与若干光捕文件的组合（按给定顺序依次处理）。
+
+    同一传感器文件的输出路径相同，放在同一任务中顺序执行，保证并行结果与串行一致。
+    单个组合失败不会中断其余组合。
+
+    Returns:
+        list: 每个组合的结果 dict（optical, sensor, ok, rows, error，'interp' 对齐时还有 alignment 误差报告，
+        启用时钟同步时还有 clock_sync 估计结果）。
+    """
+    results = []
+    for optical_filepath in optical_filepaths:
+        result = {'optical': os.path.basename(optical_filepath), 'sensor': os.path.basename(sensor_filepath)}
+        try:
+            datafinal = process_single_data_group(optical_filepath, sensor_filepath, output_angle_dir, output_dft_dir,
+                                                  align_mode, sync)
+            result.update(ok=True, rows=len(datafinal), error=None, alignment=datafinal.attrs.get('alignment'),
+                          clock_sync=datafinal.attrs.get('clock_sync'))
+            print(f'Processed {result["optical"]} and {result["sensor"]}')
+        except Exception:
+            result.update(ok=False, rows=0, error=traceback.format_exc())
+            print(f'⚠️ 处理失败: {result["optical"]} and {result["sensor"]}')
+        results.append(result)
+    return results
+
+
+def _report_progress(done, total, start_time):
+    elapsed = time.perf_counter() - start_time
+    eta = elapsed / done * (total - done) if done else float('nan')
+    print(f'⏳ 进度 {done}/{total}，已用 {elapsed:.1f}s，预计剩余 {eta:.1f}s')
+
+
+def batch_process(optical_dir, sensor_dir,  output_angle_dir, output_dft_dir, build_cache=False, workers=1,
+                  manifest_path=None, min_overlap=0.0, index=None, align_mode='nearest', sync=False):
+    """
+    批量处理光捕与传感器文件组合。
+
+    只处理时间范围有交集的组合（只读取文件头 / 尾判断，见 pairing.plan_pairs），
+    或配对清单 manifest_path 中列出的组合；跳过的文件和原因写入 <output_dft_dir>/pairing_report.json。
+
+    Args:
+        workers (int): 并行进程数，1 为串行；并行结果与串行完全一致。
+        manifest_path (str): 可选，配对清单 CSV（optical、sensor 两列）。
+        min_overlap (float): 最小交集时长（秒）。
+        index (RecordingIndex): 可选，录制文件索引，配对时直接查询时间范围。
+        align_mode (str): 'nearest' 或 'interp'（插值到统一时间网格），见 get_intersection_data。
+        sync (bool): 合并前用互相关估计并修正传感器时钟偏移。
+
+    Returns:
+        list: 每个组合的处理结果（失败的组合带有 error 信息）。
+    """
     # 确保输出目录存在
     os.makedirs( output_angle_dir, exist_ok=True)
     os.makedirs( output_dft_dir, exist_ok=True)
 
-
-    # optical_files = [f for f in os.listdir(optical_dir) if f.endswith('.csv')]
-    # sensor_files = [f for f in os.listdir(sensor_dir) if f.endswith('.txt')]
-
     if not os.path.exists(optical_dir):
         print("指定的目录不存在")
         # return
-    optical_files = os.listdir(optical_dir)
-    sensor_files = os.listdir(sensor_dir)
 
-
-    for optical_file in optical_files:
-        for sensor_file in sensor_files:
-            optical_filepath = os.path.join(optical_dir, optical_file)
-            sensor_filepath = os.path.join(sensor_dir, sensor_file)
-            datafinal = process_single_data_group(optical_filepath, sensor_filepath, output_angle_dir,output_dft_dir)
-            print(f'Processed {optical_file} and {sensor_file}')
-
-    # for optical_file in optical_files:
-    #     sensor_file = optical_file.replace('.csv', '.txt')
-    #     if sensor_file in sensor_files:
-    #         optical_filepath = os.path.join(optical_dir, optical_file)
-    #         sensor_filepath = os.path.join(sensor_dir, sensor_file)
-    #         datafinal = process_single_data_group(optical_filepath, sensor_filepath, output_angle_dir,output_dft_dir)
-    #         print(f'Processed {optical_file} and {sensor_file}')
+    pairs, skipped = plan_pairs(optical_dir, sensor_dir, manifest_path, min_overlap, index)
+    print(f'🎯 待处理组合 {len(pairs)} 个，跳过 {len(skipped)} 项')
+    with open(os.path.join(output_dft_dir, 'pairing_report.json'), 'w', encoding='utf-8') as f:
+        json.dump({'pairs': [[os.path.basename(o), os.path.basename(s)] for o, s in pairs], 'skipped': skipped},
+                  f, ensure_ascii=False, indent=1)
+
+    # 同一传感器文件的组合（输出到同一文件）放在同一任务中按顺序处理
+    groups = {}
+    for optical_filepath, sensor_filepath in pairs:
+        groups.setdefault(sensor_filepath, []).append(optical_filepath)
+    tasks = [(sensor_filepath, optical_filepaths, output_angle_dir, output_dft_dir, align_mode, sync)
+             for sensor_filepath, optical_filepaths in groups.items()]
+    total = len(pairs)
+
+    results = []
+    start_time = time.perf_counter()
+    if workers <= 1:
+        for task in tasks:
+            results.extend(process_sensor_group(*task))
+            _report_progress(len(results), total, start_time)
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = {executor.submit(process_sensor_group, *task): i for i, task in enumerate(tasks)}
+            group_results = [None] * len(tasks)
+            for future in as_completed(futures):
+                group_results[futures[future]] = future.result()
+                _report_progress(sum(len(r) for r in group_results if r), total, start_time)
+        results = [r for group in group_results for r in group]
+
+    failures = [r for r in results if not r['ok']]
+    print(f'✅ 完成 {len(results) - len(failures)}/{len(results)} 个组合')
+    for r in failures:
+        print(f"❌ {r['optical']} + {r['sensor']} 失败:\n{r['error']}")
+
+    # 可选：为训练数据生成二进制缓存（训练脚本以内存映射方式读取）
+    if build_cache:
+        load_or_build_cache(output_dft_dir)
+
+    return results
 
 if __name__ == "__main__":
     # 设定文件夹路径
@@ -90,12 +177,19 @@ if __name__ == "__main__":
     SENSOR_DATA_DIR = './20250310_data/sensor/003'  # 传感器数据
     OUTPUT_ANGLE_DIR = './20250310_data/angle'    # 角度输出文件夹
     OUTPUT_DFT_DIR = './20250310_data/train_data/6sensor+10angle'    # 训练数据输出
+    BUILD_CACHE = False    # 是否同时生成训练数据缓存（session_cache）
+    WORKERS = os.cpu_count() or 1    # 并行进程数，1 为串行
+    PAIR_MANIFEST = None    # 可选：配对清单 CSV（optical、sensor 两列），None 时按时间范围自动配对
+    ALIGN_MODE = 'nearest'    # 对齐方式：'nearest'（最近帧）或 'interp'（插值到统一时间网格）
+    CLOCK_SYNC = False    # 是否在合并前估计并修正传感器与光捕的时钟偏移
+    INDEX_ROOT = None    # 可选：录制文件索引的数据根目录（如 './20250310_data'），配对时查询索引
 
     #OPTICAL_DATA_DIR = './20250116/opt/User2B'      # 光捕数据
     #SENSOR_DATA_DIR = './20250116/sensor/User2B'  # 传感器数据
     #OUTPUT_ANGLE_DIR = './20250116/angle'    # 角度输出文件夹
     #OUTPUT_DFT_DIR = './20250116/train_data'    # 训练数据输出
 
-
-
-batch_process (OPTICAL_DATA_DIR, SENSOR_DATA_DIR, OUTPUT_ANGLE_DIR, OUTPUT_DFT_DIR)
\ No newline at end of file
+    index = load_or_update_index(INDEX_ROOT) if INDEX_ROOT else None
+    batch_process(OPTICAL_DATA_DIR, SENSOR_DATA_DIR, OUTPUT_ANGLE_DIR, OUTPUT_DFT_DIR,
+                  build_cache=BUILD_CACHE, workers=WORKERS, manifest_path=PAIR_MANIFEST, index=index,
+                  align_mode=ALIGN_MODE, sync=CLOCK_SYNC)
@@ -1,65 +1,27 @@
-import os
-import pandas as pd
-import numpy as np
-from scipy.signal import find_peaks
+from segmentation import split_directory, export_cycles
 
-# ✅ 设置输入路径
-input_dir = './20250310_data/train_data/all_but_rest/10ts-angle7'
-#input_dir = './motion_0407/MJQ/2es-angle9'
-#input_dir = './motion_0407/QNC/2ws-angle8'
+if __name__ == "__main__":
+    # ✅ 设置输入路径
+    input_dir = './20250310_data/train_data/all_but_rest/10ts-angle7'
+    #input_dir = './motion_0407/MJQ/2es-angle9'
+    #input_dir = './motion_0407/QNC/2ws-angle8'
 
+    # ✅ 周期索引（所有文件的周期区间写入一个文件，不在输入目录中生成周期文件）
+    index_path = './20250310_data/train_data/all_but_rest/10ts-angle7-cycles.csv'
 
-# ✅ 遍历该文件夹下的所有 CSV 文件
-for filename in os.listdir(input_dir):
-    if filename.endswith(".csv"):
-        file_path = os.path.join(input_dir, filename)
-        print(f"📂 正在处理文件: {filename}")
+    # ✅ 输入目录中若还留有旧版脚本生成的周期文件（<原名>_NN.csv），在此显式排除
+    exclude = ()
+    #exclude = ('*_[0-9][0-9].csv',)
 
-        # ✅ 读取 CSV
-        df = pd.read_csv(file_path)
+    # ✅ 使用 angle4 的谷值（极小点）切分，控制周期最短距离
+    split_directory(input_dir, index_path, signal='angle4', exclude=exclude, boundary='valley', distance=500)
 
-        # ✅ 检查是否有 angle2 列，动作6用
-        if 'angle7' not in df.columns:
-            print(f"⚠️ 文件 {filename} 中未找到 'angle7' 列，跳过")
-            continue
+    ## ✅ 使用 angle1 满足高度条件的波峰切分，动作5使用
+    #split_directory(input_dir, index_path, signal='angle1', exclude=exclude, boundary='peak', height=(10, 25), distance=100)  #5td
+    #split_directory(input_dir, index_path, signal='angle1', exclude=exclude, boundary='peak', height=(5, 15), distance=100)   #5ta
 
-        # ✅ 使用 angle2 取反，寻找谷值（极小点）
-        angle_signal = df['angle4'].values
-        valleys, _ = find_peaks(-angle_signal, distance=500)  # 控制周期最短距离
+    # ✅ 03_merge_motion.concatenate_cycles 按索引直接拼接为一个带 clip_id 的训练文件，不再逐周期写文件
+    # ✅ 可选：按索引导出每个周期为单独的 CSV（<原名>_NN.cycle.csv）
+    #export_cycles(index_path, './20250310_data/train_data/all_but_rest/10ts-angle7-cycles')
 
-        if len(valleys) < 2:
-            print(f"⚠️ 文件 {filename} 周期点不足，跳过")
-            continue
-
-        # ✅ 每两个谷值切出一个周期
-        for i in range(len(valleys) - 1):
-            start = valleys[i]
-            end = valleys[i + 1]
-            cycle_df = df.iloc[start:end].reset_index(drop=True)
-       
-       
-       ## ✅ 提取角度信号并寻找满足高度条件的波峰,动作5使用
-       #angle_signal = df['angle1'].values
-       ##peaks, properties = find_peaks(angle_signal, height=(10, 25), distance=100) #5td
-       #peaks, properties = find_peaks(angle_signal, height=(5, 15), distance=100)  #5ta
-
-        #if len(peaks) < 2:
-        #    print(f"⚠️ 文件 {filename} 波峰点不足，跳过")
-        #    continue
-
-        ## ✅ 每两个波峰切出一个周期
-        #for i in range(len(peaks) - 1):
-        #    start = peaks[i]
-        #    end = peaks[i + 1]
-        #    cycle_df = df.iloc[start:end].reset_index(drop=True)
-
-            # ✅ 构建新文件名（原名_01.csv 等）
-            base_name = os.path.splitext(filename)[0]
-            new_name = f"{base_name}_{i+1:02d}.csv"
-            new_path = os.path.join(input_dir, new_name)
-
-            # ✅ 保存新周期段
-            cycle_df.to_csv(new_path, index=False)
-            print(f"✅ 周期段 {i+1} 已保存: {new_name}")
-
-print("🎉 所有文件已完成周期切分！")
+    print("🎉 所有文件已完成周期切分！")
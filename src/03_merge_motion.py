@@ -1,50 +1,206 @@
 import os
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 import pandas as pd
+from segmentation import iter_cycles
 
-def concatenate_csv_files(input_directory, output_file):
-    # 获取目录下所有的CSV文件
-    csv_files = [f for f in os.listdir(input_directory) if f.endswith('.csv')]
-    
-    # 初始化一个空的DataFrame
-    concatenated_df = pd.DataFrame()
-    
-    # 逐个读取CSV文件并拼接
-    for csv_file in csv_files:
-        file_path = os.path.join(input_directory, csv_file)
-        df = pd.read_csv(file_path)
-        concatenated_df = pd.concat([concatenated_df, df], ignore_index=True)
-    
-    # 输出拼接好的DataFrame到新的CSV文件
-    concatenated_df.to_csv(output_file, index=False)
-    print(f"Concatenated CSV saved to {output_file}")
 
-# 设置输入目录和输出文件名
-# input_directory = 'dataFT\laytex\merge'  # 替换为实际CSV文件所在的目录
+def _open_writer(output_file, columns):
+    """
+    按扩展名创建追加写入器：.parquet 使用 pyarrow（可选依赖），其余按 CSV 写入。
+    返回 (write(df), close()) 两个函数。
+    """
+    tmp_file = f"{output_file}.tmp"
+    if output_file.endswith('.parquet'):
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise ImportError("❌ 输出 Parquet 需要安装 pyarrow（pip install pyarrow），或改用 .csv 输出")
+        state = {'writer': None, 'schema': None}
 
+        def write(df):
+            # 列类型由第一个片段确定后固定：数值列统一为 float64（整数列在后续片段中可能因 NaN 变成浮点），
+            # clip_id 为 int64；其后每个片段都转换到该 schema，避免写到一半出现 schema 不一致
+            if state['writer'] is None:
+                state['schema'] = _parquet_schema(df, pa)
+                state['writer'] = pq.ParquetWriter(tmp_file, state['schema'])
+            table = pa.Table.from_pandas(df, preserve_index=False).cast(state['schema'])
+            state['writer'].write_table(table)
 
-#input_directory_train= './20250310_data/train_data/1q-/clear/test/'  # 替换为实际CSV文件所在的目录
-#output_file_train = './20250310_data/train_data/1q-/clear/test.csv'  # 输出文件名
-#input_directory_train= './20250406_data/MJQ/train_data/test/'  # 替换为实际CSV文件所在的目录
-#output_file_train = './20250406_data/MJQ/train_data/test/test.csv'  # 输出文件名
-input_directory_train= './motion_0407/2/ZS/train/'  # 替换为实际CSV文件所在的目录
-output_file_train = './motion_0407/2/ZS/train/train.csv'  # 输出文件名
+        def close():
+            if state['writer'] is None:
+                pq.write_table(pa.Table.from_pandas(pd.DataFrame(columns=columns), preserve_index=False), tmp_file)
+            else:
+                state['writer'].close()
+            os.replace(tmp_file, output_file)
 
+        return write, close
 
-concatenate_csv_files(input_directory_train, output_file_train)
+    pd.DataFrame(columns=columns).to_csv(tmp_file, index=False)
 
+    def write(df):
+        df.to_csv(tmp_file, mode='a', header=False, index=False)
 
+    def close():
+        os.replace(tmp_file, output_file)
 
+    return write, close
 
-# input_directory_test = 'dataFT/exp1/trainset/C3test/'  # 替换为实际CSV文件所在的目录
-# output_file_test = 'dataFT/exp1/C3test.csv'  # 输出文件名
 
-# input_directory_train= 'dataFT/exp1/trainset/C3train/'  # 替换为实际CSV文件所在的目录
-# output_file_train = 'dataFT/exp1/C3train.csv'  # 输出文件名
+def _parquet_schema(df, pa):
+    """
+    输出 Parquet 的固定 schema：clip_id 为 int64，数值 / 布尔列以及全为空的列为 float64，
+    时间列为 timestamp[ns]，其余为 string。
+    """
+    fields = []
+    for name, column in df.items():
+        if name == 'clip_id':
+            dtype = pa.int64()
+        elif pd.api.types.is_datetime64_any_dtype(column):
+            dtype = pa.timestamp('ns')
+        elif pd.api.types.is_numeric_dtype(column) or pd.api.types.is_bool_dtype(column) or column.isna().all():
+            dtype = pa.float64()
+        else:
+            dtype = pa.string()
+        fields.append(pa.field(name, dtype))
+    return pa.schema(fields)
 
-# 调用函数拼接CSV文件
-# concatenate_csv_files(input_directory_test, output_file_test)
 
+def _conform(df, columns, name):
+    """按输出列对齐：缺少的列以空值填充，多出的列丢弃（都给出提示）。"""
+    missing = [c for c in columns if c not in df.columns]
+    if missing:
+        print(f"⚠️ {name} 缺少列 {missing}，以空值填充")
+    extra = [c for c in df.columns if c not in columns]
+    if extra:
+        print(f"⚠️ {name} 多出的列 {extra} 不会写入")
+    return df.reindex(columns=columns)
 
-# import torch
-# print(torch.cuda.is_available())  # 如果返回True，则CUDA可用
-# print(torch.version.cuda)  # 打印PyTorch使用的CUDA版本
\ No newline at end of file
+
+def concatenate_csv_files(input_directory, output_file, add_clip_columns=False, workers=4):
+    """
+    流式拼接目录下的所有 CSV：多线程并行读取，按文件名顺序逐个追加写入输出文件，
+    内存中最多只保留 2 * workers 个文件，总耗时与文件数成线性关系。
+
+    Args:
+        input_directory (str): 存放 CSV 片段的目录（输出文件若在该目录中会被跳过）。
+        output_file (str): 输出路径，.csv 或 .parquet（需要 pyarrow）。
+        add_clip_columns (bool): 是否添加 clip_id（按文件顺序从 0 编号）和 source_file 列，
+            供下游按片段划分窗口（session_cache 会按 clip_id 切分片段）。
+        workers (int): 读取线程数。
+
+    Returns:
+        int: 写入的总行数。
+    """
+    # 获取目录下所有的CSV文件（排序保证输出顺序确定）
+    output_path = os.path.abspath(output_file)
+    csv_files = sorted(f for f in os.listdir(input_directory)
+                       if f.endswith('.csv') and os.path.abspath(os.path.join(input_directory, f)) != output_path)
+    if not csv_files:
+        print(f"⚠️ {input_directory} 中没有 CSV 文件")
+        return 0
+
+    columns = list(pd.read_csv(os.path.join(input_directory, csv_files[0]), nrows=0).columns)
+    if add_clip_columns:
+        columns = ['clip_id', 'source_file'] + [c for c in columns if c not in ('clip_id', 'source_file')]
+    write, close = _open_writer(output_file, columns)
+
+    def load(clip_id, csv_file):
+        df = pd.read_csv(os.path.join(input_directory, csv_file))
+        if add_clip_columns:
+            df['clip_id'] = clip_id
+            df['source_file'] = csv_file
+        return _conform(df, columns, csv_file)
+
+    # 逐个读取CSV文件并追加写出（预读窗口有限，内存占用与文件总数无关）
+    n_rows = 0
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        pending = deque()
+        files = iter(enumerate(csv_files))
+        for _ in range(2 * workers):
+            item = next(files, None)
+            if item is not None:
+                pending.append(executor.submit(load, *item))
+        while pending:
+            df = pending.popleft().result()
+            item = next(files, None)
+            if item is not None:
+                pending.append(executor.submit(load, *item))
+            write(df)
+            n_rows += len(df)
+    close()
+
+    print(f"Concatenated {len(csv_files)} CSV files ({n_rows} rows) saved to {output_file}")
+    return n_rows
+
+
+def concatenate_cycles(index_path, output_file, data_dir=None):
+    """
+    按 02_split_motion 生成的周期索引直接拼接：每个源文件只读取一次，按索引中的 [start, end) 切出周期，
+    依次写入输出文件，并添加 clip_id（按索引顺序从 0 编号）和 source_file（'<源文件名>#<周期编号>'）列，
+    session_cache 据此切分片段。不生成逐周期的中间文件。
+
+    Args:
+        index_path (str): 周期索引文件（source_file, cycle, start, end）。
+        output_file (str): 输出路径，.csv 或 .parquet（需要 pyarrow）。
+        data_dir (str): 可选，源文件所在目录（见 segmentation.iter_cycles）。
+
+    Returns:
+        int: 写入的总行数。
+    """
+    write, close, columns = None, None, None
+    n_rows = n_cycles = 0
+    for clip_id, (source_file, cycle, cycle_df) in enumerate(iter_cycles(index_path, data_dir)):
+        name = f"{os.path.basename(source_file)}#{cycle}"
+        if columns is None:
+            columns = ['clip_id', 'source_file'] + [c for c in cycle_df.columns if c not in ('clip_id', 'source_file')]
+            write, close = _open_writer(output_file, columns)
+        cycle_df = cycle_df.assign(clip_id=clip_id, source_file=name)
+        write(_conform(cycle_df, columns, name))
+        n_rows += len(cycle_df)
+        n_cycles += 1
+    if columns is None:
+        print(f"⚠️ {index_path} 中没有周期")
+        return 0
+    close()
+
+    print(f"Concatenated {n_cycles} cycles ({n_rows} rows) from {index_path} saved to {output_file}")
+    return n_rows
+
+
+if __name__ == "__main__":
+    # 设置输入目录和输出文件名
+    # input_directory = 'dataFT\laytex\merge'  # 替换为实际CSV文件所在的目录
+
+
+    #input_directory_train= './20250310_data/train_data/1q-/clear/test/'  # 替换为实际CSV文件所在的目录
+    #output_file_train = './20250310_data/train_data/1q-/clear/test.csv'  # 输出文件名
+    #input_directory_train= './20250406_data/MJQ/train_data/test/'  # 替换为实际CSV文件所在的目录
+    #output_file_train = './20250406_data/MJQ/train_data/test/test.csv'  # 输出文件名
+    input_directory_train= './motion_0407/2/ZS/train/'  # 替换为实际CSV文件所在的目录
+    output_file_train = './motion_0407/2/ZS/train/train.csv'  # 输出文件名
+
+
+    concatenate_csv_files(input_directory_train, output_file_train, add_clip_columns=True)
+
+    # 02_split_motion 生成的周期索引：按索引直接切分源文件并拼接（clip_id 为周期编号），不需要逐周期的 CSV
+    #concatenate_cycles('./20250310_data/train_data/all_but_rest/10ts-angle7-cycles.csv',
+    #                   './20250310_data/train_data/all_but_rest/10ts-angle7-train.csv')
+
+
+
+
+    # input_directory_test = 'dataFT/exp1/trainset/C3test/'  # 替换为实际CSV文件所在的目录
+    # output_file_test = 'dataFT/exp1/C3test.csv'  # 输出文件名
+
+    # input_directory_train= 'dataFT/exp1/trainset/C3train/'  # 替换为实际CSV文件所在的目录
+    # output_file_train = 'dataFT/exp1/C3train.csv'  # 输出文件名
+
+    # 调用函数拼接CSV文件
+    # concatenate_csv_files(input_directory_test, output_file_test)
+
+
+    # import torch
+    # print(torch.cuda.is_available())  # 如果返回True，则CUDA可用
+    # print(torch.version.cuda)  # 打印PyTorch使用的CUDA版本
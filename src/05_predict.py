@@ -1,48 +1,90 @@
-import serial
+import os
+import time
 import torch
 import pickle
 import numpy as np
 import pandas as pd
 import matplotlib.pyplot as plt
-from collections import deque
-from model import LSTM
-
-# ✅ 1. 设置串口连接参数
+from model import MultiHeadLSTM
+from precision import prepare_inference_model
+from smoothing import make_filter
+from streaming import StreamingPredictor
+from realtime_pipeline import RealtimePipeline
+from input_sources import open_source
+
+# ✅ 1. 设置输入源：'serial' 真实设备；'replay' 回放传感器记录；'pty' 伪终端模拟设备
+INPUT_SOURCE = 'serial'
 SERIAL_PORT = "COM14"
 BAUD_RATE = 115200
-ser = serial.Serial(SERIAL_PORT, BAUD_RATE, timeout=1)
-print(f"✅ 已连接到 {SERIAL_PORT}")
+REPLAY_FILE = './20250310_data/sensor/001/1e.txt'  # replay / pty 模式使用
+REPLAY_RATE = 1.0                                   # 回放倍速
+ser, emulated_device = open_source(INPUT_SOURCE, port=SERIAL_PORT, baudrate=BAUD_RATE,
+                                   filepath=REPLAY_FILE, rate=REPLAY_RATE, n_channels=6)
+print(f"✅ 已连接到 {SERIAL_PORT if INPUT_SOURCE == 'serial' else INPUT_SOURCE}")
 
-# ✅ 2. 设置 LSTM 模型参数
+# ✅ 2. 设置 LSTM 模型参数（与 04_multihead_lstm_train.py 一致）
 device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
 input_size = 6
-hidden_size = 128
-num_layers = 2
+hidden_size = 256
+num_layers = 3
 output_size = 9
-dropout = 0.3
-
-# ✅ 3. 加载 LSTM 预测模型
-model = LSTM(input_size, hidden_size, num_layers, output_size, dropout).to(device)
-model.load_state_dict(torch.load("./result/model.ckpt", map_location=device))
+dropout = 0.1
+
+# 推理精度：'fp32' / 'int8'（LSTM / Linear 动态量化）/ 'bf16'；后两者只在 CPU 上运行
+PRECISION = 'fp32'
+
+# ✅ 3. 加载 Multi-Head LSTM 预测模型
+# fp32 优先使用训练脚本保存的合并了 scaler 的权重：原始传感器值输入、直接输出角度，不需要 sklearn / pickle。
+# int8 / bf16 使用未合并的权重 + scaler：原始传感器值范围大，合并后在低精度下误差成倍增加。
+# 合并权重必须比 model.ckpt 新（04 先保存 model.ckpt 再保存合并版本），否则视为过期（例如重新训练后只复制了 model.ckpt）
+CHECKPOINT = "./result/model.ckpt"
+FOLDED_CHECKPOINT = "./result/model_folded.ckpt"
+use_folded = PRECISION == 'fp32' and os.path.exists(FOLDED_CHECKPOINT)
+if use_folded and os.path.exists(CHECKPOINT) and os.path.getmtime(FOLDED_CHECKPOINT) < os.path.getmtime(CHECKPOINT):
+    print(f"⚠️ {FOLDED_CHECKPOINT} 比 {CHECKPOINT} 旧，已过期，改用 {CHECKPOINT} + scaler")
+    use_folded = False
+model = MultiHeadLSTM(input_size, hidden_size, num_layers, dropout, output_size).to(device)
+if use_folded:
+    model.load_state_dict(torch.load(FOLDED_CHECKPOINT, map_location=device))
+    scaler = scaler_angle = None
+else:
+    model.load_state_dict(torch.load(CHECKPOINT, map_location=device))
+    # 加载 scaler 和 angle_scaler
+    with open('sensor_scaler.pkl', 'rb') as f:
+        scaler = pickle.load(f)
+    with open('angle_scaler.pkl', 'rb') as f:
+        scaler_angle = pickle.load(f)
 model.eval()
 
-# ✅ 4. 定义数据存储
-window_length = 125
-step_size = 125
-buffer = deque(maxlen=window_length)
-
-# 加载 scaler 和 angle_scaler
-with open('sensor_scaler.pkl', 'rb') as f:
-    scaler = pickle.load(f)
-
-with open('angle_scaler.pkl', 'rb') as f:
-    scaler_angle = pickle.load(f)
-
-# ✅ 5. Matplotlib实时绘制预测角度
+if PRECISION != 'fp32':
+    device = torch.device('cpu')
+    model = prepare_inference_model(model.to(device), PRECISION)
+
+# ✅ 4. 流式预测设置
+# 'stateful'：保留 LSTM 状态逐样本预测（125 Hz 输出）；'windowed'：与离线窗口预测完全一致（校验用）
+STREAM_MODE = 'stateful'
+window_length = 80
+# 'stateful' 每隔多少个样本用最近一个窗口从零状态重建 LSTM 状态（模型只在 80 样本的零初始状态窗口上训练过）；
+# 设为 None 前先用 bench_streaming.py --checkpoint ... 确认长时间运行的偏差可以接受
+STATE_REFRESH = window_length
+predict_step = 1      # 每隔多少个样本输出一次预测
+sample_rate = 125     # 采样率（样本/秒），用于换算时间轴
+
+# 输出角度平滑：'none' / 'ema' / 'one_euro'（静止时去抖，快速运动时延迟小）
+SMOOTHING = 'one_euro'
+smoother = make_filter(SMOOTHING, rate=sample_rate / predict_step)
+if smoother is not None:
+    print(f"✅ 输出平滑 {SMOOTHING}：延迟约 {smoother.latency_samples:.1f} 个预测"
+          f"（{smoother.latency_samples * predict_step / sample_rate * 1e3:.0f} ms）")
+
+predictor = StreamingPredictor(model, scaler, scaler_angle, window_length=window_length,
+                               mode=STREAM_MODE, step_size=predict_step, device=device, smoother=smoother,
+                               state_refresh=STATE_REFRESH)
+
+# ✅ 5. Matplotlib实时绘制预测角度（主线程中按固定帧率刷新）
+RENDER_FPS = 10
 plt.ion()
 fig, ax = plt.subplots(figsize=(12, 8))
-predicted_angle_history = [[] for _ in range(output_size)]
-predicted_x = []
 angle_lines = [ax.plot([], [], label=f'Angle {i+1}')[0] for i in range(output_size)]
 
 ax.set_xlim(0, 250)
@@ -52,69 +94,47 @@ ax.set_xlabel("Time (s)")
 ax.set_ylabel("Angle")
 ax.legend()
 
+
+def draw(sample_indices, angle_history):
+    predicted_x = np.asarray(sample_indices) / sample_rate
+    for i, line in enumerate(angle_lines):
+        line.set_xdata(predicted_x)
+        line.set_ydata(angle_history[:, i])
+    ax.relim()
+    ax.autoscale_view()
+    fig.canvas.draw_idle()
+
+
+# ✅ 6. 读取线程 -> 环形缓冲区 -> 推理线程 -> 限速绘图
+pipeline = RealtimePipeline(ser, predictor, draw_fn=draw, n_channels=input_size, fps=RENDER_FPS,
+                            stop_on_empty=INPUT_SOURCE == 'replay')
+pipeline.start()
 print("🚀 开始实时预测")
-frame_counter = 0
-sensor_check_counter = 0
-
-# ✅ 6. 实时读取数据、预测、绘图
-while True:
-    try:
-        line = ser.readline().decode("latin1", errors="ignore").strip()
-        if not line:
-            continue
-
-        values = np.array(line.split(","), dtype=float)
-
-        if len(values) != 6:
-            print(f"⚠️ 数据格式错误: {values}")
-            continue
-
-        buffer.append(values)
-        frame_counter += 1
-
-        # 打印前100条数据检查传感器
-        if sensor_check_counter < 100:
-            print(f"🛠️ 传感器数据 ({sensor_check_counter+1}/100): {values}")
-            sensor_check_counter += 1
-
-        # 每125帧（1秒）执行一次预测
-        if len(buffer) == window_length and frame_counter % step_size == 0:
-            input_data = scaler.transform(np.array(buffer))
-            input_tensor = torch.tensor(input_data, dtype=torch.float32).to(device)
-            input_tensor = input_tensor.unsqueeze(0)
-
-            with torch.no_grad():
-                predicted_angles_norm = model(input_tensor).cpu().numpy()
-
-            # 角度反归一化
-            predicted_angles = scaler_angle.inverse_transform(predicted_angles_norm)[0]
-
-            predicted_x.append(frame_counter // step_size)
-            for i in range(output_size):
-                predicted_angle_history[i].append(predicted_angles[i])
-
-            # 控制绘图数据长度
-            if len(predicted_x) > 250:
-                predicted_x = predicted_x[-250:]
-                for i in range(output_size):
-                    predicted_angle_history[i] = predicted_angle_history[i][-250:]
-
-            # 更新绘图
-            for i, line in enumerate(angle_lines):
-                line.set_xdata(predicted_x)
-                line.set_ydata(predicted_angle_history[i])
-            ax.relim()
-            ax.autoscale_view()
-            plt.pause(0.001)
-
-            print(f"🎯 第{frame_counter // step_size}秒预测真实角度: {predicted_angles}")
-
-        sensor_check_counter += 1
-
-    except KeyboardInterrupt:
-        print("❌ 程序终止")
-        break
-    except Exception as e:
-        print(f"⚠️ 发生错误: {e}")
-
-ser.close()
\ No newline at end of file
+
+last_report = time.perf_counter()
+try:
+    while True:
+        pipeline.check()  # 读取 / 推理线程出错时在这里抛出，不再静默停止预测
+        # 回放结束：读取线程已退出且所有样本都已推理，画出最后一帧后退出
+        if INPUT_SOURCE == 'replay' and pipeline.is_idle() and len(pipeline.out_buffer) == 0:
+            pipeline.renderer.update(force=True)
+            print(f"✅ 回放结束，共推理 {pipeline.stats()['samples_processed']} 个样本")
+            break
+        pipeline.renderer.update()
+        plt.pause(0.001)
+
+        # 每秒打印一次最新预测和运行计数
+        if time.perf_counter() - last_report >= 1.0:
+            last_report = time.perf_counter()
+            stats = pipeline.stats()
+            print(f"🎯 第{stats['samples_processed'] // sample_rate}秒预测真实角度: {pipeline.renderer.latest}")
+            print(f"📊 读取 {stats['samples_read']} | 推理 {stats['samples_processed']} | "
+                  f"丢帧 {stats['dropped_input']} | 输入队列 {stats['input_queue_depth']} | "
+                  f"格式错误 {stats['parse_errors']}")
+except KeyboardInterrupt:
+    print("❌ 程序终止")
+finally:
+    pipeline.stop()
+    ser.close()
+    if emulated_device is not None:
+        emulated_device.close()
@@ -112,23 +112,131 @@ def calculate_angle_elbow(normal_vec_columns, df_o):
         angles_degrees.append(angle_degrees)  # 将计算出的角度添加到列表
     return angles_degrees
 
+# 各坐标系所用的标记点列（X, Y, Z 三列一组）
+THORAX_COLUMNS = ['XP', 'XP.1', 'XP.2', 'T8', 'T8.1', 'T8.2', 'SN', 'SN.1', 'SN.2', 'C7', 'C7.1', 'C7.2']
+SCAPULA_COLUMNS = ['AA', 'AA.1', 'AA.2', 'AI', 'AI.1', 'AI.2', 'TS', 'TS.1', 'TS.2']
+HUMERUS_COLUMNS = ['LE', 'LE.1', 'LE.2', 'ME', 'ME.1', 'ME.2', 'GH1', 'GH1.1', 'GH1.2', 'GH2', 'GH2.1', 'GH2.2']
+ELBOW_COLUMNS = ['WX', 'WX.1', 'WX.2', 'WN', 'WN.1', 'WN.2', 'LE', 'LE.1', 'LE.2', 'ME', 'ME.1', 'ME.2', 'GH1', 'GH1.1', 'GH1.2', 'GH2', 'GH2.1', 'GH2.2']
+
+# 计算全部角度所需的标记点（read_optical_data 的 columns= 参数可只读取这些列）
+REQUIRED_MARKERS = ['XP', 'T8', 'SN', 'C7', 'AA', 'AI', 'TS', 'LE', 'ME', 'GH1', 'GH2', 'WX', 'WN']
+
+
+# =============================
+# ▶️ 批量（向量化）计算：一次处理全部 N 帧
+# =============================
+
+def _marker_points(normal_vec_columns, df_o):
+    """取出标记点坐标，形状 [N, K, 3]（K 为标记点个数）。"""
+    return df_o[normal_vec_columns].to_numpy(dtype=float).reshape(len(df_o), -1, 3)
+
+
+def _normalize(v):
+    """按最后一维归一化；零向量得到 NaN，与逐帧版本一致。"""
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return v / np.linalg.norm(v, axis=-1, keepdims=True)
+
+
+def define_coordinate_batch(normal_vec_columns, df_o):
+    """
+    define_coordinate 的向量化版本。
+
+    Returns:
+        numpy.ndarray: 坐标系，形状 [N, 3, 3]，第二维依次为 x, y, z 轴单位向量。
+    """
+    points = _marker_points(normal_vec_columns, df_o)  # 0.XP，1.T8，2.SN，3.C7     #0.LE，1.ME，2.GH1，3.GH2
+
+    midpoint1 = (points[:, 0] + points[:, 1]) / 2
+    midpoint2 = (points[:, 2] + points[:, 3]) / 2
+
+    y_axis = midpoint2 - midpoint1
+    z_axis = np.cross(points[:, 2] - midpoint1, points[:, 3] - midpoint1)
+    x_axis = np.cross(y_axis, z_axis)
+
+    return np.stack([_normalize(x_axis), _normalize(y_axis), _normalize(z_axis)], axis=1)
+
+
+def define_coordinate_scapula_batch(normal_vec_columns, df_o):
+    """
+    define_coordinate_scapula 的向量化版本，返回 [N, 3, 3]。
+    """
+    points = _marker_points(normal_vec_columns, df_o)  # 0.AA，1.AI，2.TS
+
+    z_axis = points[:, 0] - points[:, 2]
+    x_axis = np.cross(points[:, 1] - points[:, 0], points[:, 2] - points[:, 0])
+    y_axis = np.cross(z_axis, x_axis)
+
+    return np.stack([_normalize(x_axis), _normalize(y_axis), _normalize(z_axis)], axis=1)
+
+
+def _angle_between(v1, v2):
+    """逐行计算两组向量夹角（度），v1/v2 形状 [..., 3]。"""
+    dot_product = np.einsum('...i,...i->...', v1, v2)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        cos_angle = dot_product / (np.linalg.norm(v1, axis=-1) * np.linalg.norm(v2, axis=-1))
+    return np.degrees(np.arccos(np.clip(cos_angle, -1.0, 1.0)))
+
+
+def calculate_angle_xyz_batch(frames1, frames2):
+    """
+    两组坐标系对应轴之间的夹角。
+
+    Args:
+        frames1, frames2 (numpy.ndarray): 形状 [N, 3, 3] 的坐标系。
+
+    Returns:
+        numpy.ndarray: 形状 [N, 3]，依次为 x, y, z 轴夹角（度）。
+    """
+    return _angle_between(frames1, frames2)
+
+
+def calculate_angle_elbow_batch(normal_vec_columns, df_o):
+    """calculate_angle_elbow 的向量化版本，返回形状 [N] 的肘关节角度。"""
+    points = _marker_points(normal_vec_columns, df_o)  # 0.WX，1.WN，2.LE，3，ME，4.GH1，5.GH2
+
+    midpoint1 = (points[:, 0] + points[:, 1]) / 2
+    midpoint2 = (points[:, 2] + points[:, 3]) / 2
+    midpoint3 = (points[:, 4] + points[:, 5]) / 2
+
+    return _angle_between(midpoint1 - midpoint2, midpoint3 - midpoint2)
+
+
 def calculate_all_angles(df_o):
+    """
+    计算全部关节角度（向量化实现），在 df_o 上写入 angle1 ~ angle10 并返回。
+    """
+    thorax = define_coordinate_batch(THORAX_COLUMNS, df_o)            # 胸廓坐标系
+    scapula = define_coordinate_scapula_batch(SCAPULA_COLUMNS, df_o)  # 肩胛骨坐标系
+    humerus = define_coordinate_batch(HUMERUS_COLUMNS, df_o)          # 肱骨坐标系
+
+    angles = np.concatenate([
+        calculate_angle_xyz_batch(thorax, humerus),   # 角度1, 2, 3 【肱骨坐标系和胸廓坐标系】
+        calculate_angle_xyz_batch(thorax, scapula),   # 角度4, 5, 6 【肩胛骨坐标系和胸廓坐标系】
+        calculate_angle_xyz_batch(scapula, humerus),  # 角度7, 8, 9 【肱骨坐标系和肩胛骨坐标系】
+        calculate_angle_elbow_batch(ELBOW_COLUMNS, df_o)[:, None],  # 角度10 【elbow角度】
+    ], axis=1)
+
+    for i in range(angles.shape[1]):
+        df_o[f'angle{i+1}'] = angles[:, i]
+
+    return df_o
+
 
+def calculate_all_angles_loop(df_o):
+    """
+    逐帧（iterrows）的原始实现，保留用于结果校验和性能对比。
+    """
     # 建立胸廓坐标系
-    normal_vec_columns_1 = ['XP', 'XP.1', 'XP.2', 'T8', 'T8.1', 'T8.2', 'SN', 'SN.1', 'SN.2', 'C7', 'C7.1', 'C7.2']
-    x1, y1, z1 = define_coordinate(normal_vec_columns_1, df_o)
+    x1, y1, z1 = define_coordinate(THORAX_COLUMNS, df_o)
 
     # 建立肩胛骨坐标系
-    normal_vec_columns_2 = ['AA', 'AA.1', 'AA.2', 'AI', 'AI.1', 'AI.2', 'TS', 'TS.1', 'TS.2']
-    x2, y2, z2 = define_coordinate_scapula(normal_vec_columns_2, df_o)
+    x2, y2, z2 = define_coordinate_scapula(SCAPULA_COLUMNS, df_o)
 
     # 建立肱骨坐标系
-    normal_vec_columns_3 = ['LE', 'LE.1', 'LE.2', 'ME', 'ME.1', 'ME.2', 'GH1', 'GH1.1', 'GH1.2', 'GH2', 'GH2.1', 'GH2.2']
-    x3, y3, z3 = define_coordinate(normal_vec_columns_3, df_o)
+    x3, y3, z3 = define_coordinate(HUMERUS_COLUMNS, df_o)
 
     # 计算角度1, 2, 3 【肱骨坐标系和胸廓坐标系】
     df_o['angle1'],  df_o['angle2'], df_o['angle3'] = calculate_angle_xyz(x1, y1, z1, x3, y3, z3)
-    # print(df_o)
 
     # 计算角度4, 5, 6 【肩胛骨坐标系和胸廓坐标系】
     df_o['angle4'],  df_o['angle5'], df_o['angle6'] = calculate_angle_xyz(x1, y1, z1, x2, y2, z2)
@@ -137,7 +245,6 @@ def calculate_all_angles(df_o):
     df_o['angle7'],  df_o['angle8'], df_o['angle9'] = calculate_angle_xyz(x2, y2, z2, x3, y3, z3)
 
     # 计算角度10 【elbow角度】
-    normal_vec_columns_4 = ['WX', 'WX.1', 'WX.2', 'WN', 'WN.1', 'WN.2', 'LE', 'LE.1', 'LE.2', 'ME', 'ME.1', 'ME.2', 'GH1', 'GH1.1', 'GH1.2', 'GH2', 'GH2.1', 'GH2.2']
-    df_o['angle10'] = calculate_angle_elbow(normal_vec_columns_4, df_o)
+    df_o['angle10'] = calculate_angle_elbow(ELBOW_COLUMNS, df_o)
 
     return df_o
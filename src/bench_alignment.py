@@ -0,0 +1,74 @@
+# bench_alignment.py
+# 对比两种对齐方式（最近帧 merge_asof / 插值到统一时间网格）在长时间记录上的耗时和峰值内存
+import argparse
+import contextlib
+import io
+import time
+import tracemalloc
+import numpy as np
+import pandas as pd
+from get_intersection_data import get_intersection_data
+
+
+def make_session(minutes, optical_rate=120.0, sensor_rate=414.0, n_angles=10, n_channels=6, seed=0):
+    """
+    生成合成的光捕角度和传感器记录：同一运动分别以两种频率采样，传感器时间带抖动。
+    """
+    rng = np.random.default_rng(seed)
+    start = pd.Timestamp('2025-03-09 18:34:24.251')
+    duration = minutes * 60.0
+
+    t_opt = np.arange(0, duration, 1 / optical_rate)
+    t_sen = np.sort(np.arange(0, duration, 1 / sensor_rate) + rng.uniform(0, 0.5 / sensor_rate, 1))
+    t_sen += rng.normal(scale=0.1 / sensor_rate, size=len(t_sen))
+    t_sen = np.sort(t_sen) + 0.003
+
+    phases = rng.uniform(0, 2 * np.pi, n_angles)
+    df_angle = pd.DataFrame({'Frame': np.arange(len(t_opt)), 'Time': start + pd.to_timedelta(t_opt, unit='s')})
+    for i in range(n_angles):
+        df_angle[f'angle{i + 1}'] = 60 * np.sin(2 * np.pi * 0.4 * t_opt + phases[i])
+
+    motion = np.sin(2 * np.pi * 0.4 * t_sen[:, None] + phases[:n_channels])
+    df_s = pd.DataFrame(2000 + 300 * motion + rng.normal(scale=5, size=motion.shape),
+                        columns=[f's{i + 1}' for i in range(n_channels)],
+                        index=pd.DatetimeIndex(start + pd.to_timedelta(t_sen, unit='s'), name='time'))
+    return df_angle, df_s
+
+
+def measure(func, *args, repeat=3, **kwargs):
+    """返回 (最短耗时 s, 峰值内存 MB, 结果)；函数内的打印信息被屏蔽。"""
+    with contextlib.redirect_stdout(io.StringIO()):
+        elapsed = float('inf')
+        for _ in range(repeat):
+            start = time.perf_counter()
+            result = func(*args, **kwargs)
+            elapsed = min(elapsed, time.perf_counter() - start)
+        tracemalloc.start()
+        func(*args, **kwargs)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    return elapsed, peak / 2 ** 20, result
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="光捕 / 传感器对齐方式性能对比")
+    parser.add_argument('--minutes', type=float, default=30)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    df_angle, df_s = make_session(args.minutes)
+    print(f"📊 合成记录 {args.minutes:g} min：光捕 {len(df_angle)} 帧，传感器 {len(df_s)} 帧")
+
+    cases = [
+        ('nearest (merge_asof)', dict(mode='nearest')),
+        ('interp linear', dict(mode='interp', method='linear')),
+        ('interp spline', dict(mode='interp', method='spline')),
+        ('interp linear @414Hz', dict(mode='interp', method='linear', rate=414.0)),
+    ]
+    for name, kwargs in cases:
+        elapsed, peak_mb, result = measure(get_intersection_data, df_angle, df_s, repeat=args.repeat, **kwargs)
+        line = f"{name:<22s} {elapsed * 1e3:9.1f} ms   峰值内存 {peak_mb:8.1f} MB   输出 {len(result)} 行"
+        report = result.attrs.get('alignment')
+        if report:
+            line += f"   光捕对齐误差 平均 {report['angle_error_mean_ms']:.2f} ms"
+        print(line)
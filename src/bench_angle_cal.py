@@ -0,0 +1,58 @@
+# bench_angle_cal.py
+# 对比逐帧（iterrows）与向量化两种关节角度计算的速度，并校验结果一致
+import argparse
+import time
+import numpy as np
+import pandas as pd
+from angle_cal import (calculate_all_angles, calculate_all_angles_loop,
+                       THORAX_COLUMNS, SCAPULA_COLUMNS, HUMERUS_COLUMNS, ELBOW_COLUMNS)
+
+# 各标记点的大致位置（mm），在此基础上加入随机运动
+BASE_POSITIONS = {
+    'XP': (0, 1200, 80), 'T8': (0, 1250, -120), 'SN': (0, 1420, 60), 'C7': (0, 1480, -90),
+    'AA': (180, 1430, -40), 'AI': (90, 1250, -130), 'TS': (80, 1370, -120),
+    'GH1': (200, 1380, 20), 'GH2': (200, 1380, -60),
+    'LE': (260, 1100, 0), 'ME': (200, 1100, -20),
+    'WX': (280, 850, 30), 'WN': (230, 850, 10),
+}
+
+
+def make_markers(n_frames, seed=0):
+    """生成 n_frames 帧的合成标记点 DataFrame，列名与 read_optical_data 输出一致。"""
+    rng = np.random.default_rng(seed)
+    t = np.arange(n_frames) / 120.0
+    data = {'Frame': np.arange(n_frames)}
+    for name, base in BASE_POSITIONS.items():
+        motion = 30 * np.sin(2 * np.pi * 0.5 * t)[:, None] * rng.normal(size=3)
+        xyz = np.asarray(base, dtype=float) + motion + rng.normal(scale=1.0, size=(n_frames, 3))
+        data[name], data[f'{name}.1'], data[f'{name}.2'] = xyz.T
+    return pd.DataFrame(data)
+
+
+def bench(func, df, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        df_copy = df.copy()
+        start = time.perf_counter()
+        result = func(df_copy)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="关节角度计算性能对比")
+    parser.add_argument('--frames', type=int, default=20000)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    df = make_markers(args.frames)
+    angle_cols = [f'angle{i}' for i in range(1, 11)]
+
+    t_loop, res_loop = bench(calculate_all_angles_loop, df, args.repeat)
+    t_vec, res_vec = bench(calculate_all_angles, df, args.repeat)
+
+    max_diff = np.nanmax(np.abs(res_loop[angle_cols].to_numpy() - res_vec[angle_cols].to_numpy()))
+    print(f"帧数: {args.frames}")
+    print(f"逐帧实现:   {t_loop:.3f} s  ({args.frames / t_loop:,.0f} frames/s)")
+    print(f"向量化实现: {t_vec:.4f} s  ({args.frames / t_vec:,.0f} frames/s)")
+    print(f"加速比: {t_loop / t_vec:.1f}x，最大角度差: {max_diff:.2e} 度")
@@ -0,0 +1,75 @@
+# bench_clock_sync.py
+# 时钟偏移估计的精度与耗时：合成一段已知偏移 / 漂移的光捕与传感器记录，对比估计值，
+# 并对比降采样频率对耗时的影响
+import argparse
+import contextlib
+import io
+import time
+import numpy as np
+import pandas as pd
+from clock_sync import synchronize_sensor
+
+
+def smooth_motion(t, n_signals, rng, cutoff=0.8):
+    """非周期的平滑运动：白噪声在频域截断到 cutoff Hz 以下。"""
+    n = len(t)
+    dt = t[1] - t[0]
+    spectrum = np.fft.rfft(rng.normal(size=(n_signals, n)), axis=1)
+    spectrum[:, np.fft.rfftfreq(n, dt) > cutoff] = 0
+    motion = np.fft.irfft(spectrum, n, axis=1)
+    return motion / motion.std(axis=1, keepdims=True)
+
+
+def make_session(minutes, offset=0.37, drift_ppm=0.0, optical_rate=120.0, sensor_rate=414.0, seed=0):
+    """
+    生成光捕角度与传感器记录；传感器时钟比光捕慢 offset 秒并带 drift_ppm 的漂移，
+    即 传感器时间 + offset + drift * (t - t0) = 光捕时间。
+    """
+    rng = np.random.default_rng(seed)
+    start = pd.Timestamp('2025-03-09 18:34:24.251')
+    duration = minutes * 60.0
+    fine_rate = 1000.0
+    t_fine = np.arange(0, duration + 5, 1 / fine_rate)
+    latent = smooth_motion(t_fine, 4, rng)
+
+    t_opt = np.arange(0, duration, 1 / optical_rate)
+    mix_angle = rng.normal(size=(10, 4))
+    angles = 40 * mix_angle @ np.stack([np.interp(t_opt, t_fine, z) for z in latent])
+    df_angle = pd.DataFrame(angles.T, columns=[f'angle{i + 1}' for i in range(10)])
+    df_angle.insert(0, 'Time', start + pd.to_timedelta(t_opt, unit='s'))
+
+    # 传感器在真实时间 t_true 采样，记录的时间戳为 t_true - offset - drift * t_true
+    t_true = np.arange(1.0, duration, 1 / sensor_rate) + rng.normal(scale=0.1 / sensor_rate, size=1)
+    mix_sensor = rng.normal(size=(6, 4))
+    z = mix_sensor @ np.stack([np.interp(t_true, t_fine, z) for z in latent])
+    sensors = 2000 + 300 * np.tanh(z / 2) + rng.normal(scale=20, size=z.shape)
+    t_recorded = t_true - offset - drift_ppm * 1e-6 * t_true
+    df_s = pd.DataFrame(sensors.T, columns=[f's{i + 1}' for i in range(6)],
+                        index=pd.DatetimeIndex(start + pd.to_timedelta(t_recorded, unit='s'), name='time'))
+    return df_angle, df_s
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="时钟偏移估计精度与耗时")
+    parser.add_argument('--minutes', type=float, default=30)
+    parser.add_argument('--offset', type=float, default=0.37)
+    parser.add_argument('--drift-ppm', type=float, default=50.0)
+    args = parser.parse_args()
+
+    df_angle, df_s = make_session(args.minutes, args.offset, args.drift_ppm)
+    print(f"📊 合成记录 {args.minutes:g} min：光捕 {len(df_angle)} 帧，传感器 {len(df_s)} 帧，"
+          f"真实偏移 {args.offset * 1e3:.1f} ms，漂移 {args.drift_ppm:g} ppm")
+
+    for rate, drift in [(25.0, False), (50.0, False), (200.0, False), (50.0, True)]:
+        with contextlib.redirect_stdout(io.StringIO()):
+            start = time.perf_counter()
+            _, sync = synchronize_sensor(df_angle, df_s, max_lag=2.0, rate=rate, drift=drift)
+            elapsed = time.perf_counter() - start
+        # 记录中点处的真实修正量
+        mid = (df_s.index[0].value + df_s.index[-1].value) // 2
+        mid_s = (mid - df_s.index[0].value) / 1e9 + 1.0
+        truth = args.offset + args.drift_ppm * 1e-6 * mid_s
+        estimate = sync['offset'] + sync['drift'] * (mid - sync['t0']) / 1e9
+        print(f"rate={rate:5.0f} Hz drift={str(drift):5s}  {elapsed * 1e3:8.1f} ms   "
+              f"中点修正量误差 {(estimate - truth) * 1e3:+7.2f} ms   漂移估计 {sync['drift'] * 1e6:7.1f} ppm   "
+              f"相关峰比 {sync['peak_ratio']:.1f}")
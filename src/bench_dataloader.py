@@ -0,0 +1,84 @@
+# bench_dataloader.py
+# 训练取数流水线测试：不同取数进程数 / 锁页内存设置下，每个 epoch 的吞吐量（样本/秒）
+# 以及等待取数的时间占比，用于判断训练是取数瓶颈还是计算瓶颈。
+import argparse
+import time
+import numpy as np
+import torch
+import torch.nn as nn
+from model import MultiHeadLSTM
+from session_cache import load_or_build_cache
+from windowed_dataset import SlidingWindowDataset, make_loader
+
+
+def run_epoch(loader, model, optimizer, criterion, device, max_batches=None):
+    """
+    训练一个 epoch，分别统计等待取数的时间和计算（前向 + 反向 + 更新）时间。
+
+    Returns:
+        (int, float, float): 样本数、取数等待时间（秒）、总时间（秒）。
+    """
+    n_samples, n_batches, wait = 0, 0, 0.0
+    start = time.perf_counter()
+    batches = iter(loader)
+    while max_batches is None or n_batches < max_batches:
+        t0 = time.perf_counter()
+        batch = next(batches, None)
+        if batch is None:
+            break
+        X_batch, y_batch = (t.to(device, non_blocking=True) for t in batch)
+        wait += time.perf_counter() - t0
+        if model is not None:
+            optimizer.zero_grad()
+            loss = criterion(model(X_batch), y_batch)
+            loss.backward()
+            optimizer.step()
+        if device.type == 'cuda':
+            torch.cuda.synchronize()
+        n_samples += len(X_batch)
+        n_batches += 1
+    return n_samples, wait, time.perf_counter() - start
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="训练取数流水线吞吐量测试")
+    parser.add_argument('--data-folder', default='../data/20250310_data/train_data/6sensor+10angle')
+    parser.add_argument('--window-length', type=int, default=80)
+    parser.add_argument('--time-steps', type=int, default=5)
+    parser.add_argument('--batch-size', type=int, default=256)
+    parser.add_argument('--epochs', type=int, default=2, help='每种设置的 epoch 数（第一个 epoch 含进程启动开销）')
+    parser.add_argument('--max-batches', type=int, default=None, help='可选，每个 epoch 最多取多少个 batch')
+    parser.add_argument('--workers', type=int, nargs='+', default=[0, 2, 4])
+    parser.add_argument('--hidden-size', type=int, default=256)
+    parser.add_argument('--data-only', action='store_true', help='只取数不训练，测取数流水线的上限')
+    args = parser.parse_args()
+
+    device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
+    cache = load_or_build_cache(args.data_folder)
+    starts, _ = cache.window_index(args.window_length, args.time_steps)
+    x_mean, x_scale = np.nanmean(cache.sensor, axis=0), np.nanstd(cache.sensor, axis=0) + 1e-6
+    y_mean, y_scale = np.nanmean(cache.angle, axis=0), np.nanstd(cache.angle, axis=0) + 1e-6
+    dataset = SlidingWindowDataset(cache.sensor, cache.angle, args.window_length, starts=starts,
+                                   x_mean=x_mean, x_scale=x_scale, y_mean=y_mean, y_scale=y_scale)
+    print(f"📊 {len(dataset)} 个窗口，batch {args.batch_size}，设备 {device}")
+
+    model = optimizer = criterion = None
+    if not args.data_only:
+        torch.manual_seed(0)
+        model = MultiHeadLSTM(cache.sensor.shape[1], hidden_size=args.hidden_size, num_layers=3, dropout=0.1,
+                              output_size=cache.angle.shape[1]).to(device)
+        optimizer = torch.optim.Adam(model.parameters(), lr=0.001)
+        criterion = nn.MSELoss()
+
+    pin_options = [False, True] if device.type == 'cuda' else [False]
+    for num_workers in args.workers:
+        for pin_memory in pin_options:
+            loader = make_loader(dataset, batch_size=args.batch_size, shuffle=True, num_workers=num_workers,
+                                 pin_memory=pin_memory, prefetch_factor=4)
+            for epoch in range(args.epochs):
+                n_samples, wait, elapsed = run_epoch(loader, model, optimizer, criterion, device, args.max_batches)
+                bound = '取数瓶颈' if wait > 0.5 * elapsed else '计算瓶颈'
+                print(f"workers={num_workers} pin={pin_memory!s:<5} epoch {epoch + 1}: "
+                      f"{n_samples / elapsed:9.0f} 样本/s   取数等待 {wait:6.2f} s / {elapsed:6.2f} s "
+                      f"({wait / elapsed:5.1%}) {bound}")
+            del loader
@@ -0,0 +1,92 @@
+# bench_export.py
+# 部署推理对比：eager PyTorch（state_dict + pickle scaler）与导出模型（TorchScript / ONNX Runtime）的
+# 启动耗时（加载到第一次预测完成）和单窗口推理延迟。
+import argparse
+import os
+import pickle
+import tempfile
+import time
+import warnings
+import numpy as np
+import torch
+from sklearn.preprocessing import StandardScaler
+from model import MultiHeadLSTM
+from export_model import export_model, InferenceRuntime
+
+
+class EagerRuntime:
+    """原部署方式：构建模型、加载 state_dict 和 scaler，推理时在 numpy 中标准化 / 反标准化。"""
+
+    def __init__(self, checkpoint, sensor_scaler, angle_scaler, num_threads=1):
+        torch.set_num_threads(num_threads)
+        self.model = MultiHeadLSTM(6, 256, 3, 0.1, 9)
+        self.model.load_state_dict(torch.load(checkpoint, map_location='cpu'))
+        self.model.eval()
+        with open(sensor_scaler, 'rb') as f:
+            self.scaler_sensor = pickle.load(f)
+        with open(angle_scaler, 'rb') as f:
+            self.scaler_angle = pickle.load(f)
+
+    def predict(self, windows):
+        windows = np.asarray(windows, dtype=np.float32)
+        x = self.scaler_sensor.transform(windows.reshape(-1, windows.shape[-1])).reshape(windows.shape)
+        with torch.no_grad():
+            preds = self.model(torch.tensor(x, dtype=torch.float32)).numpy()
+        return self.scaler_angle.inverse_transform(preds)
+
+
+def latency(runtime, windows, n_runs):
+    """逐窗口推理的延迟（毫秒）：中位数和 p99。"""
+    times = []
+    for i in range(n_runs):
+        start = time.perf_counter()
+        runtime.predict(windows[i % len(windows)][None])
+        times.append(time.perf_counter() - start)
+    times = np.asarray(times) * 1e3
+    return np.median(times), np.percentile(times, 99)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="eager / TorchScript / ONNX 推理启动耗时与延迟对比")
+    parser.add_argument('--checkpoint', default=None, help='可选，模型权重（默认随机初始化）')
+    parser.add_argument('--sensor-scaler', default=None)
+    parser.add_argument('--angle-scaler', default=None)
+    parser.add_argument('--runs', type=int, default=300)
+    parser.add_argument('--threads', type=int, nargs='+', default=[1, 2])
+    parser.add_argument('--onnx', action='store_true', help='同时测试 ONNX Runtime（需要 onnx / onnxruntime）')
+    args = parser.parse_args()
+    warnings.filterwarnings('ignore', category=FutureWarning)
+
+    work_dir = tempfile.mkdtemp()
+    rng = np.random.default_rng(0)
+    checkpoint, sensor_scaler, angle_scaler = args.checkpoint, args.sensor_scaler, args.angle_scaler
+    if checkpoint is None:
+        torch.manual_seed(0)
+        checkpoint = os.path.join(work_dir, 'model.ckpt')
+        torch.save(MultiHeadLSTM(6, 256, 3, 0.1, 9).state_dict(), checkpoint)
+    if sensor_scaler is None or angle_scaler is None:
+        sensor_scaler, angle_scaler = os.path.join(work_dir, 'sensor.pkl'), os.path.join(work_dir, 'angle.pkl')
+        with open(sensor_scaler, 'wb') as f:
+            pickle.dump(StandardScaler().fit(rng.normal(2000, 300, (1000, 6))), f)
+        with open(angle_scaler, 'wb') as f:
+            pickle.dump(StandardScaler().fit(rng.normal(60, 20, (1000, 9))), f)
+
+    artifacts = [os.path.join(work_dir, 'model.pt')] + ([os.path.join(work_dir, 'model.onnx')] if args.onnx else [])
+    for path in artifacts:
+        export_model(checkpoint, path, sensor_scaler, angle_scaler)
+    windows = rng.normal(2000, 300, (64, 80, 6)).astype(np.float32)
+
+    for num_threads in args.threads:
+        runtimes = [('eager', lambda: EagerRuntime(checkpoint, sensor_scaler, angle_scaler, num_threads))]
+        runtimes += [(os.path.splitext(path)[1][1:], lambda path=path: InferenceRuntime(path, num_threads))
+                     for path in artifacts]
+        reference = None
+        for name, load in runtimes:
+            start = time.perf_counter()
+            runtime = load()
+            first = runtime.predict(windows[:1])
+            startup = time.perf_counter() - start
+            reference = first if reference is None else reference
+            median, p99 = latency(runtime, windows, args.runs)
+            print(f"threads={num_threads} {name:<6s} 启动 {startup * 1e3:8.1f} ms   单窗口延迟 中位数 {median:6.2f} ms "
+                  f"p99 {p99:6.2f} ms   与 eager 最大差 {np.abs(first - reference).max():.1e} 度")
@@ -0,0 +1,95 @@
+# bench_quantization.py
+# 推理精度对比（fp32 / int8 动态量化 / bf16）：
+#   1) 测试集上每个角度的 RMSE（度）及相对 fp32 的变化；
+#   2) 单窗口延迟、batch 吞吐量和模型体积。
+#
+#   python bench_quantization.py --checkpoint SingleAction_2.ckpt --data-folder ./motion_0407/rdm/slla
+import argparse
+import io
+import pickle
+import time
+import warnings
+import numpy as np
+import torch
+from sklearn.preprocessing import StandardScaler
+from model import MultiHeadLSTM
+from precision import PRECISIONS, prepare_inference_model
+from predict_utilis import evaluate_clips
+from session_cache import load_or_build_cache
+
+
+def model_size_mb(model):
+    """序列化后的 state_dict 大小（MB）。"""
+    buffer = io.BytesIO()
+    torch.save(model.state_dict(), buffer)
+    return len(buffer.getvalue()) / 2 ** 20
+
+
+def time_forward(model, x, n_runs):
+    """前向耗时中位数（毫秒）。"""
+    with torch.no_grad():
+        for _ in range(3):
+            model(x)
+        times = []
+        for _ in range(n_runs):
+            start = time.perf_counter()
+            model(x)
+            times.append(time.perf_counter() - start)
+    return float(np.median(times) * 1e3)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="fp32 / int8 / bf16 推理精度与性能对比")
+    parser.add_argument('--data-folder', default='./motion_0407/rdm/slla')
+    parser.add_argument('--checkpoint', default=None, help='模型权重（不指定时随机初始化，RMSE 只作冒烟测试）')
+    parser.add_argument('--sensor-scaler', default='sensor_scaler.pkl')
+    parser.add_argument('--angle-scaler', default='angle_scaler.pkl')
+    parser.add_argument('--window-length', type=int, default=80)
+    parser.add_argument('--time-steps', type=int, default=5)
+    parser.add_argument('--threads', type=int, default=1)
+    parser.add_argument('--runs', type=int, default=50)
+    args = parser.parse_args()
+    warnings.filterwarnings('ignore', category=DeprecationWarning)
+    warnings.filterwarnings('ignore', category=FutureWarning)
+    torch.set_num_threads(args.threads)
+
+    cache = load_or_build_cache(args.data_folder)
+    torch.manual_seed(0)
+    model = MultiHeadLSTM(cache.sensor.shape[1], hidden_size=256, num_layers=3, dropout=0.1,
+                          output_size=cache.angle.shape[1])
+    if args.checkpoint:
+        model.load_state_dict(torch.load(args.checkpoint, map_location='cpu'))
+        with open(args.sensor_scaler, 'rb') as f:
+            scaler_sensor = pickle.load(f)
+        with open(args.angle_scaler, 'rb') as f:
+            scaler_angle = pickle.load(f)
+    else:
+        print("⚠️ 未指定 --checkpoint，使用随机初始化的模型和在测试集上 fit 的 scaler，RMSE 仅作冒烟测试")
+        scaler_sensor = StandardScaler().fit(np.nan_to_num(cache.sensor))
+        scaler_angle = StandardScaler().fit(np.nan_to_num(cache.angle))
+    model.eval()
+
+    single = torch.randn(1, args.window_length, cache.sensor.shape[1])
+    batch = torch.randn(256, args.window_length, cache.sensor.shape[1])
+    results = {}
+    for precision in PRECISIONS:
+        inference_model = prepare_inference_model(model, precision)
+        start = time.perf_counter()
+        results[precision] = evaluate_clips(inference_model, cache, args.window_length, args.time_steps,
+                                            scaler_sensor, scaler_angle, torch.device('cpu'))
+        eval_time = time.perf_counter() - start
+        latency = time_forward(inference_model, single, args.runs)
+        throughput = 256 / time_forward(inference_model, batch, max(args.runs // 10, 3)) * 1e3
+        print(f"{precision:<5s} 平均 RMSE {results[precision]['mean_rmse']:7.4f} 度   单窗口 {latency:6.2f} ms   "
+              f"batch 256 {throughput:8.0f} 窗口/s   模型 {model_size_mb(inference_model):5.2f} MB   "
+              f"测试集评估 {eval_time:6.1f} s")
+
+    # 逐角度 RMSE 及相对 fp32 的变化
+    print(f"\n📐 每个角度的 RMSE（度，{results['fp32']['n_windows']} 个窗口）")
+    print("angle " + "".join(f"{precision:>10s}" for precision in PRECISIONS)
+          + "".join(f"{'Δ' + precision:>10s}" for precision in PRECISIONS[1:]))
+    reference = np.asarray(results['fp32']['rmse'])
+    for i in range(len(reference)):
+        row = "".join(f"{results[precision]['rmse'][i]:10.4f}" for precision in PRECISIONS)
+        row += "".join(f"{results[precision]['rmse'][i] - reference[i]:+10.4f}" for precision in PRECISIONS[1:])
+        print(f"{i + 1:<6d}{row}")
@@ -0,0 +1,103 @@
+# bench_realtime.py
+# 离线测量实时预测流水线：用传感器记录回放（或 pty 模拟设备）代替串口，
+# 统计吞吐量（samples/s）和“样本到达 -> 角度输出”的延迟分位数，可在 CI 中运行。
+import argparse
+import time
+import numpy as np
+import torch
+from sklearn.preprocessing import StandardScaler
+from model import MultiHeadLSTM
+from streaming import StreamingPredictor
+from realtime_pipeline import RealtimePipeline
+from input_sources import open_source
+
+
+def run_benchmark(source, predictor, n_channels, stop_on_empty, device=None, max_seconds=None, block_when_full=False,
+                  drain_timeout=2.0):
+    """
+    运行流水线直至输入结束，返回 (统计计数, 延迟数组[秒], 总耗时)。
+
+    pty 模式下，设备线程写完后读取端可能还没读完：要求读取线程读到设备写入的全部行
+    （或 drain_timeout 秒内没有新数据），且所有读到的样本都已推理或计入丢帧，才结束。
+    """
+    pipeline = RealtimePipeline(source, predictor, n_channels=n_channels, stop_on_empty=stop_on_empty,
+                                block_when_full=block_when_full)
+    latencies = []
+    start = time.perf_counter()
+    last_read, last_progress = 0, start
+    pipeline.start()
+    while True:
+        if pipeline.error is not None:
+            break
+        for _, arrival, _ in pipeline.out_buffer.get_batch(timeout=0.01):
+            latencies.append(time.perf_counter() - arrival)
+        if device is None:
+            finished = pipeline.is_idle()
+        else:
+            stats = pipeline.stats()
+            lines_read = stats['samples_read'] + stats['parse_errors']
+            if lines_read != last_read:
+                last_read, last_progress = lines_read, time.perf_counter()
+            read_all = lines_read >= device.lines_written or time.perf_counter() - last_progress > drain_timeout
+            finished = (device.is_finished() and read_all
+                        and stats['samples_processed'] + stats['dropped_input'] == stats['samples_read'])
+        if finished and len(pipeline.out_buffer) == 0:
+            break
+        if max_seconds is not None and time.perf_counter() - start > max_seconds:
+            break
+    elapsed = time.perf_counter() - start
+    pipeline.stop()
+    pipeline.check()
+    return pipeline.stats(), np.array(latencies), elapsed
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="实时预测流水线离线基准测试")
+    parser.add_argument('--sensor-file', default='../data/20250310_data/sensor/001/1e.txt')
+    parser.add_argument('--source', choices=['replay', 'pty'], default='replay')
+    parser.add_argument('--rate', type=float, default=0, help='回放倍速，1 为实时，0 为尽快（缓冲区满时阻塞，测最大吞吐量）')
+    parser.add_argument('--mode', choices=['stateful', 'windowed'], default='stateful')
+    parser.add_argument('--step-size', type=int, default=1)
+    parser.add_argument('--window-length', type=int, default=80)
+    parser.add_argument('--state-refresh', type=int, default=None,
+                        help="'stateful' 每隔多少个样本从零状态重建 LSTM 状态，默认与 05_predict.py 相同（= window-length），0 表示不重建")
+    parser.add_argument('--checkpoint', default=None, help='可选，模型权重（默认随机初始化）')
+    parser.add_argument('--threads', type=int, default=None, help='torch CPU 线程数')
+    parser.add_argument('--max-seconds', type=float, default=None)
+    args = parser.parse_args()
+
+    if args.threads:
+        torch.set_num_threads(args.threads)
+    torch.manual_seed(0)
+
+    source, device = open_source(args.source, filepath=args.sensor_file, rate=args.rate, timeout=0.1)
+    n_channels = source.n_channels if device is None else device.n_channels
+    signal = (source if device is None else device.replay).values
+
+    model = MultiHeadLSTM(n_channels, hidden_size=256, num_layers=3, dropout=0.1, output_size=9)
+    if args.checkpoint:
+        model.load_state_dict(torch.load(args.checkpoint, map_location='cpu'))
+    model.eval()
+    state_refresh = args.window_length if args.state_refresh is None else (args.state_refresh or None)
+    predictor = StreamingPredictor(model, StandardScaler().fit(signal),
+                                   StandardScaler().fit(np.random.default_rng(0).normal(60, 20, size=(100, 9))),
+                                   window_length=args.window_length, mode=args.mode, step_size=args.step_size,
+                                   state_refresh=state_refresh)
+
+    stats, latencies, elapsed = run_benchmark(source, predictor, n_channels, stop_on_empty=device is None,
+                                              device=device, max_seconds=args.max_seconds,
+                                              block_when_full=not args.rate)
+    source.close()
+    if device is not None:
+        device.close()
+
+    print(f"输入源: {args.source}，倍速: {args.rate or '尽快'}，模式: {args.mode}，"
+          f"状态重建间隔: {state_refresh or '不重建'}")
+    print(f"样本数: {stats['samples_processed']}，预测数: {stats['predictions']}，耗时: {elapsed:.2f} s")
+    print(f"吞吐量: {stats['samples_processed'] / elapsed:,.0f} samples/s")
+    print(f"丢帧: {stats['dropped_input']}，格式错误: {stats['parse_errors']}")
+    if device is not None:
+        print(f"pty 写入 {device.lines_written} 行，读取 {stats['samples_read'] + stats['parse_errors']} 行")
+    if len(latencies):
+        p50, p90, p99 = np.percentile(latencies * 1e3, [50, 90, 99])
+        print(f"延迟 (ms): p50 {p50:.2f} | p90 {p90:.2f} | p99 {p99:.2f} | max {latencies.max() * 1e3:.2f}")
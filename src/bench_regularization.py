@@ -0,0 +1,64 @@
+# bench_regularization.py
+# 训练单步耗时对比：三种正则化方式（见 regularization.py），以及惩罚项本身的前向 + 反向耗时。
+import argparse
+import time
+import torch
+import torch.nn as nn
+from model import MultiHeadLSTM
+from regularization import REGULARIZATION_MODES, configure_regularization, legacy_norm_penalty, fused_norm_penalty
+
+
+def time_steps(step, n_steps, warmup=3):
+    """返回每步耗时的中位数（秒）。"""
+    for _ in range(warmup):
+        step()
+    times = []
+    for _ in range(n_steps):
+        start = time.perf_counter()
+        step()
+        if torch.cuda.is_available():
+            torch.cuda.synchronize()
+        times.append(time.perf_counter() - start)
+    return sorted(times)[len(times) // 2]
+
+
+def make_model(args, device):
+    torch.manual_seed(0)
+    return MultiHeadLSTM(6, hidden_size=args.hidden_size, num_layers=3, dropout=0.1, output_size=9).to(device)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="正则化方式的训练单步耗时对比")
+    parser.add_argument('--batch-size', type=int, default=256)
+    parser.add_argument('--window-length', type=int, default=80)
+    parser.add_argument('--hidden-size', type=int, default=256)
+    parser.add_argument('--steps', type=int, default=20)
+    args = parser.parse_args()
+
+    device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
+    X = torch.randn(args.batch_size, args.window_length, 6, device=device)
+    y = torch.randn(args.batch_size, 9, device=device)
+    criterion = nn.MSELoss()
+
+    # 1) 惩罚项本身：数值一致性和前向 + 反向耗时
+    model = make_model(args, device)
+    parameters = list(model.parameters())
+    legacy, fused = legacy_norm_penalty(parameters), fused_norm_penalty(parameters)
+    print(f"📊 {len(parameters)} 个参数张量，惩罚项 legacy {legacy.item():.6f} / fused {fused.item():.6f}")
+    for name, penalty_fn in (('legacy', legacy_norm_penalty), ('fused', fused_norm_penalty)):
+        elapsed = time_steps(lambda: penalty_fn(parameters).backward(), args.steps * 5)
+        print(f"惩罚项 {name:<7s} 前向 + 反向 {elapsed * 1e3:8.3f} ms")
+
+    # 2) 完整训练单步
+    for mode in REGULARIZATION_MODES:
+        model = make_model(args, device)
+        optimizer, penalty = configure_regularization(model, mode)
+
+        def step():
+            optimizer.zero_grad()
+            loss = criterion(model(X), y) + penalty()
+            loss.backward()
+            optimizer.step()
+
+        elapsed = time_steps(step, args.steps)
+        print(f"训练单步 {mode:<13s} {elapsed * 1e3:8.2f} ms")
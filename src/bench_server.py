@@ -0,0 +1,112 @@
+# bench_server.py
+# 多路推理服务的负载测试：N 个模拟客户端各自按采样率回放传感器记录（起点错开），
+# 统计客户端侧的端到端延迟（发送帧 -> 收到该帧的预测）、吞吐量和服务端平均 batch 大小，
+# 并与不做微批（max_batch=1）的服务对比。
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+import numpy as np
+import torch
+from model import MultiHeadLSTM, fold_scalers
+from read_sensor import read_sensor_data
+from input_sources import format_sensor_line
+from inference_server import InferenceServer, STREAM_HEADER
+
+
+async def run_client(name, signal, rate, duration, connect, latencies):
+    """一路模拟设备：按 rate（Hz）发送帧，记录每帧的发送时间，收到预测后计算延迟。"""
+    reader, writer = await connect()
+    writer.write(f"{STREAM_HEADER} {name}\n".encode('latin1'))
+    n_frames = int(duration * rate)
+    sent = np.full(n_frames, np.nan)
+
+    async def receive():
+        while True:
+            line = await reader.readline()
+            if not line:
+                break
+            index = int(line.split(b',', 1)[0])
+            latencies.append(time.perf_counter() - sent[index])
+
+    receiver = asyncio.get_running_loop().create_task(receive())
+    t0 = time.perf_counter()
+    for i in range(n_frames):
+        delay = t0 + i / rate - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        sent[i] = time.perf_counter()
+        writer.write(format_sensor_line(signal[i % len(signal)]))
+    await writer.drain()
+    await asyncio.sleep(0.5)  # 等待最后几帧的预测
+    writer.close()
+    await receiver
+    return n_frames
+
+
+async def run_load(server, args, signal):
+    """启动服务和 n_clients 个客户端，返回 (客户端延迟数组[秒], 总帧数, 耗时, 服务端统计)。"""
+    if args.tcp:
+        listener = await server.start('127.0.0.1', 0)
+        port = listener.sockets[0].getsockname()[1]
+        connect = lambda: asyncio.open_connection('127.0.0.1', port)
+    else:
+        path = os.path.join(tempfile.mkdtemp(), 'inference.sock')
+        listener = await server.start(unix_path=path)
+        connect = lambda: asyncio.open_unix_connection(path)
+
+    latencies = []
+    rng = np.random.default_rng(0)
+    start = time.perf_counter()
+    async with listener:
+        counts = await asyncio.gather(*[
+            run_client(f'client-{i}', np.roll(signal, -int(rng.integers(len(signal))), axis=0), args.rate,
+                       args.duration, connect, latencies)
+            for i in range(args.clients)])
+    elapsed = time.perf_counter() - start
+    stats = server.stats()
+    await server.stop()
+    return np.asarray(latencies), sum(counts), elapsed, stats
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="多路推理服务负载测试")
+    parser.add_argument('--sensor-file', default='../data/20250310_data/sensor/001/1e.txt')
+    parser.add_argument('--clients', type=int, default=8)
+    parser.add_argument('--rate', type=float, default=125, help='每个客户端的发送频率（Hz）')
+    parser.add_argument('--duration', type=float, default=10, help='每个客户端的发送时长（秒）')
+    parser.add_argument('--mode', choices=['stateful', 'windowed'], default='stateful')
+    parser.add_argument('--step-size', type=int, default=1)
+    parser.add_argument('--window-length', type=int, default=80)
+    parser.add_argument('--state-refresh', type=int, default=None,
+                        help="'stateful' 每隔多少个样本从零状态重建 LSTM 状态，默认与 05_predict.py 相同（= window-length），0 表示不重建")
+    parser.add_argument('--max-batch', type=int, default=64)
+    parser.add_argument('--max-wait-ms', type=float, default=5.0)
+    parser.add_argument('--tcp', action='store_true', help='使用 TCP（默认 Unix socket）')
+    parser.add_argument('--threads', type=int, default=1)
+    parser.add_argument('--checkpoint', default=None, help='可选，模型权重（默认随机初始化）')
+    args = parser.parse_args()
+
+    torch.manual_seed(0)
+    torch.set_num_threads(args.threads)
+    signal = read_sensor_data(args.sensor_file)[0].to_numpy()
+    model = MultiHeadLSTM(signal.shape[1], hidden_size=256, num_layers=3, dropout=0.1, output_size=9)
+    if args.checkpoint:
+        model.load_state_dict(torch.load(args.checkpoint, map_location='cpu'))
+    # 服务端使用合并了标准化参数的模型（原始传感器值输入）
+    model = fold_scalers(model.eval(), signal.mean(axis=0), signal.std(axis=0) + 1e-6, np.zeros(9), np.ones(9))
+
+    state_refresh = args.window_length if args.state_refresh is None else (args.state_refresh or None)
+    print(f"📊 {args.clients} 个客户端 × {args.rate:g} Hz × {args.duration:g} s，{args.mode} 模式，"
+          f"{'TCP' if args.tcp else 'Unix socket'}")
+    for max_batch, max_wait_ms in ((1, 0.0), (args.max_batch, args.max_wait_ms)):
+        server = InferenceServer(model, window_length=args.window_length, mode=args.mode, step_size=args.step_size,
+                                 max_batch=max_batch, max_wait_ms=max_wait_ms, n_channels=signal.shape[1],
+                                 state_refresh=state_refresh)
+        latencies, n_frames, elapsed, stats = asyncio.run(run_load(server, args, signal))
+        latencies = latencies * 1e3
+        expected = n_frames // args.step_size
+        print(f"max_batch={max_batch:<3d} wait={max_wait_ms:g} ms: {len(latencies)}/{expected} 个预测，"
+              f"{len(latencies) / elapsed:7.0f} 预测/s，平均 batch {stats['mean_batch_frames']:5.1f} 帧，"
+              f"端到端延迟 p50 {np.percentile(latencies, 50):7.2f} ms  p99 {np.percentile(latencies, 99):8.2f} ms")
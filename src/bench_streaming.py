@@ -0,0 +1,123 @@
+# bench_streaming.py
+# 流式推理校验与性能对比：
+#   1) 'windowed' 模式输出与离线窗口预测逐点一致；
+#   2) 逐样本输出时 'stateful'（O(1)/样本）与 'windowed'（O(窗口)/样本）的吞吐量；
+#   3) scaler 合并进模型权重（fold_scalers）后输出一致，以及每块样本的处理耗时；
+#   4) 长记录上 'stateful' 输出相对窗口预测的偏差（每个角度的 RMSE，及随时间的变化），
+#      比较状态不重置与每 state_refresh 个样本重建状态。
+#
+#   python bench_streaming.py --checkpoint ./result/model.ckpt --sensor-scaler sensor_scaler.pkl --angle-scaler angle_scaler.pkl
+import argparse
+import pickle
+import time
+import numpy as np
+import torch
+from sklearn.preprocessing import StandardScaler
+from model import MultiHeadLSTM, fold_scalers
+from read_sensor import read_sensor_data
+from streaming import StreamingPredictor
+
+
+def run(predictor, signal, chunk_size):
+    predictor.reset()
+    outputs = []
+    start = time.perf_counter()
+    for i in range(0, len(signal), chunk_size):
+        _, angles = predictor.push_chunk(signal[i:i + chunk_size])
+        if len(angles):
+            outputs.append(angles)
+    elapsed = time.perf_counter() - start
+    return np.vstack(outputs), elapsed
+
+
+def offline_windows(model, x, ends, window_length, batch_size=512):
+    """离线窗口预测（零初始状态，与训练一致）：ends 为各窗口的结束位置（不含）。"""
+    outputs = []
+    with torch.no_grad():
+        for i in range(0, len(ends), batch_size):
+            batch_ends = ends[i:i + batch_size]
+            windows = x[batch_ends[:, None] - window_length + np.arange(window_length)]
+            outputs.append(model(torch.tensor(windows, dtype=torch.float32)).numpy())
+    return np.vstack(outputs)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="流式推理校验与性能对比")
+    parser.add_argument('--sensor-file', default='../data/20250310_data/sensor/001/1e.txt')
+    parser.add_argument('--samples', type=int, default=2000)
+    parser.add_argument('--window-length', type=int, default=80)
+    parser.add_argument('--chunk-size', type=int, default=1)
+    parser.add_argument('--checkpoint', default=None, help='可选，模型权重（默认随机初始化）')
+    parser.add_argument('--sensor-scaler', default=None, help='可选，训练时保存的传感器 scaler')
+    parser.add_argument('--angle-scaler', default=None, help='可选，训练时保存的角度 scaler')
+    parser.add_argument('--state-refresh', type=int, default=80, help="偏差对比中 'stateful' 重建状态的间隔（样本数）")
+    parser.add_argument('--deviation-step', type=int, default=5, help='偏差对比时每隔多少个样本取一个窗口')
+    args = parser.parse_args()
+
+    torch.manual_seed(0)
+    torch.set_num_threads(1)
+    full_signal = read_sensor_data(args.sensor_file)[0].to_numpy()
+    signal = full_signal[:args.samples]
+    n_channels = signal.shape[1]
+
+    model = MultiHeadLSTM(n_channels, hidden_size=256, num_layers=3, dropout=0.1, output_size=9)
+    if args.checkpoint:
+        model.load_state_dict(torch.load(args.checkpoint, map_location='cpu'))
+    else:
+        print("⚠️ 未指定 --checkpoint，使用随机初始化的模型，第 4 部分的偏差不代表训练后的模型")
+    model.eval()
+    scaler_sensor = StandardScaler().fit(signal)
+    scaler_angle = StandardScaler().fit(np.random.default_rng(0).normal(60, 20, size=(100, 9)))
+    if args.sensor_scaler:
+        with open(args.sensor_scaler, 'rb') as f:
+            scaler_sensor = pickle.load(f)
+    if args.angle_scaler:
+        with open(args.angle_scaler, 'rb') as f:
+            scaler_angle = pickle.load(f)
+
+    # 1) windowed 模式 vs 离线窗口预测
+    step = 25
+    windowed = StreamingPredictor(model, scaler_sensor, scaler_angle, args.window_length, mode='windowed', step_size=step)
+    stream_out, _ = run(windowed, signal, chunk_size=7)
+    x = scaler_sensor.transform(signal)
+    ends = np.arange(1, len(x) + 1)
+    ends = ends[(ends % step == 0) & (ends >= args.window_length)]
+    windows = np.stack([x[e - args.window_length:e] for e in ends])
+    with torch.no_grad():
+        offline = scaler_angle.inverse_transform(model(torch.tensor(windows, dtype=torch.float32)).numpy())
+    print(f"windowed 模式与离线窗口预测最大差: {np.abs(stream_out - offline).max():.2e} 度（{len(offline)} 个窗口）")
+
+    # 2) 逐样本输出的吞吐量
+    for mode in ('stateful', 'windowed'):
+        predictor = StreamingPredictor(model, scaler_sensor, scaler_angle, args.window_length, mode=mode, step_size=1)
+        out, elapsed = run(predictor, signal, args.chunk_size)
+        print(f"{mode:9s}: {len(out)} 次预测，{len(signal) / elapsed:,.0f} samples/s，"
+              f"{elapsed / len(signal) * 1e3:.3f} ms/样本")
+
+    # 3) 合并 scaler 后的模型：原始传感器值输入，不再调用 sklearn 的 transform / inverse_transform
+    folded = fold_scalers(model, scaler_sensor.mean_, scaler_sensor.scale_, scaler_angle.mean_, scaler_angle.scale_)
+    for mode in ('stateful', 'windowed'):
+        with_scalers = StreamingPredictor(model, scaler_sensor, scaler_angle, args.window_length, mode=mode, step_size=1)
+        without = StreamingPredictor(folded, None, None, args.window_length, mode=mode, step_size=1)
+        out_ref, elapsed_ref = run(with_scalers, signal, args.chunk_size)
+        out_folded, elapsed_folded = run(without, signal, args.chunk_size)
+        print(f"{mode:9s} scaler 合并: 最大差 {np.abs(out_folded - out_ref).max():.2e} 度，"
+              f"{elapsed_ref / len(signal) * 1e3:.3f} -> {elapsed_folded / len(signal) * 1e3:.3f} ms/样本")
+
+    # 4) 长记录：stateful 输出相对窗口预测（零初始状态，与训练一致）的偏差
+    x = scaler_sensor.transform(full_signal)
+    ends = np.arange(args.window_length, len(x) + 1, args.deviation_step)
+    reference = scaler_angle.inverse_transform(offline_windows(model, x, ends, args.window_length))
+    print(f"\n📐 stateful 与窗口预测的偏差（{len(full_signal)} 个样本，{len(ends)} 个窗口，"
+          f"RMSE 按时间分为 4 段）")
+    for state_refresh in (None, args.state_refresh):
+        predictor = StreamingPredictor(model, scaler_sensor, scaler_angle, args.window_length, mode='stateful',
+                                       step_size=1, state_refresh=state_refresh)
+        out, _ = run(predictor, full_signal, chunk_size=25)
+        error = out[ends - 1] - reference
+        per_angle = np.sqrt(np.mean(error ** 2, axis=0))
+        per_segment = [np.sqrt(np.mean(segment ** 2)) for segment in np.array_split(error, 4)]
+        name = '不重置' if state_refresh is None else f'每 {state_refresh} 个样本重建'
+        print(f"{name:<14s} 平均 RMSE {per_angle.mean():8.4f} 度  最大误差 {np.abs(error).max():7.3f} 度  "
+              f"分段 RMSE " + " / ".join(f"{v:.4f}" for v in per_segment))
+        print("    每个角度: " + " ".join(f"{v:7.4f}" for v in per_angle))
@@ -0,0 +1,199 @@
+# clock_sync.py
+# 传感器与光捕的时钟偏移估计：两者降采样到低频统一网格后，用 FFT 互相关找到使
+# 传感器通道（平滑信号及其包络）与角度曲线最相关的时间偏移；可选按分段估计拟合线性漂移。
+import numpy as np
+import pandas as pd
+from scipy import fft as sp_fft
+
+# 互相关使用的降采样频率（Hz），动作频率远低于此
+SYNC_RATE = 50.0
+# 相关峰与平均得分之比低于此值时不采用估计结果
+MIN_PEAK_RATIO = 3.0
+
+
+def _smooth_resample(t_src, values, t_grid, window):
+    """
+    先做宽度为 window 个样本的滑动平均（抗混叠），再线性插值到网格时间点。
+
+    Args:
+        t_src (numpy.ndarray): 递增的 int64 纳秒时间，形状 [N]。
+        values (numpy.ndarray): [C, N] 通道数据。
+        t_grid (numpy.ndarray): int64 纳秒网格时间。
+
+    Returns:
+        numpy.ndarray: [C, len(t_grid)]。
+    """
+    if window > 1:
+        cumsum = np.cumsum(np.pad(values, ((0, 0), (1, 0))), axis=1)
+        smoothed = (cumsum[:, window:] - cumsum[:, :-window]) / window
+        # 平均值对应窗口中心的时间
+        t_src = t_src[window // 2: window // 2 + smoothed.shape[1]]
+        values = smoothed
+    origin = t_grid[0]
+    x_src = (t_src - origin) / 1e9
+    x_grid = (t_grid - origin) / 1e9
+    return np.stack([np.interp(x_grid, x_src, channel) for channel in values])
+
+
+def _standardize(values):
+    """逐通道去均值、除以标准差；常数通道置 0。"""
+    values = values - values.mean(axis=1, keepdims=True)
+    std = values.std(axis=1, keepdims=True)
+    return np.divide(values, std, out=np.zeros_like(values), where=std > 0)
+
+
+def _envelope(values, rate, window_s=0.5):
+    """传感器通道包络：去均值后取绝对值，再做 window_s 秒的滑动平均。"""
+    window = max(int(round(window_s * rate)), 1)
+    magnitude = np.abs(values - values.mean(axis=1, keepdims=True))
+    padded = np.pad(magnitude, ((0, 0), (window // 2, window - 1 - window // 2)), mode='edge')
+    cumsum = np.cumsum(np.pad(padded, ((0, 0), (1, 0))), axis=1)
+    return (cumsum[:, window:] - cumsum[:, :-window]) / window
+
+
+def _principal_components(features, energy=0.999):
+    """
+    将 [C, n] 特征旋转到正交主成分上，只保留累计能量达到 energy 的分量。
+
+    互相关平方和对通道的正交旋转不变，因此得分几乎不变，而需要计算的 FFT 对数减少
+    （各角度之间、各传感器通道之间高度相关）。
+    """
+    # C×C 的 Gram 矩阵特征分解即可得到旋转矩阵，无需对 [C, n] 做 SVD
+    eigenvalues, eigenvectors = np.linalg.eigh(features @ features.T)
+    eigenvalues, eigenvectors = eigenvalues[::-1].clip(min=0), eigenvectors[:, ::-1]
+    cumulative = np.cumsum(eigenvalues) / max(np.sum(eigenvalues), 1e-12)
+    k = min(int(np.searchsorted(cumulative, energy)) + 1, len(eigenvalues))
+    return eigenvectors[:, :k].T @ features
+
+
+def cross_correlation_score(sensor_features, angle_features, max_lag_samples):
+    """
+    FFT 互相关：对每对 (传感器特征, 角度曲线) 计算归一化互相关，取平方后求和作为各时延的得分。
+    两组特征先各自旋转到主成分上（见 _principal_components）。
+
+    时延 k > 0 表示角度曲线比传感器晚 k 个样本（传感器时间需加上 k / rate）。
+
+    Returns:
+        (numpy.ndarray, numpy.ndarray): 时延（样本数，-max_lag..max_lag）及对应得分。
+    """
+    sensor_features = _principal_components(sensor_features)
+    angle_features = _principal_components(angle_features)
+    n = sensor_features.shape[1]
+    # 只需要 |k| <= max_lag_samples 的时延，补零到 n + max_lag_samples 即可避免循环相关混叠
+    nfft = sp_fft.next_fast_len(n + max_lag_samples + 1, real=True)
+    fs = sp_fft.rfft(sensor_features, nfft)
+    fa = sp_fft.rfft(angle_features, nfft)
+    # [C_sensor, C_angle, nfft]：c[k] = sum_t s[t] * a[t + k] / n
+    corr = sp_fft.irfft(np.conj(fs)[:, None, :] * fa[None, :, :], nfft) / n
+    lags = np.arange(-max_lag_samples, max_lag_samples + 1)
+    score = (corr[:, :, lags] ** 2).sum(axis=(0, 1))
+    return lags, score
+
+
+def _peak_lag(lags, score):
+    """得分最大的时延，用抛物线插值细化到亚样本精度。"""
+    i = int(np.argmax(score))
+    if 0 < i < len(score) - 1:
+        y0, y1, y2 = score[i - 1], score[i], score[i + 1]
+        denom = y0 - 2 * y1 + y2
+        if denom != 0:
+            return lags[i] + 0.5 * (y0 - y2) / denom
+    return float(lags[i])
+
+
+def _estimate_window(t_angle, angles, t_sensor, sensors, start_ns, end_ns, max_lag, rate, windows):
+    """在 [start_ns, end_ns] 区间内估计偏移，返回 (偏移秒数, 相关峰与平均得分之比)。"""
+    n_grid = int((end_ns - start_ns) / 1e9 * rate)
+    t_grid = start_ns + np.round(np.arange(n_grid) * 1e9 / rate).astype(np.int64)
+    sensor_smoothed = _smooth_resample(t_sensor, sensors, t_grid, windows['sensor'])
+    sensor_features = _standardize(np.concatenate([sensor_smoothed, _envelope(sensor_smoothed, rate)]))
+    angle_features = _standardize(_smooth_resample(t_angle, angles, t_grid, windows['angle']))
+    lags, score = cross_correlation_score(sensor_features, angle_features, int(np.ceil(max_lag * rate)))
+    return float(_peak_lag(lags, score) / rate), float(score.max() / max(score.mean(), 1e-12))
+
+
+def estimate_clock_offset(t_angle, angles, t_sensor, sensors, max_lag=2.0, rate=SYNC_RATE, drift=False,
+                          n_windows=4):
+    """
+    估计传感器时钟相对光捕时钟的偏移（可选线性漂移）。
+
+    Args:
+        t_angle, t_sensor (numpy.ndarray): 递增的 int64 纳秒时间。
+        angles (numpy.ndarray): [C_angle, N] 角度曲线。
+        sensors (numpy.ndarray): [C_sensor, M] 传感器通道。
+        max_lag (float): 搜索的最大偏移（秒）。
+        rate (float): 降采样频率（Hz）。
+        drift (bool): 是否估计漂移：把重叠区间分成 n_windows 段分别估计偏移，再做线性拟合。
+
+    Returns:
+        dict: offset（秒，传感器时间 + offset = 光捕时间）、drift（秒/秒）、t0（漂移参考时间，纳秒）、
+        peak_ratio（相关峰与平均得分之比，越大越可信）以及各段估计 windows。
+    """
+    start_ns = max(t_angle[0], t_sensor[0])
+    end_ns = min(t_angle[-1], t_sensor[-1])
+    if end_ns - start_ns < 4 * max_lag * 1e9:
+        raise ValueError("❌ 重叠时间太短，无法估计时钟偏移")
+    # 降采样前的抗混叠平均宽度：约等于一个网格间隔内的源样本数
+    windows = {name: max(int(round(len(t) / ((t[-1] - t[0]) / 1e9) / rate)), 1)
+               for name, t in (('sensor', t_sensor), ('angle', t_angle))}
+
+    offset, peak_ratio = _estimate_window(t_angle, angles, t_sensor, sensors, start_ns, end_ns, max_lag, rate,
+                                          windows)
+    result = {'offset': offset, 'drift': 0.0, 't0': int(start_ns), 'peak_ratio': peak_ratio, 'windows': []}
+    if drift:
+        bounds = np.linspace(start_ns, end_ns, n_windows + 1).astype(np.int64)
+        centers, offsets = [], []
+        for w0, w1 in zip(bounds[:-1], bounds[1:]):
+            window_offset, window_ratio = _estimate_window(t_angle, angles, t_sensor, sensors, w0, w1, max_lag,
+                                                           rate, windows)
+            centers.append((w0 + w1) / 2)
+            offsets.append(window_offset)
+            result['windows'].append({'center': pd.Timestamp(int((w0 + w1) // 2)).isoformat(),
+                                      'offset': window_offset, 'peak_ratio': window_ratio})
+        slope, intercept = np.polyfit((np.asarray(centers) - start_ns) / 1e9, offsets, 1)
+        result.update(offset=float(intercept), drift=float(slope))
+    return result
+
+
+def clock_delta(sync, t_ns):
+    """按估计结果计算各时间点的修正量（秒）：offset + drift * (t - t0)。"""
+    return sync['offset'] + sync['drift'] * (np.asarray(t_ns, dtype=np.int64) - sync['t0']) / 1e9
+
+
+def synchronize_sensor(df_angle, df_s, max_lag=2.0, rate=SYNC_RATE, drift=False, min_peak_ratio=MIN_PEAK_RATIO):
+    """
+    估计时钟偏移并修正传感器数据的时间索引。
+
+    Args:
+        df_angle: 光捕数据，'Time' 列 + angle* 列。
+        df_s: 传感器数据，datetime index + s1..sN 列。
+        min_peak_ratio (float): 相关峰比低于该值时认为估计不可信，不做修正（offset、drift 置 0）。
+
+    Returns:
+        (pandas.DataFrame, dict): 时间已修正的传感器数据（数据不复制，只替换 index），以及估计结果
+        （applied 表示是否已修正，estimated_offset / estimated_drift 为原始估计值）。
+    """
+    sensor_cols = [col for col in df_s.columns if col.startswith('s') and col[1:].isdigit()]
+    angle_cols = [col for col in df_angle.columns if col.startswith('angle')]
+    t_angle = np.asarray(pd.DatetimeIndex(df_angle['Time']).as_unit('ns').asi8)
+    t_sensor = np.asarray(pd.DatetimeIndex(df_s.index).as_unit('ns').asi8)
+    angle_order = np.argsort(t_angle, kind='stable')
+    sensor_order = np.argsort(t_sensor, kind='stable')
+
+    angles = np.nan_to_num(df_angle[angle_cols].to_numpy(dtype=np.float64)[angle_order].T)
+    sensors = np.nan_to_num(df_s[sensor_cols].to_numpy(dtype=np.float64)[sensor_order].T)
+    sync = estimate_clock_offset(t_angle[angle_order], angles, t_sensor[sensor_order], sensors, max_lag, rate,
+                                 drift)
+
+    print(f"⏱️ 时钟偏移估计：{sync['offset'] * 1e3:.1f} ms，漂移 {sync['drift'] * 1e6:.1f} ppm，"
+          f"相关峰比 {sync['peak_ratio']:.2f}")
+    sync.update(estimated_offset=sync['offset'], estimated_drift=sync['drift'],
+                applied=sync['peak_ratio'] >= min_peak_ratio)
+    if not sync['applied']:
+        print(f"⚠️ 相关峰比低于 {min_peak_ratio}，估计不可信，不修正时钟")
+        sync.update(offset=0.0, drift=0.0)
+        return df_s, sync
+
+    corrected = t_sensor + np.round(clock_delta(sync, t_sensor) * 1e9).astype(np.int64)
+    df_synced = df_s.set_axis(pd.DatetimeIndex(corrected.view('datetime64[ns]'), name=df_s.index.name), axis=0)
+    return df_synced, sync
@@ -0,0 +1,176 @@
+# export_model.py
+# 部署用模型导出：MultiHeadLSTM + 传感器 / 角度标准化参数 + 窗口长度、通道数打包成一个文件，
+# 输入原始传感器窗口、直接输出角度（度）。支持 TorchScript（.pt）和 ONNX（.onnx，需要 onnx / onnxruntime）。
+#
+#   python export_model.py --checkpoint ./result/model.ckpt --output ./result/model.pt
+import argparse
+import json
+import os
+import pickle
+import numpy as np
+import torch
+import torch.nn as nn
+from model import MultiHeadLSTM, fold_scalers
+
+METADATA_NAME = 'metadata.json'
+ONNX_OPSET = 17
+
+
+class PackagedModel(nn.Module):
+    """
+    原始传感器窗口 [batch, window_length, n_channels] -> 角度 [batch, output_size]（度）。
+    标准化 / 反标准化已由 fold_scalers 合并进模型权重，前向中只需把 NaN / Inf 置 0。
+    """
+    window_length: int
+    n_channels: int
+
+    def __init__(self, model, scaler_sensor, scaler_angle, window_length):
+        super().__init__()
+        self.model = fold_scalers(model, scaler_sensor.mean_, scaler_sensor.scale_,
+                                  scaler_angle.mean_, scaler_angle.scale_)
+        self.window_length = int(window_length)
+        self.n_channels = int(len(scaler_sensor.mean_))
+
+    def forward(self, x):
+        return self.model(torch.nan_to_num(x, nan=0.0, posinf=0.0, neginf=0.0))
+
+
+def build_metadata(packaged, model_kwargs, scaler_sensor, scaler_angle):
+    """导出文件中记录的元数据：窗口长度、通道数、模型结构参数和（已合并进权重的）标准化参数。"""
+    return {
+        'window_length': packaged.window_length,
+        'n_channels': packaged.n_channels,
+        'model': 'MultiHeadLSTM',
+        'model_kwargs': model_kwargs,
+        'x_mean': np.asarray(scaler_sensor.mean_).tolist(),
+        'x_scale': np.asarray(scaler_sensor.scale_).tolist(),
+        'y_mean': np.asarray(scaler_angle.mean_).tolist(),
+        'y_scale': np.asarray(scaler_angle.scale_).tolist(),
+    }
+
+
+def export_torchscript(packaged, path, metadata):
+    """导出 TorchScript；元数据以 metadata.json 附加文件写入同一个文件。"""
+    scripted = torch.jit.script(packaged.eval())
+    tmp_path = f"{path}.tmp"
+    torch.jit.save(scripted, tmp_path, _extra_files={METADATA_NAME: json.dumps(metadata)})
+    os.replace(tmp_path, path)
+
+
+def export_onnx(packaged, path, metadata):
+    """导出 ONNX（batch 维可变）；元数据写入模型的 metadata_props。"""
+    try:
+        import onnx
+    except ImportError:
+        raise ImportError("❌ 导出 ONNX 需要安装 onnx（pip install onnx onnxruntime），或改用 .pt（TorchScript）输出")
+    example = torch.zeros(1, packaged.window_length, packaged.n_channels)
+    tmp_path = f"{path}.tmp"
+    torch.onnx.export(packaged.eval(), (example,), tmp_path, input_names=['sensor'], output_names=['angle'],
+                      dynamic_axes={'sensor': {0: 'batch'}, 'angle': {0: 'batch'}}, opset_version=ONNX_OPSET,
+                      dynamo=False)
+    onnx_model = onnx.load(tmp_path)
+    onnx_model.metadata_props.add(key=METADATA_NAME, value=json.dumps(metadata))
+    onnx.save(onnx_model, tmp_path)
+    os.replace(tmp_path, path)
+
+
+def export_model(checkpoint, output, sensor_scaler='sensor_scaler.pkl', angle_scaler='angle_scaler.pkl',
+                 window_length=80, input_size=6, hidden_size=256, num_layers=3, output_size=9, dropout=0.1):
+    """
+    读取训练好的权重和 scaler，按输出文件扩展名导出为 TorchScript（.pt）或 ONNX（.onnx）。
+
+    Returns:
+        dict: 写入的元数据。
+    """
+    model_kwargs = dict(input_size=input_size, hidden_size=hidden_size, num_layers=num_layers, dropout=dropout,
+                        output_size=output_size)
+    model = MultiHeadLSTM(**model_kwargs)
+    model.load_state_dict(torch.load(checkpoint, map_location='cpu'))
+    with open(sensor_scaler, 'rb') as f:
+        scaler_sensor = pickle.load(f)
+    with open(angle_scaler, 'rb') as f:
+        scaler_angle = pickle.load(f)
+    if len(scaler_sensor.mean_) != input_size:
+        raise ValueError(f"❌ 传感器 scaler 有 {len(scaler_sensor.mean_)} 个通道，模型输入为 {input_size}")
+
+    packaged = PackagedModel(model, scaler_sensor, scaler_angle, window_length)
+    metadata = build_metadata(packaged, model_kwargs, scaler_sensor, scaler_angle)
+    if output.endswith('.onnx'):
+        export_onnx(packaged, output, metadata)
+    else:
+        export_torchscript(packaged, output, metadata)
+    print(f"✅ 模型已导出: {output}（窗口 {window_length}，{input_size} 通道 -> {output_size} 个角度）")
+    return metadata
+
+
+class InferenceRuntime:
+    """
+    导出模型的 CPU 推理：.pt 用 TorchScript（freeze + optimize_for_inference），.onnx 用 ONNX Runtime。
+
+    Args:
+        path (str): 导出的模型文件。
+        num_threads (int): 推理线程数（单窗口推理时 1~2 个线程通常延迟最低）。
+
+    Attributes:
+        metadata (dict): 导出时写入的元数据（window_length、n_channels、标准化参数等）。
+    """
+
+    def __init__(self, path, num_threads=1):
+        self.path = path
+        if path.endswith('.onnx'):
+            try:
+                import onnxruntime as ort
+            except ImportError:
+                raise ImportError("❌ 运行 ONNX 模型需要安装 onnxruntime（pip install onnxruntime），或改用 .pt 模型")
+            options = ort.SessionOptions()
+            options.intra_op_num_threads = num_threads
+            options.inter_op_num_threads = 1
+            options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+            self.session = ort.InferenceSession(path, options, providers=['CPUExecutionProvider'])
+            self.metadata = json.loads(self.session.get_modelmeta().custom_metadata_map[METADATA_NAME])
+            self.module = None
+        else:
+            torch.set_num_threads(num_threads)
+            extra_files = {METADATA_NAME: ''}
+            module = torch.jit.load(path, map_location='cpu', _extra_files=extra_files)
+            self.metadata = json.loads(extra_files[METADATA_NAME])
+            self.module = torch.jit.optimize_for_inference(torch.jit.freeze(module.eval()))
+            self.session = None
+        self.window_length = self.metadata['window_length']
+        self.n_channels = self.metadata['n_channels']
+
+    def predict(self, windows):
+        """
+        Args:
+            windows (numpy.ndarray): 原始传感器窗口，[batch, window_length, n_channels] 或 [window_length, n_channels]。
+
+        Returns:
+            numpy.ndarray: 角度（度），[batch, output_size]。
+        """
+        windows = np.asarray(windows, dtype=np.float32)
+        if windows.ndim == 2:
+            windows = windows[None]
+        if windows.shape[1:] != (self.window_length, self.n_channels):
+            raise ValueError(f"❌ 输入窗口形状应为 [batch, {self.window_length}, {self.n_channels}]，"
+                             f"实际为 {list(windows.shape)}")
+        if self.session is not None:
+            return self.session.run(None, {'sensor': windows})[0]
+        with torch.inference_mode():
+            return self.module(torch.from_numpy(windows)).numpy()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="导出 MultiHeadLSTM + scaler 为 TorchScript / ONNX 部署文件")
+    parser.add_argument('--checkpoint', default='./result/model.ckpt')
+    parser.add_argument('--sensor-scaler', default='sensor_scaler.pkl')
+    parser.add_argument('--angle-scaler', default='angle_scaler.pkl')
+    parser.add_argument('--output', default='./result/model.pt', help='.pt（TorchScript）或 .onnx')
+    parser.add_argument('--window-length', type=int, default=80)
+    parser.add_argument('--input-size', type=int, default=6)
+    parser.add_argument('--hidden-size', type=int, default=256)
+    parser.add_argument('--num-layers', type=int, default=3)
+    parser.add_argument('--output-size', type=int, default=9)
+    args = parser.parse_args()
+
+    export_model(args.checkpoint, args.output, args.sensor_scaler, args.angle_scaler, args.window_length,
+                 args.input_size, args.hidden_size, args.num_layers, args.output_size)
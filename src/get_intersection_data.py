@@ -1,19 +1,45 @@
 import numpy as np
 import pandas as pd
 from datetime import datetime, timedelta
+from clock_sync import synchronize_sensor, clock_delta
 
-def get_intersection_data(df_angle: pd.DataFrame, df_s: pd.DataFrame) -> pd.DataFrame:
+def get_intersection_data(df_angle: pd.DataFrame, df_s: pd.DataFrame, mode: str = 'nearest', sync: bool = False,
+                          max_lag: float = 2.0, drift: bool = False, **align_kwargs) -> pd.DataFrame:
     """
     获取光捕和传感器数据的交集，并按时间对齐合并。
     
     参数:
         df_angle: 光捕数据，要求有 'Time' 列，且为 datetime 类型。
         df_s: 传感器数据，要求 index 是 datetime 类型。
+        mode: 'nearest'（默认，传感器时间点上取最近的光捕帧）或 'interp'（两者插值到统一的
+            固定频率时间网格，见 align_to_grid，align_kwargs 传给该函数）。
+        sync: 合并前先用互相关估计传感器时钟偏移并修正（见 clock_sync），估计的修正量（秒）
+            写入 'Time_delta' 列，估计结果保存在 datafinal.attrs['clock_sync']。
+        max_lag: 时钟偏移的最大搜索范围（秒）。
+        drift: 是否同时估计时钟漂移。
         
     返回:
-        合并后的交集 DataFrame，包括时间戳、传感器值和角度值。
+        合并后的交集 DataFrame，包括时间差、时间戳、传感器值和角度值。
     """
+    sync_result = None
+    if sync:
+        df_s, sync_result = synchronize_sensor(df_angle, df_s, max_lag=max_lag, drift=drift)
 
+    if mode == 'interp':
+        datafinal = align_to_grid(df_angle, df_s, **align_kwargs)
+    elif mode == 'nearest':
+        datafinal = _merge_nearest(df_angle, df_s)
+    else:
+        raise ValueError(f"❌ 未知的对齐方式: {mode}")
+
+    if sync_result is not None:
+        datafinal['Time_delta'] = clock_delta(sync_result, datafinal['Time_angle'].astype('int64').to_numpy())
+    datafinal.attrs['clock_sync'] = sync_result
+    return datafinal
+
+
+def _merge_nearest(df_angle: pd.DataFrame, df_s: pd.DataFrame) -> pd.DataFrame:
+    """传感器时间点上取最近的光捕帧（merge_asof）。"""
     # 类型检查输出
     print("🧪 df_angle['Time'] 类型：", type(df_angle['Time'].iloc[0]) if 'Time' in df_angle.columns else '不存在')
     print("🧪 df_s index 类型：", type(df_s.index[0]))
@@ -44,7 +70,7 @@ def get_intersection_data(df_angle: pd.DataFrame, df_s: pd.DataFrame) -> pd.Data
     nan_count = merged_df['Frame'].isna().sum() if 'Frame' in merged_df.columns else 0
     print(f'匹配成功的数量: {len(merged_df) - nan_count}')
 
-    # ✅ 添加时间差列（这里先设为 0，可改为实际 delta）
+    # ✅ 添加时间差列（启用时钟同步时由 get_intersection_data 写入估计的修正量）
     merged_df.insert(0, 'Time_delta', 0.0)
 
     # ✅ 将 Time_angle 列移至第3列
@@ -55,13 +81,283 @@ def get_intersection_data(df_angle: pd.DataFrame, df_s: pd.DataFrame) -> pd.Data
     #                       'angle1', 'angle2', 'angle3', 'angle4', 'angle5',
     #                       'angle6', 'angle7', 'angle8', 'angle9', 'angle10']]
     
-    datafinal = merged_df[['Time_angle',
-                       's1', 's2', 's3', 's4', 's5', 's6', 's7', 's8',
-                       's9', 's10', 's11', 's12', 's13', 's14', 's15', 's16',
-                       'angle1', 'angle2', 'angle3', 'angle4', 'angle5', 'angle6',
-                       'angle7', 'angle8', 'angle9', 'angle10', 'angle11', 'angle12',
-                       'angle13', 'angle14', 'angle15', 'angle16', 'angle17', 'angle18']]
+    #datafinal = merged_df[['Time_angle',
+    #                   's1', 's2', 's3', 's4', 's5', 's6', 's7', 's8',
+    #                   's9', 's10', 's11', 's12', 's13', 's14', 's15', 's16',
+    #                   'angle1', 'angle2', 'angle3', 'angle4', 'angle5', 'angle6',
+    #                   'angle7', 'angle8', 'angle9', 'angle10', 'angle11', 'angle12',
+    #                   'angle13', 'angle14', 'angle15', 'angle16', 'angle17', 'angle18']]
+
+    # 传感器列与角度列按实际存在的列选取（6/16 通道，10/18 角度均适用）
+    sensor_cols = [col for col in df_s.columns if col.startswith('s') and col[1:].isdigit()]
+    angle_cols = [col for col in df_angle.columns if col.startswith('angle')]
+    datafinal = merged_df[['Time_delta', 'Time_angle'] + sensor_cols + angle_cols]
 
 
     datafinal.reset_index(drop=True, inplace=True)
     return datafinal
+
+
+# 插值按网格分块进行，临时数组只有块大小
+GRID_CHUNK_SIZE = 1 << 15
+
+
+def _time_ns(values) -> np.ndarray:
+    """DatetimeIndex / datetime Series -> int64 纳秒数组。"""
+    return np.asarray(pd.DatetimeIndex(values).as_unit('ns').asi8)
+
+
+def _sorted_unique(t: np.ndarray):
+    """
+    返回严格递增的时间和对应的原始行号（重复时间戳保留第一个）；已有序且无重复时行号为 None。
+    """
+    order = None
+    if np.any(t[1:] < t[:-1]):
+        order = np.argsort(t, kind='stable')
+        t = t[order]
+    duplicated = np.flatnonzero(t[1:] == t[:-1]) + 1
+    if order is None and len(duplicated) == 0:
+        return t, None
+    keep = np.ones(len(t), dtype=bool)
+    keep[duplicated] = False
+    rows = np.flatnonzero(keep) if order is None else order[keep]
+    return t[keep], rows
+
+
+def _channel_values(df: pd.DataFrame, cols, rows) -> np.ndarray:
+    """取出 [C, N] 的通道数据（每行一个通道，内存连续）。"""
+    values = np.ascontiguousarray(df[cols].to_numpy(dtype=np.float64).T)
+    return values if rows is None else values[:, rows]
+
+
+def _slope_weights(h_before, h_after):
+    """
+    中间样本处导数（过相邻三个样本的二次曲线在该点的斜率）写成三个样本的加权系数，适用于非均匀间隔。
+    一侧没有邻点时该侧间隔传 inf，系数自然退化为另一侧的单侧差分。
+    """
+    c_before = -1.0 / (h_before * (1.0 + h_before / h_after))
+    c_after = 1.0 / (h_after * (1.0 + h_after / h_before))
+    return c_before, -(c_before + c_after), c_after
+
+
+def _cubic_weights(t, right, t_query):
+    """
+    三次 Hermite 插值（两端斜率取相邻三个样本的二阶精度差分）写成四个相邻样本的加权和：
+    y = w[0] * y[i-1] + w[1] * y[i] + w[2] * y[i+1] + w[3] * y[i+2]，其中 i = right - 1。
+    只用查询点附近的四个样本，不做全局拟合；两端缺少的邻点用端点代替（退化为单侧差分）。
+
+    Args:
+        t (numpy.ndarray): 严格递增的 int64 纳秒时间（至少 2 个）。
+        right (numpy.ndarray): 查询点右侧样本下标，已限制在 [1, len(t) - 1]。
+        t_query (numpy.ndarray): 查询时间（int64 纳秒）。
+
+    Returns:
+        (tuple, tuple): 四个样本下标数组和对应的权重数组。
+    """
+    left = right - 1
+    prev = np.maximum(left - 1, 0)
+    after = np.minimum(right + 1, len(t) - 1)
+    t_left, t_right = t[left], t[right]
+    h = (t_right - t_left).astype(np.float64)
+    x = (t_query - t_left) / h
+    x2 = x * x
+    x3 = x2 * x
+    h01 = 3 * x2 - 2 * x3
+    h10 = (x3 - 2 * x2 + x) * h   # 左端斜率项
+    h11 = (x3 - x2) * h           # 右端斜率项
+    h_prev = (t_left - t[prev]).astype(np.float64)
+    h_after = (t[after] - t_right).astype(np.float64)
+    h_prev[left == 0] = np.inf
+    h_after[right == len(t) - 1] = np.inf
+    lb, lm, la = _slope_weights(h_prev, h)
+    rb, rm, ra = _slope_weights(h, h_after)
+    return (prev, left, right, after), (h10 * lb, 1 - h01 + h10 * lm + h11 * rb, h01 + h10 * la + h11 * rm, h11 * ra)
+
+
+class _GridInterpolator:
+    """
+    单一模态到网格时间点的插值：每块网格点求一次右侧样本下标（searchsorted），
+    同时得到线性插值权重、两侧样本间隔和到最近样本的距离。
+
+    Args:
+        t_src (numpy.ndarray): 严格递增的 int64 纳秒时间。
+        values (numpy.ndarray): [C, N] 通道数据（可含 NaN，如光捕标记点丢失）。
+        method (str): 'linear' 或 'spline'（三次 Hermite，见 _cubic_weights）。
+        max_gap (float): 样条插值时，通道内相邻有效样本的间隔超过该值（秒）的网格点置为 NaN；
+            None 时与线性插值一致，两侧样本任一为 NaN 即为 NaN。
+    """
+
+    def __init__(self, t_src, values, method, max_gap=None):
+        self.t_src = t_src
+        self.values = values
+        self.method = method
+        self.max_gap_ns = None if max_gap is None else max_gap * 1e9
+        if method == 'spline':
+            # 含 NaN 的通道只用有效样本插值，记录其有效样本时间和数值
+            finite = np.isfinite(values)
+            complete = finite.all(axis=1)
+            self.complete = np.flatnonzero(complete)
+            self.partial = [(channel, t_src[finite[channel]], values[channel, finite[channel]])
+                            for channel in np.flatnonzero(~complete)]
+
+    def _spline(self, t_grid, right, out):
+        if len(self.complete):
+            indices, weights = _cubic_weights(self.t_src, right, t_grid)
+            buffer = np.empty(len(t_grid), dtype=out.dtype)
+            for channel in self.complete:
+                values, row = self.values[channel], out[channel]
+                np.take(values, indices[0], out=row, mode='clip')  # 下标已在范围内，clip 模式不做额外缓冲
+                row *= weights[0]
+                for index, weight in zip(indices[1:], weights[1:]):
+                    np.take(values, index, out=buffer, mode='clip')
+                    buffer *= weight
+                    row += buffer
+        for channel, t_valid, v_valid in self.partial:
+            if len(t_valid) < 2:
+                out[channel] = np.nan
+                continue
+            valid_right = np.searchsorted(t_valid, t_grid)
+            outside = (valid_right == 0) | (valid_right == len(t_valid))
+            np.clip(valid_right, 1, len(t_valid) - 1, out=valid_right)
+            indices, weights = _cubic_weights(t_valid, valid_right, t_grid)
+            out[channel] = sum(v_valid[index] * weight for index, weight in zip(indices, weights))
+            if self.max_gap_ns is None:
+                # 与线性插值一致：两侧原始样本任一缺失即为 NaN
+                invalid = ~(np.isfinite(self.values[channel, right - 1]) & np.isfinite(self.values[channel, right]))
+            else:
+                # 缺失段按有效样本间隔判断：不超过 max_gap 的短缺失由样条补齐，超过的置为 NaN
+                invalid = outside | (t_valid[valid_right] - t_valid[valid_right - 1] > self.max_gap_ns)
+            out[channel, invalid] = np.nan
+
+    def __call__(self, t_grid, out):
+        """
+        在 t_grid（网格中的一块）上插值写入 out（[C, len(t_grid)]）。
+
+        Returns:
+            (numpy.ndarray, numpy.ndarray): 每个网格点两侧样本的间隔和到最近样本的距离（int64 纳秒）。
+        """
+        right = np.searchsorted(self.t_src, t_grid)
+        np.clip(right, 1, len(self.t_src) - 1, out=right)
+        left = right - 1
+        t_left = self.t_src[left]
+        gap_ns = self.t_src[right] - t_left
+        offset_ns = t_grid - t_left
+        weight = offset_ns / gap_ns
+
+        if self.method == 'linear':
+            buffer = np.empty(len(t_grid), dtype=out.dtype)
+            for channel, row in zip(self.values, out):
+                np.take(channel, left, out=buffer, mode='clip')  # 下标已在范围内，clip 模式不做额外缓冲
+                np.take(channel, right, out=row, mode='clip')
+                row -= buffer
+                row *= weight
+                row += buffer
+        else:
+            self._spline(t_grid, right, out)
+
+        # 到最近样本的距离：min(t - t_left, t_right - t)
+        np.minimum(offset_ns, gap_ns - offset_ns, out=offset_ns)
+        return gap_ns, offset_ns
+
+
+def align_to_grid(df_angle: pd.DataFrame, df_s: pd.DataFrame, rate: float = None, method: str = 'linear',
+                  max_gap: float = None) -> pd.DataFrame:
+    """
+    将光捕角度和传感器数据插值到交集区间内统一的固定频率时间网格上。
+
+    只使用 int64 纳秒时间和 numpy 数组，不复制、切片 DataFrame，也不做 merge；
+    网格分块处理，除输出外的临时内存与记录长度无关。
+
+    默认网格为光捕帧率：输出行数与光捕帧数相当，远少于传感器原始采样率下的行数。30 分钟记录上
+    （bench_alignment.py）线性插值耗时约为 'nearest' 的一半，三次插值与 'nearest' 相当，峰值内存都不到
+    'nearest' 的一半。需要按传感器原始采样率输出时使用 mode='nearest'：每个输出值只取一个样本，
+    比在同样密的网格上插值更快。
+
+    Args:
+        df_angle: 光捕数据，要求有 'Time' 列（datetime）。
+        df_s: 传感器数据，index 为 datetime。
+        rate (float): 网格频率（Hz），默认取光捕的中位帧率。
+        method (str): 'linear' 或 'spline'（三次 Hermite 插值，只用相邻四个样本，含 NaN 的通道只用有效样本）。
+        max_gap (float): 可选，最大允许间隔（秒）；任一模态在网格点两侧的样本间隔超过该值时丢弃该点。
+            样条插值时还用于通道内的缺失段（如标记点丢失）：不超过 max_gap 的短缺失由样条补齐，
+            更长的缺失段置为 NaN；不指定时缺失样本附近的网格点为 NaN（与线性插值一致）。
+
+    Returns:
+        pandas.DataFrame: 列与 'nearest' 方式相同：'Time_delta'、'Time_angle'（网格时间）、s1..sN、angle*；
+        对齐误差报告保存在 datafinal.attrs['alignment']。
+    """
+    if method not in ('linear', 'spline'):
+        raise ValueError(f"❌ 未知的插值方法: {method}")
+    sensor_cols = [col for col in df_s.columns if col.startswith('s') and col[1:].isdigit()]
+    angle_cols = [col for col in df_angle.columns if col.startswith('angle')]
+
+    # 插值要求时间严格递增
+    t_angle, angle_rows = _sorted_unique(_time_ns(df_angle['Time']))
+    t_sensor, sensor_rows = _sorted_unique(_time_ns(df_s.index))
+
+    s1 = max(t_angle[0], t_sensor[0])
+    e1 = min(t_angle[-1], t_sensor[-1])
+    if rate is None:
+        rate = 1e9 / np.median(np.diff(t_angle))
+    step_ns = 1e9 / rate
+    n_grid = int(np.floor((e1 - s1) / step_ns)) + 1 if e1 > s1 else 0
+
+    report = {'rate': float(rate), 'method': method, 'n_grid': n_grid, 'n_dropped': 0}
+    if n_grid == 0:
+        print('⚠️ 光捕与传感器数据没有交集')
+        datafinal = pd.DataFrame(columns=['Time_delta', 'Time_angle'] + sensor_cols + angle_cols)
+        datafinal.attrs['alignment'] = report
+        return datafinal
+
+    t_grid = np.arange(n_grid, dtype=np.float64)
+    t_grid *= step_ns
+    t_grid = np.round(t_grid, out=t_grid).astype(np.int64)
+    t_grid += s1
+    n_sensor = len(sensor_cols)
+    modalities = {
+        'sensor': (_GridInterpolator(t_sensor, _channel_values(df_s, sensor_cols, sensor_rows), method,
+                                     max_gap), slice(0, n_sensor)),
+        'angle': (_GridInterpolator(t_angle, _channel_values(df_angle, angle_cols, angle_rows), method,
+                                    max_gap), slice(n_sensor, None)),
+    }
+
+    # 两种模态的插值结果按通道写入同一个 [C, G] 数组，转置后即 DataFrame 的内部布局，不再复制
+    out = np.empty((n_sensor + len(angle_cols), n_grid), dtype=np.float64)
+    keep = np.ones(n_grid, dtype=bool)
+    stats = {name: {'error_sum': 0.0, 'error_max': 0.0, 'gap_max': 0.0} for name in modalities}
+    for g0 in range(0, n_grid, GRID_CHUNK_SIZE):
+        chunk = slice(g0, min(g0 + GRID_CHUNK_SIZE, n_grid))
+        gaps, errors = {}, {}
+        for name, (interpolator, rows) in modalities.items():
+            gaps[name], errors[name] = interpolator(t_grid[chunk], out[rows, chunk])
+        if max_gap is not None:
+            keep[chunk] = (gaps['sensor'] <= max_gap * 1e9) & (gaps['angle'] <= max_gap * 1e9)
+        chunk_keep = keep[chunk]
+        for name in modalities:
+            kept_errors = errors[name] if max_gap is None else errors[name][chunk_keep]
+            stats[name]['error_sum'] += kept_errors.sum() / 1e9
+            stats[name]['error_max'] = max(stats[name]['error_max'], kept_errors.max(initial=0) / 1e9)
+            stats[name]['gap_max'] = max(stats[name]['gap_max'], gaps[name].max() / 1e9)
+
+    n_kept = int(keep.sum())
+    report['n_dropped'] = n_grid - n_kept
+    for name, stat in stats.items():
+        report.update({
+            f'{name}_error_mean_ms': float(stat['error_sum'] / n_kept * 1e3) if n_kept else float('nan'),
+            f'{name}_error_max_ms': float(stat['error_max'] * 1e3) if n_kept else float('nan'),
+            f'{name}_max_gap_ms': float(stat['gap_max'] * 1e3),
+        })
+
+    print(f'交集起始：\t\t{pd.Timestamp(s1)}')
+    print(f'交集结束：\t\t{pd.Timestamp(e1)}')
+    print(f'网格频率(Hz)：\t{rate:.2f}，网格点 {n_grid}，因间隔过大丢弃 {report["n_dropped"]}')
+    print(f'对齐误差(ms)：\t光捕 平均 {report["angle_error_mean_ms"]:.3f} / 最大 {report["angle_error_max_ms"]:.3f}，'
+          f'传感器 平均 {report["sensor_error_mean_ms"]:.3f} / 最大 {report["sensor_error_max_ms"]:.3f}')
+
+    if report['n_dropped']:
+        out, t_grid = out[:, keep], t_grid[keep]
+    datafinal = pd.DataFrame(out.T, columns=sensor_cols + angle_cols, copy=False)
+    datafinal.insert(0, 'Time_angle', t_grid.view('datetime64[ns]'))
+    datafinal.insert(0, 'Time_delta', 0.0)
+    datafinal.attrs['alignment'] = report
+    return datafinal
@@ -0,0 +1,347 @@
+# inference_server.py
+# 多路数据流的本地推理服务（asyncio，TCP 或 Unix socket）：每个连接是一路穿戴设备数据流，
+# 逐行发送与串口设备相同格式的传感器帧（'v1,v2,...'），服务端返回 '样本序号,角度1,...,角度N'。
+# 各连接的帧进入同一个队列，在延迟预算内凑成一个 batch，每个 batch 只调用一次模型；
+# 每路数据流的 LSTM 状态（'stateful'）或窗口缓存（'windowed'）单独保存；'stateful' 与 StreamingPredictor 相同，
+# 每隔 state_refresh 个样本用最近一个窗口从零状态重建状态（模型只在零初始状态的窗口上训练过）。
+# 队列有上限，推理跟不上时新到的帧直接丢弃（计入 'shed'），延迟不会无限增长。
+#
+#   python inference_server.py --checkpoint ./result/model_folded.ckpt --port 8765
+import argparse
+import asyncio
+import itertools
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import torch
+from model import MultiHeadLSTM
+from realtime_pipeline import parse_sensor_line
+from streaming import append_history, refresh_due
+
+# 连接建立后可选的首行：'STREAM <名称>'，否则按连接顺序编号
+STREAM_HEADER = 'STREAM'
+
+
+class _Stream:
+    """一路数据流的状态。"""
+
+    def __init__(self, name, writer):
+        self.name = name
+        self.writer = writer
+        self.n_samples = 0      # 已收到的有效帧数
+        self.state = None       # 'stateful'：LSTM 的 (h, c)，batch 维大小为 1
+        self.history = None     # 'windowed' 或 'stateful' 重建状态用：最近 window_length 帧（已标准化）
+        self.closed = False
+
+
+class InferenceServer:
+    """
+    多路数据流的微批推理服务。
+
+    Args:
+        model (MultiHeadLSTM): 推理模型（可以是 fold_scalers 合并了 scaler 的模型，或 precision 中的量化模型）。
+        scaler_sensor, scaler_angle: 训练时的 StandardScaler；模型已合并 scaler 时传 None。
+        window_length (int): 窗口长度（'windowed' 模式，以及 'stateful' 重建状态用的窗口）。
+        mode (str): 'stateful'（每帧推进各自的 LSTM 状态）或 'windowed'（每次对完整窗口计算）。
+        state_refresh (int): 'stateful' 模式下重建 LSTM 状态的间隔（样本数），规则与 StreamingPredictor 相同；
+            None 表示状态不重置。
+        step_size (int): 每路数据流每隔多少帧输出一次预测。
+        max_batch (int): 一个 batch 最多包含的帧数。
+        max_wait_ms (float): 第一帧到达后最多等待多久凑 batch（延迟预算）。
+        n_channels (int): 每帧的通道数。
+        max_queue (int): 等待推理的帧数上限，队列满时丢弃新到的帧（计入 counters['shed']）。
+        device (torch.device): 推理设备，默认取模型所在设备。
+    """
+
+    def __init__(self, model, scaler_sensor=None, scaler_angle=None, window_length=80, mode='stateful',
+                 step_size=1, max_batch=64, max_wait_ms=5.0, n_channels=6, max_queue=4096, device=None,
+                 state_refresh=None):
+        if mode not in ('stateful', 'windowed'):
+            raise ValueError(f"❌ 未知的推理模式: {mode}")
+        self.model = model.eval()
+        self.scaler_sensor = scaler_sensor
+        self.scaler_angle = scaler_angle
+        self.window_length = window_length
+        self.mode = mode
+        self.state_refresh = state_refresh
+        self.step_size = step_size
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1e3
+        self.n_channels = n_channels
+        self.max_queue = max_queue
+        self.device = device if device is not None else next(model.parameters()).device
+        self.streams = set()
+        self._ids = itertools.count()
+        self._queue = None
+        self._executor = ThreadPoolExecutor(max_workers=1)  # 推理串行执行，保证每路数据流的顺序
+        self._zero_state = None
+        self.latencies = deque(maxlen=100000)
+        self.counters = {'frames': 0, 'predictions': 0, 'batches': 0, 'batch_frames': 0, 'malformed': 0,
+                         'shed': 0, 'errors': 0}
+        self.started = None
+
+    # ---------------- 网络 ----------------
+    async def start(self, host='127.0.0.1', port=8765, unix_path=None):
+        """启动监听和批处理任务，返回 asyncio Server。"""
+        self._queue = asyncio.Queue(maxsize=self.max_queue)
+        self.started = time.perf_counter()
+        self._batch_task = asyncio.get_running_loop().create_task(self._batch_loop())
+        if unix_path:
+            return await asyncio.start_unix_server(self._handle_client, path=unix_path)
+        return await asyncio.start_server(self._handle_client, host, port)
+
+    async def stop(self):
+        self._batch_task.cancel()
+        try:
+            await self._batch_task
+        except asyncio.CancelledError:
+            pass
+        self._executor.shutdown(wait=True)
+
+    async def _handle_client(self, reader, writer):
+        stream = _Stream(f'stream-{next(self._ids)}', writer)
+        first = True
+        try:
+            while True:
+                raw = await reader.readline()
+                if not raw:
+                    break
+                arrival = time.perf_counter()
+                if first:
+                    first = False
+                    line = raw.decode('latin1', errors='ignore').strip()
+                    if line.startswith(STREAM_HEADER):
+                        stream.name = line[len(STREAM_HEADER):].strip() or stream.name
+                        continue
+                self.streams.add(stream)
+                values = parse_sensor_line(raw, self.n_channels)
+                if values is None:
+                    self.counters['malformed'] += 1
+                    continue
+                try:
+                    self._queue.put_nowait((stream, values, arrival))
+                except asyncio.QueueFull:
+                    self.counters['shed'] += 1
+        finally:
+            stream.closed = True
+            self.streams.discard(stream)
+            writer.close()
+
+    # ---------------- 微批 ----------------
+    async def _batch_loop(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            items = [await self._queue.get()]
+            deadline = loop.time() + self.max_wait
+            while len(items) < self.max_batch:
+                if not self._queue.empty():
+                    items.append(self._queue.get_nowait())
+                    continue
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    items.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+
+            try:
+                outputs = await loop.run_in_executor(self._executor, self._infer, items)
+            except Exception as exc:
+                # 一个 batch 出错只丢弃这一批帧，批处理任务继续运行，否则所有客户端都会一直等待
+                self.counters['errors'] += 1
+                print(f"❌ 推理出错，丢弃 {len(items)} 帧: {exc!r}")
+                continue
+            now = time.perf_counter()
+            for stream, payload, arrivals in outputs:
+                if stream.closed:
+                    continue
+                stream.writer.write(payload)
+                self.latencies.extend(now - arrivals)
+            self.counters['batches'] += 1
+            self.counters['batch_frames'] += len(items)
+            # 等待发送缓冲区排空：客户端读得慢时在这里限速，积压的帧由有上限的队列丢弃
+            await asyncio.gather(*(self._drain(stream) for stream, _, _ in outputs))
+
+    @staticmethod
+    async def _drain(stream):
+        if stream.closed:
+            return
+        try:
+            await stream.writer.drain()
+        except ConnectionError:
+            stream.closed = True
+
+    def _infer(self, items):
+        """
+        在推理线程中处理一个 batch：按数据流合并帧、统一标准化、一次（或按时间步）调用模型。
+
+        Returns:
+            list: (stream, 编码好的输出行, 对应帧的到达时间数组)。
+        """
+        groups = {}
+        for stream, values, arrival in items:
+            groups.setdefault(stream, ([], []))
+            groups[stream][0].append(values)
+            groups[stream][1].append(arrival)
+        streams = list(groups)
+        frames = [np.stack(groups[s][0]) for s in streams]
+        arrivals = [np.asarray(groups[s][1]) for s in streams]
+        lengths = [len(f) for f in frames]
+        x = np.concatenate(frames)
+        if self.scaler_sensor is not None:
+            x = self.scaler_sensor.transform(x)
+        x = np.asarray(x, dtype=np.float32)
+        frames = np.split(x, np.cumsum(lengths)[:-1])
+
+        # 各帧在所属数据流中的序号，以及需要输出的帧
+        counts = [s.n_samples + np.arange(1, n + 1) for s, n in zip(streams, lengths)]
+        for s, n in zip(streams, lengths):
+            s.n_samples += n
+        due = [c % self.step_size == 0 for c in counts]
+
+        with torch.no_grad():
+            if self.mode == 'stateful':
+                preds = self._infer_stateful(streams, frames, counts)
+            else:
+                due = [d & (c >= self.window_length) for d, c in zip(due, counts)]
+                preds = self._infer_windowed(streams, frames, due)
+
+        outputs = []
+        for s, c, d, p, a in zip(streams, counts, due, preds, arrivals):
+            if self.mode == 'stateful':
+                p = p[d]
+            if not d.any():
+                continue
+            if self.scaler_angle is not None:
+                p = self.scaler_angle.inverse_transform(p)
+            lines = "".join(f"{i}," + ",".join(f"{v:.4f}" for v in row) + "\n" for i, row in zip(c[d] - 1, p))
+            outputs.append((s, lines.encode('latin1'), a[d]))
+            self.counters['predictions'] += int(d.sum())
+        self.counters['frames'] += len(x)
+        return outputs
+
+    def _initial_state(self):
+        """零初始状态（batch 维为 1），从模型的一次前向中取得形状和数据类型。"""
+        if self._zero_state is None:
+            probe = torch.zeros(1, 1, self.n_channels, device=self.device)
+            _, (h, c) = self.model.forward_step(probe, None)
+            self._zero_state = (torch.zeros_like(h), torch.zeros_like(c))
+        return self._zero_state
+
+    def _infer_stateful(self, streams, frames, counts):
+        """
+        各数据流的状态沿 batch 维拼接，按时间步推进；帧数不同的数据流只在有帧的时间步参与。
+        到达重建时间（见 streaming.refresh_due）的数据流在该时间步之后，用最近 window_length 帧从零状态
+        重建状态，同一时间步需要重建的数据流合成一个 batch 计算。
+        """
+        h = torch.cat([(s.state or self._initial_state())[0] for s in streams], dim=1)
+        c = torch.cat([(s.state or self._initial_state())[1] for s in streams], dim=1)
+        lengths = np.array([len(f) for f in frames])
+        refresh = [refresh_due(cnt, self.state_refresh, self.window_length) for cnt in counts]
+        histories = [None] * len(streams)
+        if self.state_refresh:
+            for i, (s, x) in enumerate(zip(streams, frames)):
+                full, n_prev, s.history = append_history(s.history, x, self.window_length)
+                histories[i] = (full, n_prev)
+        preds = [np.empty((n, 0), dtype=np.float32) for n in lengths]
+        step_outputs = [[] for _ in streams]
+        for t in range(lengths.max()):
+            active = np.flatnonzero(lengths > t)
+            x = torch.as_tensor(np.stack([frames[i][t] for i in active]), device=self.device).unsqueeze(1)
+            if len(active) == len(streams):
+                out, (h, c) = self.model.forward_step(x, (h, c))
+            else:
+                index = torch.as_tensor(active, device=self.device)
+                out, (h_active, c_active) = self.model.forward_step(x, (h[:, index], c[:, index]))
+                h, c = h.clone(), c.clone()
+                h[:, index], c[:, index] = h_active, c_active
+            out = out[:, 0].float().cpu().numpy()
+            for k, i in enumerate(active):
+                step_outputs[i].append(out[k])
+
+            rebuild = [i for i in active if refresh[i][t]]
+            if rebuild:
+                windows = np.stack([histories[i][0][histories[i][1] + t + 1 - self.window_length:
+                                                    histories[i][1] + t + 1] for i in rebuild])
+                _, (h_new, c_new) = self.model.forward_step(torch.as_tensor(windows, device=self.device), None)
+                index = torch.as_tensor(rebuild, device=self.device)
+                h, c = h.clone(), c.clone()
+                h[:, index], c[:, index] = h_new.to(h.dtype), c_new.to(c.dtype)
+        for i, s in enumerate(streams):
+            s.state = (h[:, i:i + 1], c[:, i:i + 1])
+            preds[i] = np.stack(step_outputs[i])
+        return preds
+
+    def _infer_windowed(self, streams, frames, due):
+        """各数据流在需要输出的位置取完整窗口，所有窗口合成一个 batch 计算。"""
+        windows, n_windows = [], []
+        for s, x, d in zip(streams, frames, due):
+            history, n_prev, s.history = append_history(s.history, x, self.window_length)
+            ends = n_prev + np.flatnonzero(d) + 1
+            windows.append(history[ends[:, None] - self.window_length + np.arange(self.window_length)])
+            n_windows.append(len(ends))
+        batch = np.concatenate(windows)
+        if len(batch) == 0:
+            return [np.empty((0, 0), dtype=np.float32) for _ in streams]
+        out = self.model(torch.as_tensor(batch, device=self.device)).float().cpu().numpy()
+        return np.split(out, np.cumsum(n_windows)[:-1])
+
+    # ---------------- 统计 ----------------
+    def stats(self):
+        """吞吐量（预测/秒）、平均 batch 帧数以及服务端延迟（帧到达 -> 输出写出）的 p50 / p99（毫秒）。"""
+        elapsed = time.perf_counter() - self.started if self.started else 0.0
+        latencies = np.asarray(self.latencies) * 1e3
+        return {
+            **self.counters,
+            'streams': len(self.streams),
+            'predictions_per_s': self.counters['predictions'] / elapsed if elapsed else 0.0,
+            'mean_batch_frames': self.counters['batch_frames'] / max(self.counters['batches'], 1),
+            'p50_ms': float(np.percentile(latencies, 50)) if len(latencies) else float('nan'),
+            'p99_ms': float(np.percentile(latencies, 99)) if len(latencies) else float('nan'),
+        }
+
+
+async def _serve(server, host, port, unix_path, report_every):
+    listener = await server.start(host, port, unix_path)
+    print(f"🚀 推理服务已启动: {unix_path or f'{host}:{port}'}（{server.mode}，batch ≤ {server.max_batch}，"
+          f"等待 ≤ {server.max_wait * 1e3:g} ms，状态重建间隔 {server.state_refresh or '不重建'}）")
+    async with listener:
+        while True:
+            await asyncio.sleep(report_every)
+            st = server.stats()
+            print(f"📊 {st['streams']} 路数据流  {st['predictions_per_s']:.0f} 预测/s  "
+                  f"平均 batch {st['mean_batch_frames']:.1f} 帧  延迟 p50 {st['p50_ms']:.2f} ms  p99 {st['p99_ms']:.2f} ms  "
+                  f"丢弃 {st['shed']} 帧  出错 {st['errors']} 个 batch")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="多路穿戴设备数据流的微批推理服务")
+    parser.add_argument('--checkpoint', default='./result/model_folded.ckpt',
+                        help='fold_scalers 合并了 scaler 的权重（04_multihead_lstm_train.py 保存的 model_folded.ckpt）')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--unix-socket', default=None, help='改用 Unix socket 监听')
+    parser.add_argument('--mode', choices=['stateful', 'windowed'], default='stateful')
+    parser.add_argument('--window-length', type=int, default=80)
+    parser.add_argument('--state-refresh', type=int, default=None,
+                        help="'stateful' 每隔多少个样本从零状态重建 LSTM 状态，默认与 05_predict.py 相同（= window-length），0 表示不重建")
+    parser.add_argument('--step-size', type=int, default=1)
+    parser.add_argument('--max-batch', type=int, default=64)
+    parser.add_argument('--max-wait-ms', type=float, default=5.0)
+    parser.add_argument('--max-queue', type=int, default=4096, help='等待推理的帧数上限，超出时丢弃新帧')
+    parser.add_argument('--report-every', type=float, default=10.0)
+    args = parser.parse_args()
+
+    device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
+    model = MultiHeadLSTM(input_size=6, hidden_size=256, num_layers=3, dropout=0.1, output_size=9).to(device)
+    model.load_state_dict(torch.load(args.checkpoint, map_location=device))
+    state_refresh = args.window_length if args.state_refresh is None else (args.state_refresh or None)
+    server = InferenceServer(model, window_length=args.window_length, mode=args.mode, step_size=args.step_size,
+                             state_refresh=state_refresh,
+                             max_batch=args.max_batch, max_wait_ms=args.max_wait_ms, max_queue=args.max_queue, device=device)
+    try:
+        asyncio.run(_serve(server, args.host, args.port, args.unix_socket, args.report_every))
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,124 @@
+# input_sources.py
+# 实时预测的输入源：真实串口、传感器记录回放、以及模拟设备的伪终端（pty）。
+# 所有输入源都只需提供 readline() / close()，可直接交给 realtime_pipeline.RealtimePipeline。
+import os
+import threading
+import time
+from read_sensor import read_sensor_data
+
+
+def format_sensor_line(values):
+    """按设备输出格式编码一行数据：'v1,v2,...\\r\\n'。"""
+    return (",".join(f"{v:g}" for v in values) + "\r\n").encode("latin1")
+
+
+class ReplaySource:
+    """
+    回放传感器记录文件（read_sensor_data 可解析的 .txt / .csv），按原始时间戳控制输出节奏。
+
+    Args:
+        filepath (str): 传感器记录文件。
+        rate (float): 回放倍速，1.0 为实时；0 或 None 表示不等待、尽快输出。
+        n_channels (int): 通道数，None 时自动推断。
+        loop (bool): 结束后是否从头循环。
+    """
+
+    def __init__(self, filepath, rate=1.0, n_channels=None, loop=False):
+        df, _ = read_sensor_data(filepath, n_channels=n_channels)
+        self.values = df.to_numpy()
+        ns = df.index.asi8
+        self.offsets = (ns - ns[0]) / 1e9  # 相对第一帧的秒数
+        self.lines = [format_sensor_line(v) for v in self.values]
+        self.rate = rate
+        self.loop = loop
+        self.n_channels = self.values.shape[1]
+        self.position = 0
+        self._t0 = None
+        self._closed = False
+
+    def __len__(self):
+        return len(self.lines)
+
+    def readline(self):
+        if self._closed:
+            return b''
+        if self.position >= len(self.lines):
+            if not self.loop:
+                return b''
+            self.position = 0
+            self._t0 = None
+        if self._t0 is None:
+            self._t0 = time.perf_counter()
+        if self.rate:
+            delay = self._t0 + self.offsets[self.position] / self.rate - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+        line = self.lines[self.position]
+        self.position += 1
+        return line
+
+    def close(self):
+        self._closed = True
+
+
+class PtyDevice:
+    """
+    用伪终端模拟可穿戴设备：后台线程把记录文件按节奏写入 pty 主端，
+    预测程序像打开真实串口一样打开 self.port（仅 POSIX 系统）。
+    """
+
+    def __init__(self, filepath, rate=1.0, n_channels=None, loop=False):
+        if not hasattr(os, 'openpty'):
+            raise OSError("❌ 当前系统不支持 pty，请使用 ReplaySource")
+        self.replay = ReplaySource(filepath, rate, n_channels, loop)
+        self.n_channels = self.replay.n_channels
+        self._master, self._slave = os.openpty()
+        self.port = os.ttyname(self._slave)
+        self.lines_written = 0
+        self._stop_event = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def _run(self):
+        while not self._stop_event.is_set():
+            line = self.replay.readline()
+            if not line:
+                break
+            os.write(self._master, line)
+            self.lines_written += 1
+
+    def is_finished(self):
+        """回放已全部写入 pty（读取端可能还没读完，见 lines_written）。"""
+        return self._thread.ident is not None and not self._thread.is_alive()
+
+    def close(self):
+        self._stop_event.set()
+        self._thread.join(timeout=1.0)
+        os.close(self._master)
+        os.close(self._slave)
+
+
+def open_source(kind, port=None, baudrate=115200, filepath=None, rate=1.0, n_channels=None, timeout=1):
+    """
+    按类型创建输入源。
+
+    Args:
+        kind (str): 'serial'（真实设备）、'replay'（文件回放）或 'pty'（伪终端模拟设备）。
+
+    Returns:
+        (source, device): source 提供 readline()；device 为 'pty' 模式下的 PtyDevice（其余为 None），
+        使用完毕后需一并关闭。
+    """
+    if kind == 'serial':
+        import serial
+        return serial.Serial(port, baudrate, timeout=timeout), None
+    if kind == 'replay':
+        return ReplaySource(filepath, rate, n_channels), None
+    if kind == 'pty':
+        import serial
+        device = PtyDevice(filepath, rate, n_channels).start()
+        return serial.Serial(device.port, baudrate, timeout=timeout), device
+    raise ValueError(f"❌ 未知的输入源类型: {kind}")
@@ -0,0 +1,153 @@
+# model.py
+# 模型定义（训练脚本与实时预测共用）
+import copy
+import numpy as np
+import torch
+import torch.nn as nn
+
+
+#class LSTM(nn.Module):
+#    def __init__(self, input_size, hidden_size, num_layers, output_size, dropout):
+#        super(LSTM, self).__init__()
+#        self.lstm = nn.LSTM(input_size, hidden_size, num_layers, batch_first=True)
+#        self.ln = nn.LayerNorm(hidden_size)
+#        self.fc = nn.Sequential(
+#            nn.Linear(hidden_size, 128),
+#            nn.ReLU(),
+#            nn.Dropout(dropout),
+#            nn.Linear(128, output_size)
+#        )
+
+#    def forward(self, x):
+#        if x.dim() == 2:
+#            x = x.unsqueeze(1)
+#        x, _ = self.lstm(x)
+#        x = self.ln(x[:, -1, :])
+#        x = self.fc(x)
+#        return x
+
+def convert_legacy_heads(state_dict, prefix=''):
+    """
+    将旧版逐个输出头的权重（heads.0.weight, heads.1.weight, ...）原地合并为 head.weight / head.bias。
+    已是新格式的 state_dict 保持不变。
+    """
+    legacy_prefix = prefix + 'heads.'
+    indices = sorted({int(key[len(legacy_prefix):].split('.')[0])
+                      for key in state_dict if key.startswith(legacy_prefix)})
+    if not indices:
+        return state_dict
+    state_dict[prefix + 'head.weight'] = torch.cat([state_dict.pop(f'{legacy_prefix}{i}.weight') for i in indices])
+    state_dict[prefix + 'head.bias'] = torch.cat([state_dict.pop(f'{legacy_prefix}{i}.bias') for i in indices])
+    return state_dict
+
+
+# ✅ Multi-Head LSTM
+class MultiHeadLSTM(nn.Module):
+    def __init__(self, input_size, hidden_size, num_layers, dropout, output_size):
+        super(MultiHeadLSTM, self).__init__()
+        self.lstm = nn.LSTM(input_size, hidden_size, num_layers, batch_first=True)
+        self.ln = nn.LayerNorm(hidden_size)
+        self.shared_fc = nn.Sequential(
+            nn.Linear(hidden_size, 128),
+            nn.ReLU(),
+            nn.Dropout(dropout),
+        )
+        # 每个角度一个输出头：合并为一个 Linear(128, output_size)，第 i 行即第 i 个角度的输出头
+        self.head = nn.Linear(128, output_size)
+
+    def project(self, x):
+        """LSTM 隐状态 -> 角度：LayerNorm + 共享全连接 + 输出头，x 形状 [..., hidden_size]。"""
+        x = self.ln(x)
+        x = self.shared_fc(x)
+        return self.head(x)                         # [..., output_size]
+
+    def _load_from_state_dict(self, state_dict, prefix, *args, **kwargs):
+        # 兼容旧权重：heads.{i}.weight / heads.{i}.bias 合并为 head.weight / head.bias
+        convert_legacy_heads(state_dict, prefix)
+        super()._load_from_state_dict(state_dict, prefix, *args, **kwargs)
+
+    def forward(self, x):
+        if x.dim() == 2:
+            x = x.unsqueeze(1)
+        x, _ = self.lstm(x)
+        return self.project(x[:, -1, :])            # [batch_size, output_size]
+
+    def forward_step(self, x, state=None):
+        """
+        流式推理：从给定 LSTM 状态出发处理新到的样本，并返回更新后的状态。
+
+        Args:
+            x (torch.Tensor): 新样本，形状 [batch_size, n_steps, input_size]（或 [batch_size, input_size]）。
+            state (tuple): 上一次返回的 (h, c)；None 表示零初始状态。
+
+        Returns:
+            (torch.Tensor, tuple): 每个时间步的预测 [batch_size, n_steps, output_size] 和新的 (h, c)。
+        """
+        if x.dim() == 2:
+            x = x.unsqueeze(1)
+        x, state = self.lstm(x, state)
+        return self.project(x), state
+
+def fold_scalers(model, x_mean, x_scale, y_mean, y_scale):
+    """
+    把输入标准化 (x - x_mean) / x_scale 和输出反标准化 y * y_scale + y_mean 合并进模型权重，
+    返回的新模型输入原始传感器值、直接输出角度（度），推理时不再需要 scaler / sklearn。
+
+    输入侧合并到第一层 LSTM 的输入权重：W' = W / x_scale，b' = b - W @ (x_mean / x_scale)；
+    输出侧合并到输出头：W' = y_scale * W，b' = y_scale * b + y_mean。forward / forward_step 都适用。
+    （int8 动态量化应作用于未合并的模型：原始传感器值范围大，激活量化误差会变大。）
+
+    Args:
+        model (MultiHeadLSTM): 已加载权重的模型（不会被修改）。
+        x_mean, x_scale: 传感器 StandardScaler 的 mean_ / scale_。
+        y_mean, y_scale: 角度 StandardScaler 的 mean_ / scale_。
+    """
+    folded = copy.deepcopy(model)
+    as_tensor = lambda v, ref: torch.as_tensor(np.asarray(v, dtype=np.float64), dtype=torch.float64,
+                                               device=ref.device)
+    with torch.no_grad():
+        w_ih = folded.lstm.weight_ih_l0
+        x_mean, x_scale = as_tensor(x_mean, w_ih), as_tensor(x_scale, w_ih)
+        w = w_ih.double()
+        folded.lstm.bias_ih_l0.sub_((w @ (x_mean / x_scale)).to(w_ih.dtype))
+        w_ih.copy_(w / x_scale)
+
+        head = folded.head
+        y_mean, y_scale = as_tensor(y_mean, head.weight), as_tensor(y_scale, head.weight)
+        head.weight.copy_(head.weight.double() * y_scale[:, None])
+        head.bias.copy_(head.bias.double() * y_scale + y_mean)
+    return folded.eval()
+
+
+## ✅ Multi-Head LSTM with per-head Input Projection
+#class MultiHeadLSTM(nn.Module):
+#    def __init__(self, input_size, hidden_size, num_layers, dropout, output_size):
+#        super(MultiHeadLSTM, self).__init__()
+#        self.output_size = output_size
+#        self.input_projections = nn.ModuleList([
+#            nn.Linear(input_size, input_size) for _ in range(output_size)
+#        ])
+
+#        self.lstm = nn.LSTM(input_size, hidden_size, num_layers, batch_first=True)
+#        self.ln = nn.LayerNorm(hidden_size)
+
+#        self.shared_fc = nn.Sequential(
+#            nn.Linear(hidden_size, 128),
+#            nn.ReLU(),
+#            nn.Dropout(dropout),
+#        )
+
+#        self.heads = nn.ModuleList([
+#            nn.Linear(128, 1) for _ in range(output_size)
+#        ])
+
+#    def forward(self, x):  # x: [B, T, C]
+#        outputs = []
+#        for i in range(self.output_size):
+#            x_proj = self.input_projections[i](x)         # 每个角度使用独立投影后的输入
+#            x_lstm, _ = self.lstm(x_proj)                  # [B, T, H]
+#            x_last = self.ln(x_lstm[:, -1, :])             # [B, H]
+#            x_feat = self.shared_fc(x_last)                # [B, 128]
+#            out = self.heads[i](x_feat)                    # [B, 1]
+#            outputs.append(out)
+#        return torch.cat(outputs, dim=1)  # [B, output_size]
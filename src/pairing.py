@@ -0,0 +1,125 @@
+# pairing.py
+# 光捕 / 传感器文件配对：只读取文件头（和传感器文件尾）得到时间范围，
+# 只处理时间范围有交集的组合，或按配对清单处理，代替原来的 N×M 全组合对齐。
+import os
+import pandas as pd
+from read_opticla import read_optical_time_range
+from read_sensor import read_sensor_time_range
+
+
+def scan_time_ranges(directory, read_range):
+    """
+    读取目录下所有文件的时间范围（按文件名排序）。
+
+    Returns:
+        (list, list): 成功读取的记录 dict（path, file, start, end, ...），以及读取失败的记录（带 reason）。
+    """
+    records, failed = [], []
+    for name in sorted(os.listdir(directory)):
+        path = os.path.join(directory, name)
+        if not os.path.isfile(path):
+            continue
+        try:
+            records.append({'path': path, 'file': name, **read_range(path)})
+        except Exception as e:
+            failed.append({'file': name, 'reason': f'header_error: {e}'})
+    return records, failed
+
+
+def overlapping_pairs(optical_records, sensor_records, min_overlap=0.0):
+    """
+    区间扫描求所有时间范围有交集的 (光捕, 传感器) 组合，复杂度 O((N+M)log(N+M) + 结果数)。
+
+    Args:
+        min_overlap (float): 最小交集时长（秒），不足的组合视为不重叠。
+
+    Returns:
+        list: (optical_record, sensor_record, overlap_seconds)，按传感器起始时间排序。
+    """
+    optical_sorted = sorted(optical_records, key=lambda r: r['start'])
+    pairs = []
+    active = []
+    next_optical = 0
+    for sensor in sorted(sensor_records, key=lambda r: r['start']):
+        # 加入起始时间早于当前传感器结束时间的光捕记录
+        while next_optical < len(optical_sorted) and optical_sorted[next_optical]['start'] < sensor['end']:
+            active.append(optical_sorted[next_optical])
+            next_optical += 1
+        # 传感器按起始时间递增，已结束的光捕记录之后不会再有交集
+        active = [o for o in active if o['end'] > sensor['start']]
+        for optical in active:
+            overlap = (min(optical['end'], sensor['end']) - max(optical['start'], sensor['start'])).total_seconds()
+            if overlap > min_overlap:
+                pairs.append((optical, sensor, overlap))
+    return pairs
+
+
+def read_pair_manifest(manifest_path):
+    """
+    读取配对清单：CSV 文件，包含 optical、sensor 两列（文件名，相对于各自目录）。
+    """
+    manifest = pd.read_csv(manifest_path, dtype=str, skipinitialspace=True)
+    missing_cols = {'optical', 'sensor'} - set(manifest.columns)
+    if missing_cols:
+        raise ValueError(f"❌ 配对清单缺少列: {sorted(missing_cols)}")
+    return list(manifest[['optical', 'sensor']].itertuples(index=False, name=None))
+
+
+def plan_pairs(optical_dir, sensor_dir, manifest_path=None, min_overlap=0.0, index=None):
+    """
+    生成需要处理的 (光捕文件, 传感器文件) 组合，并记录每个未处理文件 / 组合的原因。
+
+    - 给定 manifest_path 时只处理清单中列出的组合（清单中缺失的文件记为 missing_file）。
+    - 否则按时间范围求交集；同一传感器文件只输出一个训练数据文件，因此与多个光捕文件重叠时
+      只保留交集最长的一个，其余记为 shorter_overlap。
+    - 给定 index（recording_index.RecordingIndex）时直接查询索引中的时间范围，不打开文件。
+
+    Returns:
+        (list, list): [(optical_path, sensor_path), ...]，以及跳过记录
+            [{'optical'/'sensor'/'file': ..., 'reason': ...}, ...]。
+    """
+    skipped = []
+    if manifest_path is not None:
+        pairs = []
+        for optical, sensor in read_pair_manifest(manifest_path):
+            optical_path = os.path.join(optical_dir, optical)
+            sensor_path = os.path.join(sensor_dir, sensor)
+            missing = [p for p in (optical_path, sensor_path) if not os.path.isfile(p)]
+            if missing:
+                skipped.append({'optical': optical, 'sensor': sensor, 'reason': f'missing_file: {missing}'})
+                continue
+            pairs.append((optical_path, sensor_path))
+        return pairs, skipped
+
+    if index is not None:
+        optical_records = index.query(kind='optical', directory=optical_dir)
+        sensor_records = index.query(kind='sensor', directory=sensor_dir)
+        skipped += index.query_errors(optical_dir)
+        if os.path.abspath(sensor_dir) != os.path.abspath(optical_dir):
+            skipped += index.query_errors(sensor_dir)
+    else:
+        optical_records, optical_failed = scan_time_ranges(optical_dir, read_optical_time_range)
+        sensor_records, sensor_failed = scan_time_ranges(sensor_dir, read_sensor_time_range)
+        skipped += optical_failed + sensor_failed
+
+    best = {}
+    overlapped_optical = set()
+    for optical, sensor, overlap in overlapping_pairs(optical_records, sensor_records, min_overlap):
+        overlapped_optical.add(optical['file'])
+        current = best.get(sensor['file'])
+        if current is None or overlap > current[2]:
+            if current is not None:
+                skipped.append({'optical': current[0]['file'], 'sensor': sensor['file'], 'reason': 'shorter_overlap'})
+            best[sensor['file']] = (optical, sensor, overlap)
+        else:
+            skipped.append({'optical': optical['file'], 'sensor': sensor['file'], 'reason': 'shorter_overlap'})
+
+    for record in optical_records:
+        if record['file'] not in overlapped_optical:
+            skipped.append({'file': record['file'], 'reason': 'no_overlapping_sensor'})
+    for record in sensor_records:
+        if record['file'] not in best:
+            skipped.append({'file': record['file'], 'reason': 'no_overlapping_optical'})
+
+    pairs = [(best[name][0]['path'], best[name][1]['path']) for name in sorted(best)]
+    return pairs, skipped
@@ -0,0 +1,49 @@
+# precision.py
+# 推理精度选项（CPU 部署用）：
+#   'fp32' —— 原模型；
+#   'int8' —— LSTM / Linear 动态 int8 量化（权重 int8，激活运行时量化），模型体积约为 1/4；
+#   'bf16' —— 权重和计算使用 bfloat16，输入输出仍为 float32（CPU 支持 AVX512-BF16 / AMX 时才有加速）。
+# 量化后的模型保留 forward / forward_step 接口，可直接用于 evaluate_clips 和 StreamingPredictor。
+import copy
+import torch
+import torch.nn as nn
+
+PRECISIONS = ('fp32', 'int8', 'bf16')
+
+
+class BFloat16Model(nn.Module):
+    """bfloat16 推理包装：输入转换为 bfloat16，输出转换回 float32；LSTM 状态保持 bfloat16。"""
+
+    def __init__(self, model):
+        super().__init__()
+        self.model = model.to(torch.bfloat16)
+
+    def forward(self, x):
+        return self.model(x.to(torch.bfloat16)).float()
+
+    def forward_step(self, x, state=None):
+        preds, state = self.model.forward_step(x.to(torch.bfloat16), state)
+        return preds.float(), state
+
+
+def prepare_inference_model(model, precision='fp32'):
+    """
+    按精度返回推理模型（不修改传入的模型）。
+
+    Args:
+        model (torch.nn.Module): 已加载权重的 MultiHeadLSTM。
+        precision (str): 'fp32' / 'int8' / 'bf16'。
+
+    Returns:
+        torch.nn.Module: eval 模式的推理模型。
+    """
+    if precision not in PRECISIONS:
+        raise ValueError(f"❌ 未知的推理精度: {precision}，可选 {PRECISIONS}")
+    model = model.eval()
+    if precision == 'fp32':
+        return model
+    if next(model.parameters()).device.type != 'cpu':
+        raise ValueError(f"❌ {precision} 推理模式只支持 CPU，请先 model.to('cpu')")
+    if precision == 'int8':
+        return torch.ao.quantization.quantize_dynamic(model, {nn.LSTM, nn.Linear}, dtype=torch.qint8).eval()
+    return BFloat16Model(copy.deepcopy(model)).eval()
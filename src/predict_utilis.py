@@ -1,6 +1,7 @@
 # predict_utils.py
 import numpy as np
 import torch
+from windowed_dataset import SlidingWindowDataset, make_loader
 
 def predict_by_batch(model, X_tensor, batch_size=256):
     """
@@ -22,3 +23,107 @@ def predict_by_batch(model, X_tensor, batch_size=256):
             batch_pred = model(batch_x).cpu().numpy()
             preds.append(batch_pred)
     return np.vstack(preds)
+
+
+def predict_by_loader(model, loader, device):
+    """
+    按 DataLoader 逐 batch 预测，输入在取数后才移动到设备上。
+
+    Args:
+        model (torch.nn.Module): 已训练好的 PyTorch 模型。
+        loader (DataLoader): 产生 (X_batch, y_batch) 的数据加载器。
+        device (torch.device): 模型所在设备。
+
+    Returns:
+        (numpy.ndarray, numpy.ndarray): 预测结果和对应真值，形状均为 [N, output_dim]。
+    """
+    model.eval()
+    preds, trues = [], []
+    with torch.no_grad():
+        for batch_x, batch_y in loader:
+            preds.append(model(batch_x.to(device, non_blocking=True)).cpu().numpy())
+            trues.append(batch_y.numpy())
+    return np.vstack(preds), np.vstack(trues)
+
+
+def evaluate_clips(model, cache, window_length, time_steps, scaler_sensor, scaler_angle, device,
+                   clips=None, batch_size=256, keep_clips=(), smoother=None):
+    """
+    逐片段流式评估：每个片段单独建窗口、按 batch 预测，只累计每个角度的误差平方和，
+    不保留全部预测结果，内存占用与测试集大小无关。
+
+    Args:
+        model (torch.nn.Module): 已训练好的 PyTorch 模型。
+        cache (SessionCache): 测试数据的会话缓存。
+        window_length (int), time_steps (int): 与训练时相同的窗口长度和步长。
+        scaler_sensor, scaler_angle: 训练时 fit 的 StandardScaler（使用 mean_ / scale_）。
+        device (torch.device): 模型所在设备。
+        clips (array-like): 可选，只评估这些片段编号，默认全部片段。
+        keep_clips (iterable): 需要保留（反标准化后的）预测和真值的片段编号，用于画图。
+        smoother: 可选，smoothing.make_filter 创建的滤波器；每个片段的预测序列整段平滑后另算一组 RMSE
+            （需要暂存一个片段的预测，内存占用与最长片段同阶）。
+
+    Returns:
+        dict: rmse（每个角度的 RMSE，单位为度）、mean_rmse、n_windows、
+        per_clip（每个片段的 file / n_windows / rmse / mean_rmse）以及 kept（片段编号 -> (预测, 真值)）；
+        指定 smoother 时另有 rmse_smoothed、mean_rmse_smoothed、kept_smoothed（片段编号 -> 平滑后的预测）。
+    """
+    starts, clip_ids = cache.window_index(window_length, time_steps)
+    clips = np.arange(len(cache)) if clips is None else np.asarray(clips)
+    # clip_ids 按片段编号升序排列，每个片段的窗口是连续的一段：一次二分查找得到所有片段的起止位置
+    clip_lo = np.searchsorted(clip_ids, clips, side='left')
+    clip_hi = np.searchsorted(clip_ids, clips, side='right')
+    keep_clips = set(int(i) for i in keep_clips)
+    y_scale = np.asarray(scaler_angle.scale_, dtype=np.float64)
+    y_mean = np.asarray(scaler_angle.mean_, dtype=np.float64)
+    scaler_kwargs = dict(x_mean=scaler_sensor.mean_, x_scale=scaler_sensor.scale_,
+                         y_mean=scaler_angle.mean_, y_scale=scaler_angle.scale_)
+
+    model.eval()
+    total_sse = np.zeros(len(y_scale))
+    total_sse_smoothed = np.zeros(len(y_scale))
+    total_count = 0
+    per_clip, kept, kept_smoothed = [], {}, {}
+    with torch.no_grad():
+        for clip, lo, hi in zip(clips, clip_lo, clip_hi):
+            clip_starts = starts[lo:hi]
+            if len(clip_starts) == 0:
+                continue
+            dataset = SlidingWindowDataset(cache.sensor, cache.angle, window_length, starts=clip_starts,
+                                           **scaler_kwargs)
+            clip_sse = np.zeros(len(y_scale))
+            preds, trues = [], []
+            for batch_x, batch_y in make_loader(dataset, batch_size=batch_size):
+                batch_pred = model(batch_x.to(device)).cpu().numpy()
+                batch_y = batch_y.numpy()
+                # 标准化空间的误差乘以 scale 即为角度误差（度）
+                clip_sse += (((batch_pred - batch_y) * y_scale) ** 2).sum(axis=0)
+                if clip in keep_clips or smoother is not None:
+                    preds.append(batch_pred * y_scale + y_mean)
+                    trues.append(batch_y * y_scale + y_mean)
+            total_sse += clip_sse
+            total_count += len(clip_starts)
+            clip_rmse = np.sqrt(clip_sse / len(clip_starts))
+            per_clip.append({'clip': int(clip), 'file': cache.files[clip], 'n_windows': int(len(clip_starts)),
+                             'rmse': clip_rmse.tolist(), 'mean_rmse': float(clip_rmse.mean())})
+            if smoother is not None:
+                # 片段内窗口按时间顺序排列，整段预测序列一起平滑
+                smoothed = smoother.apply(np.vstack(preds))
+                clip_sse_smoothed = ((smoothed - np.vstack(trues)) ** 2).sum(axis=0)
+                total_sse_smoothed += clip_sse_smoothed
+                per_clip[-1]['mean_rmse_smoothed'] = float(np.sqrt(clip_sse_smoothed / len(clip_starts)).mean())
+                if clip in keep_clips:
+                    kept_smoothed[int(clip)] = smoothed
+            if clip in keep_clips:
+                kept[int(clip)] = (np.vstack(preds), np.vstack(trues))
+
+    if total_count == 0:
+        raise ValueError("❌ 没有可用于评估的窗口（片段长度都小于窗口长度？）")
+    rmse = np.sqrt(total_sse / total_count)
+    result = {'rmse': rmse.tolist(), 'mean_rmse': float(rmse.mean()), 'n_windows': int(total_count),
+              'per_clip': per_clip, 'kept': kept}
+    if smoother is not None:
+        rmse_smoothed = np.sqrt(total_sse_smoothed / total_count)
+        result.update(rmse_smoothed=rmse_smoothed.tolist(), mean_rmse_smoothed=float(rmse_smoothed.mean()),
+                      kept_smoothed=kept_smoothed)
+    return result
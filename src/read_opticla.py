@@ -16,78 +16,130 @@ def convert_to_24hr_format(time_str: str) -> str:
     
     return time_obj.strftime('%Y-%m-%d %H:%M:%S.%f')
 
-def read_optical_data(filepath: str, encoding='utf-8') -> pd.DataFrame:
-    """
-    读取光捕数据文件并进行处理。
-    """
-    with open(filepath, 'r', encoding=encoding) as f:
-        first_row = f.readline().strip()
-        second_row = f.readline().strip()
-        third_row = f.readline().strip()
-        fourth_row = f.readline().strip()
-
-    print(f"First row: {first_row}")
-    print(f"Second row: {second_row}")
-    print(f"Third row: {third_row}")
-    print(f"Fourth row: {fourth_row}")
-    
-    # 解析开始时间
-    columns = first_row.split(',')
-    capture_start_time = columns[11]
-    capture_start_time_24hr = convert_to_24hr_format(capture_start_time)
-    start_time = pd.to_datetime(capture_start_time_24hr, format='%Y-%m-%d %H:%M:%S.%f')
+# 标记点列名前缀（导出文件中为 "<MarkerSet>:<标记点名>"）
+MARKER_SET_PREFIX = "MarkerSet 0710_shoulder_double_side:"
+#MARKER_SET_PREFIX = "Shoulder:"
 
-    # 跳过前7行读取数据
-    df_o = pd.read_csv(filepath, header=None, delimiter=",", low_memory=False, encoding=encoding, skiprows=7)
+# 表头行数：第1行为采集信息，第4行为标记点名称，数据从第8行开始
+HEADER_ROWS = 7
 
-    # 构造新列名
+
+def _marker_column_names(name_row: str) -> list:
+    """
+    由第4行（标记点名称）构造列名：去掉前缀，并对重复的 X/Y/Z 列依次加 .1/.2 后缀。
+    """
     new_columns = ['Frame', 'Time']
-    fourth_row_columns = fourth_row.split(',')
-    for col in fourth_row_columns[2:]:
-        #if "Shoulder:" in col:
-        if "MarkerSet 0710_shoulder_double_side:" in col:
+    for col in name_row.split(',')[2:]:
+        if MARKER_SET_PREFIX in col:
             new_columns.append(col.split(":")[-1])
         else:
             new_columns.append(col)
-    df_o.columns = new_columns
-
-    # 构造新列名，统一将含 ":" 的列名简化为冒号后的短名
-    #new_columns = ['Frame', 'Time']
-    #fourth_row_columns = fourth_row.split(',')
-
-    #for col in fourth_row_columns[2:]:
-    #    if ":" in col:
-    #        new_columns.append(col.split(":")[-1])
-    #    else:
-    #        new_columns.append(col)
 
     # 去重处理
     name_count = {}
     new_column_names = []
-    for col in df_o.columns:
+    for col in new_columns:
         if col in name_count:
             name_count[col] += 1
             new_column_names.append(f"{col}.{name_count[col]}")
         else:
             name_count[col] = 0
             new_column_names.append(col)
-    df_o.columns = new_column_names
+    return new_column_names
+
+
+def parse_capture_info(first_row: str) -> dict:
+    """
+    解析第1行的采集信息（"键,值,键,值,..." 形式），如 'Capture Start Time'、'Export Frame Rate'、
+    'Total Exported Frames'。
+    """
+    fields = first_row.strip().split(',')
+    return {fields[i]: fields[i + 1] for i in range(0, len(fields) - 1, 2)}
+
+
+def _capture_start_time(info: dict) -> pd.Timestamp:
+    capture_start_time_24hr = convert_to_24hr_format(info['Capture Start Time'])
+    return pd.to_datetime(capture_start_time_24hr, format='%Y-%m-%d %H:%M:%S.%f')
+
+
+def read_optical_time_range(filepath: str, encoding='utf-8') -> dict:
+    """
+    只读取第1行，由起始时间、导出帧率和导出帧数得到光捕记录的时间范围（不解析数据）。
+
+    Returns:
+        dict: start、end（最后一帧时间）、frame_rate、n_frames。
+    """
+    with open(filepath, 'r', encoding=encoding) as f:
+        info = parse_capture_info(f.readline())
+    start = _capture_start_time(info)
+    frame_rate = float(info['Export Frame Rate'])
+    n_frames = int(info['Total Exported Frames'])
+    return {
+        'start': start,
+        'end': start + pd.to_timedelta(max(n_frames - 1, 0) / frame_rate, unit='s'),
+        'frame_rate': frame_rate,
+        'n_frames': n_frames,
+    }
+
+
+def read_optical_data(filepath: str, encoding='utf-8', columns=None) -> pd.DataFrame:
+    """
+    读取光捕数据文件并进行处理。
+
+    文件只打开一次：先读取表头，再由 pandas C 引擎从同一文件句柄继续解析数据，
+    标记点列直接读为 float32。
+
+    Args:
+        filepath (str): 光捕导出的 CSV 文件。
+        encoding (str): 文件编码。
+        columns (list): 可选，只读取这些标记点（如 angle_cal.REQUIRED_MARKERS），
+            每个标记点对应 X/Y/Z 三列；默认读取全部列。
+
+    Returns:
+        pandas.DataFrame: 'Frame'、绝对时间 'Time' 及各标记点坐标列。
+    """
+    with open(filepath, 'r', encoding=encoding) as f:
+        header_rows = [f.readline().strip() for _ in range(HEADER_ROWS)]
+        first_row, second_row, third_row, fourth_row = header_rows[:4]
+
+        print(f"First row: {first_row}")
+        print(f"Second row: {second_row}")
+        print(f"Third row: {third_row}")
+        print(f"Fourth row: {fourth_row}")
+
+        # 解析开始时间
+        start_time = _capture_start_time(parse_capture_info(first_row))
+
+        # 构造新列名
+        names = _marker_column_names(fourth_row)
+        marker_names = names[2:]
+        if columns is not None:
+            wanted = set()
+            for marker in columns:
+                marker_cols = [marker, f"{marker}.1", f"{marker}.2"]
+                missing = [c for c in marker_cols if c not in names]
+                if missing:
+                    raise ValueError(f"❌ 光捕文件中缺少标记点列: {missing}")
+                wanted.update(marker_cols)
+            marker_names = [c for c in marker_names if c in wanted]
+
+        dtype = {'Frame': 'int64', 'Time': 'float64'}
+        dtype.update({c: 'float32' for c in marker_names})
+
+        # 从表头之后继续读取数据
+        df_o = pd.read_csv(f, header=None, names=names, usecols=['Frame', 'Time'] + marker_names,
+                           dtype=dtype, engine='c', index_col=False)
 
-    # 添加绝对时间列
-    df_o["AbsTime"] = df_o["Time"].astype(float).apply(lambda x: start_time + timedelta(seconds=x))
+    # 添加绝对时间列（向量化）
+    df_o['Time'] = start_time + pd.to_timedelta(df_o['Time'].to_numpy(), unit='s')
 
-    # 转换数据列为 float
-    col_num = len(df_o.columns)
-    df_o1 = df_o.iloc[:, 2:col_num - 1].astype(float)
-    df_o2 = df_o[["Frame", "AbsTime"]]
-    df_o = pd.concat([df_o2, df_o1], axis=1)
-    df_o.rename(columns={"AbsTime": "Time"}, inplace=True)
+    return df_o[['Frame', 'Time'] + marker_names]
 
-    return df_o
 
 # ✅ 测试文件路径（你需根据实际路径替换）
-#file_path = './20250406_data/MJQ/opt/mjq0403.csv'
-file_path = './20270710/opt/comp/opt.csv'
+if __name__ == "__main__":
+    #file_path = './20250406_data/MJQ/opt/mjq0403.csv'
+    file_path = './20270710/opt/comp/opt.csv'
 
-df = read_optical_data(file_path)
-print(df.head())
+    df = read_optical_data(file_path)
+    print(df.head())
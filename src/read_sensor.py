@@ -0,0 +1,201 @@
+from datetime import datetime
+import pandas as pd
+import re
+
+# 起始时间：兼容 "2025-03-09 18:34:24.251889" 与 "2025/03/09/18:34:24.251889" 两种写法
+START_TIME_PATTERN = re.compile(r"(\d{4})[-/](\d{2})[-/](\d{2})[ /](\d{2}:\d{2}:\d{2}\.\d+)")
+TIME_FORMAT = "%Y-%m-%d %H:%M:%S.%f"
+# 空行 / 只有空白的行（pandas 解析时直接跳过，不计入数据行），用于多行模式下逐行匹配
+BLANK_LINE_PATTERN = re.compile(rb"^[ \t\r]*\n", re.MULTILINE)
+
+
+def parse_start_time(line: str) -> datetime:
+    """
+    从传感器文件第一行（注释）中提取起始时间。
+    """
+    match = START_TIME_PATTERN.search(line)
+    if not match:
+        raise ValueError("❌ 无法在第一行中提取有效的 start_time")
+    year, month, day, clock = match.groups()
+    return datetime.strptime(f"{year}-{month}-{day} {clock}", TIME_FORMAT)
+
+
+def _first_field_kind(line: str):
+    """
+    判断一行数据首列的类型：'offset'（相对秒数）、'absolute'（绝对时间）或 None（表头等）。
+    """
+    first = line.split(',')[0].strip()
+    try:
+        float(first)
+        return 'offset'
+    except ValueError:
+        pass
+    try:
+        datetime.strptime(first, TIME_FORMAT)
+        return 'absolute'
+    except ValueError:
+        return None
+
+
+def _read_layout(filepath: str, encoding: str = 'utf-8'):
+    """
+    只读取文件头三行：起始时间 + 表头（部分文件没有表头，第二行即为数据）。
+
+    Returns:
+        (datetime, int, str, str): 起始时间、需跳过的行数、第一行数据、时间列类型。
+    """
+    with open(filepath, 'r', encoding=encoding) as file:
+        head_lines = [file.readline().strip() for _ in range(3)]
+
+    start_time = parse_start_time(head_lines[0])
+
+    time_kind = _first_field_kind(head_lines[1])
+    if time_kind is None:
+        return start_time, 2, head_lines[2], _first_field_kind(head_lines[2]) or 'offset'
+    return start_time, 1, head_lines[1], time_kind
+
+
+def _last_line_time(filepath: str, start_time: datetime, time_kind: str, n_fields: int,
+                    encoding: str = 'utf-8', chunk_size: int = 4096):
+    """
+    从文件末尾向前找到最后一行可解析的数据，返回其时间（不解析整个文件）。
+    录制中断时最后一行常常被截断或乱码：字段数不对或时间无法解析的行跳过，继续向前查找；
+    末尾块中没有可用行时读取块加倍，直到覆盖整个文件。找不到返回 None。
+    """
+    with open(filepath, 'rb') as file:
+        file.seek(0, 2)
+        size = file.tell()
+        while True:
+            offset = max(size - chunk_size, 0)
+            file.seek(offset)
+            lines = file.read().decode(encoding, errors='ignore').splitlines()
+            if offset > 0:
+                lines = lines[1:]  # 块的第一行可能不完整
+            for line in reversed(lines):
+                line = line.strip()
+                if not line or len(line.split(',')) != n_fields:
+                    continue
+                line_time = _line_time(line, start_time, time_kind)
+                if line_time is not None:
+                    return line_time
+            if offset == 0:
+                return None
+            chunk_size *= 2
+
+
+def _count_data_lines(filepath: str, skiprows: int, chunk_size: int = 1 << 20) -> int:
+    """
+    统计文件头之后的非空行数。C 引擎会直接丢弃字段过多的行（on_bad_lines='skip'），
+    用总行数减去解析出的行数才能得到全部被跳过的行。
+    按固定大小的块流式读取，每块只处理完整的行（不完整的行留到下一块），内存占用与文件大小无关。
+    """
+    n_lines = 0
+    carry = b''
+    with open(filepath, 'rb') as file:
+        while True:
+            chunk = file.read(chunk_size)
+            if not chunk:
+                break
+            data = carry + chunk
+            cut = data.rfind(b'\n') + 1
+            block, carry = data[:cut], data[cut:]
+            if not block:
+                continue
+            n_lines += block.count(b'\n') - len(BLANK_LINE_PATTERN.findall(block))
+    if carry.strip():
+        n_lines += 1  # 最后一行没有换行符
+    return max(n_lines - skiprows, 0)
+
+
+def _line_time(line: str, start_time: datetime, time_kind: str):
+    """解析一行数据首列对应的绝对时间，无法解析返回 None。"""
+    first = line.split(',')[0].strip()
+    try:
+        if time_kind == 'offset':
+            return pd.Timestamp(start_time) + pd.to_timedelta(float(first), unit='s')
+        return pd.Timestamp(datetime.strptime(first, TIME_FORMAT))
+    except ValueError:
+        return None
+
+
+def read_sensor_time_range(filepath: str, encoding: str = 'utf-8') -> dict:
+    """
+    只读取文件头和文件尾，得到传感器记录的时间范围，用于在解析前判断与光捕数据是否重叠。
+
+    Returns:
+        dict: start（第一个样本时间）、end（最后一个样本时间）、start_time（首行注释中的起始时间）、
+        n_channels、n_header_lines（数据之前的行数：起始时间行 + 可能存在的表头行）。
+    """
+    start_time, n_header_lines, first_data_line, time_kind = _read_layout(filepath, encoding)
+    n_fields = len(first_data_line.split(','))
+    start = _line_time(first_data_line, start_time, time_kind)
+    end = _last_line_time(filepath, start_time, time_kind, n_fields, encoding)
+    if start is None:
+        start = pd.Timestamp(start_time)
+    if end is None:
+        raise ValueError(f"❌ 文件中没有可解析时间的数据行: {filepath}")
+    return {
+        'start': start,
+        'end': end,
+        'start_time': pd.Timestamp(start_time),
+        'n_channels': n_fields - 1,
+        'n_header_lines': n_header_lines,
+    }
+
+
+def read_sensor_data(filepath: str, n_channels: int = None, encoding: str = 'utf-8'):
+    """
+    读取任意通道数的传感器数据，转换相对时间为绝对时间。
+
+    基于 pandas C 引擎一次性解析，时间列向量化计算；字段数或数值不合法的行直接丢弃。
+
+    Args:
+        filepath (str): 传感器数据文件（.txt / .csv）。
+        n_channels (int): 通道数；为 None 时根据第一行数据自动推断。
+        encoding (str): 文件编码。
+
+    Returns:
+        (pandas.DataFrame, pandas.DataFrame): 原始数据和（可选）处理版本，index 为绝对时间 'time'，
+        列为 s1 ~ sN。
+    """
+    start_time, skiprows, first_data_line, time_kind = _read_layout(filepath, encoding)
+
+    if n_channels is None:
+        n_channels = len(first_data_line.split(',')) - 1
+    sensor_cols = [f's{i}' for i in range(1, n_channels + 1)]
+
+    # ✅ C 引擎解析：字段过多的行跳过，字段不足的行补 NaN 后统一剔除
+    df = pd.read_csv(filepath, skiprows=skiprows, header=None, names=['time'] + sensor_cols,
+                     engine='c', skipinitialspace=True, on_bad_lines='skip', encoding=encoding)
+    n_total = max(_count_data_lines(filepath, skiprows), len(df))
+
+    df[sensor_cols] = df[sensor_cols].apply(pd.to_numeric, errors='coerce')
+    if time_kind == 'offset':
+        offsets = pd.to_numeric(df['time'], errors='coerce')
+        df['time'] = pd.Timestamp(start_time) + pd.to_timedelta(offsets, unit='s')
+    else:
+        df['time'] = pd.to_datetime(df['time'], format=TIME_FORMAT, errors='coerce').astype('datetime64[ns]')
+
+    df.dropna(inplace=True)
+    df[sensor_cols] = df[sensor_cols].astype(float)
+    if len(df) < n_total:
+        print(f"⚠️ 跳过异常行: {n_total - len(df)} 行")
+
+    # ✅ 设置时间为 index
+    df.set_index('time', inplace=True)
+
+    return df, df
+
+
+# ✅ 示例运行（你可以修改路径为你的实际数据文件）
+if __name__ == "__main__":
+    path = '../data/20250310_data/sensor/001/1e.txt'  # 修改为实际路径
+
+    import os
+    if not os.path.exists(path):
+        print("❌ 文件路径不存在，请检查")
+    else:
+        df_raw, _ = read_sensor_data(path)
+        print("✅ 成功读取前 5 行数据：")
+        print(df_raw.head())
+        print(f"\n📊 总数据行数: {len(df_raw)}，通道数: {df_raw.shape[1]}")
@@ -0,0 +1,250 @@
+# realtime_pipeline.py
+# 实时预测流水线：串口读取、模型推理、绘图三者解耦，分别运行在独立线程 / 主线程中，
+# 绘图变慢不会阻塞串口读取，丢帧和队列深度都有计数。
+import threading
+import time
+from collections import deque
+import numpy as np
+
+
+class RingBuffer:
+    """
+    线程安全的定长环形缓冲区，写满时丢弃最旧的数据并计数。
+
+    Args:
+        block_when_full (bool): 写满时阻塞写入方而不是丢弃（离线回放测吞吐量时使用）。
+    """
+
+    def __init__(self, maxlen, block_when_full=False):
+        self._items = deque(maxlen=maxlen)
+        self._cond = threading.Condition()
+        self.block_when_full = block_when_full
+        self.dropped = 0
+
+    def put(self, item):
+        with self._cond:
+            if len(self._items) == self._items.maxlen:
+                if self.block_when_full:
+                    self._cond.wait_for(lambda: len(self._items) < self._items.maxlen)
+                else:
+                    self.dropped += 1
+            self._items.append(item)
+            self._cond.notify_all()
+
+    def get_batch(self, max_items=None, timeout=None):
+        """取出最多 max_items 个元素（默认全部）；缓冲区为空时最多等待 timeout 秒。"""
+        with self._cond:
+            if not self._items:
+                self._cond.wait(timeout)
+            n = len(self._items) if max_items is None else min(max_items, len(self._items))
+            batch = [self._items.popleft() for _ in range(n)]
+            if batch:
+                self._cond.notify_all()
+            return batch
+
+    def __len__(self):
+        return len(self._items)
+
+
+def parse_sensor_line(raw, n_channels):
+    """解析一行串口数据（bytes 或 str），格式不对返回 None。"""
+    if isinstance(raw, bytes):
+        raw = raw.decode("latin1", errors="ignore")
+    line = raw.strip()
+    if not line:
+        return None
+    try:
+        values = np.array(line.split(","), dtype=float)
+    except ValueError:
+        return None
+    return values if len(values) == n_channels else None
+
+
+class SerialReader(threading.Thread):
+    """
+    生产者：持续调用 source.readline()，把解析后的样本放入输入缓冲区。
+
+    source 只需提供 readline() 方法（serial.Serial、以 'rb' 打开的文件、pty 等均可）。
+
+    Args:
+        stop_on_empty (bool): readline() 返回空时结束（用于文件回放）；串口超时返回空时应保持 False。
+
+    读取出错（如串口断开）时线程结束，异常记录在 error 中。
+    """
+
+    def __init__(self, source, buffer, n_channels=6, stop_on_empty=False):
+        super().__init__(daemon=True)
+        self.source = source
+        self.buffer = buffer
+        self.n_channels = n_channels
+        self.stop_on_empty = stop_on_empty
+        self.samples_read = 0
+        self.parse_errors = 0
+        self.error = None
+        self._stop_event = threading.Event()
+
+    def stop(self):
+        self._stop_event.set()
+
+    def run(self):
+        try:
+            self._read_loop()
+        except Exception as e:
+            self.error = e
+            print(f"❌ 读取线程出错，已停止: {type(e).__name__}: {e}")
+
+    def _read_loop(self):
+        while not self._stop_event.is_set():
+            raw = self.source.readline()
+            if not raw:
+                if self.stop_on_empty:
+                    break
+                continue
+            values = parse_sensor_line(raw, self.n_channels)
+            if values is None:
+                self.parse_errors += 1
+                continue
+            self.samples_read += 1
+            self.buffer.put((time.perf_counter(), values))
+
+
+class InferenceWorker(threading.Thread):
+    """
+    消费者：从输入缓冲区成批取出样本，交给 StreamingPredictor，预测结果放入输出缓冲区。
+
+    输出元素为 (样本序号, 样本到达时间, 角度)。推理出错（输入形状不对、CUDA 错误、scaler 不匹配等）时
+    线程结束，异常记录在 error 中，由 RealtimePipeline.check() 在主线程中抛出。
+    """
+
+    def __init__(self, predictor, in_buffer, out_buffer, max_chunk=125):
+        super().__init__(daemon=True)
+        self.predictor = predictor
+        self.in_buffer = in_buffer
+        self.out_buffer = out_buffer
+        self.max_chunk = max_chunk
+        self.samples_processed = 0
+        self.predictions = 0
+        self.error = None
+        self._stop_event = threading.Event()
+
+    def stop(self):
+        self._stop_event.set()
+
+    def run(self):
+        try:
+            self._inference_loop()
+        except Exception as e:
+            self.error = e
+            print(f"❌ 推理线程出错，已停止: {type(e).__name__}: {e}")
+
+    def _inference_loop(self):
+        while not self._stop_event.is_set():
+            batch = self.in_buffer.get_batch(self.max_chunk, timeout=0.05)
+            if not batch:
+                continue
+            arrival = np.array([t for t, _ in batch])
+            samples = np.stack([v for _, v in batch])
+            indices, angles = self.predictor.push_chunk(samples)
+            for i, angle in zip(indices, angles):
+                self.out_buffer.put((self.samples_processed + i + 1, arrival[i], angle))
+            self.samples_processed += len(batch)
+            self.predictions += len(indices)
+
+
+class RateLimitedRenderer:
+    """
+    在主线程中按固定帧率刷新显示：每次 update() 取走所有新预测，超过帧间隔才调用 draw_fn。
+
+    Args:
+        draw_fn: draw_fn(x, angle_history)，x 为样本序号列表，angle_history 为 [n, output_size] 数组。
+        fps (float): 最大刷新帧率。
+        history_length (int): 保留的预测点数。
+    """
+
+    def __init__(self, out_buffer, draw_fn, fps=10, history_length=1250):
+        self.out_buffer = out_buffer
+        self.draw_fn = draw_fn
+        self.min_interval = 1.0 / fps
+        self.x = deque(maxlen=history_length)
+        self.history = deque(maxlen=history_length)
+        self.frames_rendered = 0
+        self.latest = None
+        self._last_draw = 0.0
+
+    def update(self, force=False):
+        """取走新预测；到达刷新时间（或 force=True）则绘制一帧。返回是否绘制。"""
+        for index, _, angles in self.out_buffer.get_batch(timeout=0):
+            self.x.append(index)
+            self.history.append(angles)
+            self.latest = angles
+        now = time.perf_counter()
+        if not self.history or (not force and now - self._last_draw < self.min_interval):
+            return False
+        self._last_draw = now
+        self.draw_fn(list(self.x), np.array(self.history))
+        self.frames_rendered += 1
+        return True
+
+
+class RealtimePipeline:
+    """
+    组装读取线程、推理线程和限速绘图器。
+
+    Args:
+        source: 提供 readline() 的输入源。
+        predictor (StreamingPredictor): 流式预测器。
+        draw_fn: 绘图回调，见 RateLimitedRenderer；None 表示不绘图。
+        buffer_size (int): 输入 / 输出缓冲区容量（样本数），写满时丢弃最旧数据并计入丢帧。
+        stop_on_empty (bool): 输入源 readline() 返回空时结束（文件回放）。
+        block_when_full (bool): 缓冲区写满时阻塞而不丢帧（离线回放测吞吐量时使用）。
+    """
+
+    def __init__(self, source, predictor, draw_fn=None, n_channels=6, fps=10, buffer_size=4096,
+                 stop_on_empty=False, block_when_full=False):
+        self.in_buffer = RingBuffer(buffer_size, block_when_full)
+        self.out_buffer = RingBuffer(buffer_size, block_when_full)
+        self.reader = SerialReader(source, self.in_buffer, n_channels, stop_on_empty)
+        self.worker = InferenceWorker(predictor, self.in_buffer, self.out_buffer)
+        self.renderer = RateLimitedRenderer(self.out_buffer, draw_fn or (lambda x, history: None), fps)
+
+    def start(self):
+        self.reader.start()
+        self.worker.start()
+
+    def stop(self):
+        self.reader.stop()
+        self.worker.stop()
+        self.reader.join(timeout=1.0)
+        self.worker.join(timeout=1.0)
+
+    @property
+    def error(self):
+        """读取线程或推理线程记录的异常（没有出错时为 None）。"""
+        return self.worker.error or self.reader.error
+
+    def check(self):
+        """读取线程或推理线程出错时在调用方（主线程）抛出 RuntimeError。"""
+        error = self.error
+        if error is not None:
+            thread = '推理' if error is self.worker.error else '读取'
+            raise RuntimeError(f"❌ {thread}线程出错: {type(error).__name__}: {error}") from error
+
+    def is_idle(self):
+        """读取线程已结束且所有样本都已推理完毕。"""
+        return (not self.reader.is_alive()
+                and self.worker.samples_processed + self.in_buffer.dropped == self.reader.samples_read)
+
+    def stats(self):
+        """运行计数：读取 / 推理样本数、解析错误、丢帧数、队列深度，以及线程异常（error，没有出错时为 None）。"""
+        return {
+            'samples_read': self.reader.samples_read,
+            'parse_errors': self.reader.parse_errors,
+            'samples_processed': self.worker.samples_processed,
+            'predictions': self.worker.predictions,
+            'dropped_input': self.in_buffer.dropped,
+            'dropped_output': self.out_buffer.dropped,
+            'input_queue_depth': len(self.in_buffer),
+            'output_queue_depth': len(self.out_buffer),
+            'frames_rendered': self.renderer.frames_rendered,
+            'error': None if self.error is None else f"{type(self.error).__name__}: {self.error}",
+        }
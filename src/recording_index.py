@@ -0,0 +1,240 @@
+# recording_index.py
+# 录制文件元数据索引：扫描数据根目录下的光捕 CSV 和传感器记录，只读文件头 / 尾得到起止时间、
+# 帧数、采样率、通道数，连同文件哈希保存为 JSON 目录；文件未变化时不再重新读取。
+# 配对、缓存和数据集筛选可直接查询索引而不必打开文件。
+import os
+import json
+import hashlib
+import pandas as pd
+from read_opticla import parse_capture_info, read_optical_time_range
+from read_sensor import START_TIME_PATTERN, read_sensor_time_range
+
+INDEX_NAME = 'recording_index.json'
+INDEX_VERSION = 3
+
+
+def detect_kind(filepath, encoding='utf-8'):
+    """根据第一行判断文件类型：'optical'（光捕导出）、'sensor'（传感器记录）或 None。"""
+    try:
+        with open(filepath, 'r', encoding=encoding) as f:
+            first_line = f.readline()
+    except (OSError, UnicodeDecodeError):
+        return None
+    if first_line.startswith('Format Version') and 'Capture Start Time' in parse_capture_info(first_line):
+        return 'optical'
+    if START_TIME_PATTERN.search(first_line):
+        return 'sensor'
+    return None
+
+
+def _hash_and_count_lines(filepath, chunk_size=1 << 20):
+    """一次读取同时计算 SHA1 和行数。"""
+    h = hashlib.sha1()
+    n_lines = 0
+    last = b'\n'
+    with open(filepath, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            h.update(chunk)
+            n_lines += chunk.count(b'\n')
+            last = chunk[-1:]
+    if last != b'\n':
+        n_lines += 1
+    return h.hexdigest(), n_lines
+
+
+def describe_recording(filepath, kind, use_hash=True):
+    """
+    读取单个文件的元数据（不解析数据部分）。
+
+    Returns:
+        dict: kind、start / end（ISO 字符串）、n_frames、sample_rate、n_channels、size、mtime_ns、sha1。
+    """
+    stat = os.stat(filepath)
+    sha1, n_lines = _hash_and_count_lines(filepath) if use_hash else (None, None)
+    if kind == 'optical':
+        time_range = read_optical_time_range(filepath)
+        n_frames = time_range['n_frames']
+        sample_rate = time_range['frame_rate']
+        n_channels = None
+    else:
+        time_range = read_sensor_time_range(filepath)
+        n_channels = time_range['n_channels']
+        # 行数减去起始时间行和（可能存在的）表头行，只作估计（末尾截断的行也计入）
+        n_frames = None if n_lines is None else max(n_lines - time_range['n_header_lines'], 0)
+        duration = (time_range['end'] - time_range['start']).total_seconds()
+        sample_rate = (n_frames - 1) / duration if n_frames and duration > 0 else None
+    return {
+        'kind': kind,
+        'start': time_range['start'].isoformat(),
+        'end': time_range['end'].isoformat(),
+        'n_frames': n_frames,
+        'sample_rate': sample_rate,
+        'n_channels': n_channels,
+        'size': stat.st_size,
+        'mtime_ns': stat.st_mtime_ns,
+        'sha1': sha1,
+    }
+
+
+class RecordingIndex:
+    """
+    数据根目录下所有录制文件的元数据索引，保存在 <root>/recording_index.json。
+
+    Attributes:
+        records (dict): 相对路径 -> 元数据 dict（见 describe_recording）。
+        errors (dict): 相对路径 -> {'reason': 读取失败原因, 'size', 'mtime_ns'}；文件未变化时不再重新读取。
+    """
+
+    def __init__(self, root, use_hash=True):
+        self.root = root
+        self.use_hash = use_hash
+        self.path = os.path.join(root, INDEX_NAME)
+        self.records = {}
+        self.errors = {}
+        if os.path.exists(self.path):
+            with open(self.path, 'r', encoding='utf-8') as f:
+                saved = json.load(f)
+            if saved.get('version') == INDEX_VERSION:
+                self.records = saved['records']
+                self.errors = saved.get('errors', {})
+
+    def _is_current(self, relpath, stat):
+        record = self.records.get(relpath)
+        return (record is not None and record['size'] == stat.st_size and record['mtime_ns'] == stat.st_mtime_ns
+                and (not self.use_hash or record['sha1'] is not None))
+
+    def _is_current_error(self, relpath, stat):
+        error = self.errors.get(relpath)
+        return error is not None and error['size'] == stat.st_size and error['mtime_ns'] == stat.st_mtime_ns
+
+    def update(self):
+        """
+        增量更新：新增或大小 / 修改时间变化的文件重新读取，已删除的文件移出索引。
+        读取失败的文件同样按大小 / 修改时间记录，文件不变时不再重试。
+
+        Returns:
+            dict: 'added'、'updated'、'removed' 的文件数，以及读取失败记录的新增 / 变化（'failed'）和清除（'recovered'）数。
+        """
+        counts = {'added': 0, 'updated': 0, 'removed': 0, 'failed': 0, 'recovered': 0}
+        seen = set()
+        for dirpath, dirnames, filenames in os.walk(self.root):
+            dirnames[:] = sorted(d for d in dirnames if not d.startswith('.'))
+            for name in sorted(filenames):
+                filepath = os.path.join(dirpath, name)
+                relpath = os.path.relpath(filepath, self.root).replace(os.sep, '/')
+                if relpath == INDEX_NAME:
+                    continue
+                stat = os.stat(filepath)
+                if self._is_current(relpath, stat) or self._is_current_error(relpath, stat):
+                    seen.add(relpath)
+                    continue
+                kind = detect_kind(filepath)
+                if kind is None:
+                    continue
+                seen.add(relpath)
+                try:
+                    record = describe_recording(filepath, kind, self.use_hash)
+                except Exception as e:
+                    self.errors[relpath] = {'reason': str(e), 'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+                    counts['failed'] += 1
+                    if self.records.pop(relpath, None) is not None:
+                        counts['removed'] += 1
+                    continue
+                if self.errors.pop(relpath, None) is not None:
+                    counts['recovered'] += 1
+                counts['updated' if relpath in self.records else 'added'] += 1
+                self.records[relpath] = record
+
+        for relpath in [p for p in self.records if p not in seen]:
+            del self.records[relpath]
+            counts['removed'] += 1
+        # 已删除、或不再被识别为录制文件的失败记录
+        for relpath in [p for p in self.errors if p not in seen]:
+            del self.errors[relpath]
+            counts['recovered'] += 1
+        return counts
+
+    def save(self):
+        with open(self.path + '.tmp', 'w', encoding='utf-8') as f:
+            json.dump({'version': INDEX_VERSION, 'records': self.records, 'errors': self.errors},
+                      f, ensure_ascii=False, indent=1)
+        os.replace(self.path + '.tmp', self.path)
+
+    def query(self, kind=None, directory=None, start=None, end=None):
+        """
+        按类型、所在目录和时间范围筛选。
+
+        Args:
+            kind (str): 'optical' 或 'sensor'。
+            directory (str): 只返回该目录下（不含子目录）的文件，可为绝对路径或相对 root 的路径。
+            start, end: 只返回与 [start, end] 有交集的记录。
+
+        Returns:
+            list: 记录 dict（附加 path、file，start / end 为 pandas.Timestamp），按文件名排序。
+        """
+        directory = self._relative_directory(directory)
+        start = None if start is None else pd.Timestamp(start)
+        end = None if end is None else pd.Timestamp(end)
+
+        results = []
+        for relpath in sorted(self.records):
+            record = self.records[relpath]
+            if kind is not None and record['kind'] != kind:
+                continue
+            parent, name = os.path.split(relpath)
+            if directory is not None and parent != directory:
+                continue
+            record_start, record_end = pd.Timestamp(record['start']), pd.Timestamp(record['end'])
+            if (start is not None and record_end < start) or (end is not None and record_start > end):
+                continue
+            results.append({**record, 'path': os.path.join(self.root, relpath), 'file': name,
+                            'start': record_start, 'end': record_end})
+        return results
+
+    def query_errors(self, directory=None):
+        """
+        读取失败的文件（可按所在目录筛选，规则同 query）。
+
+        Returns:
+            list: [{'file': 文件名, 'reason': 'header_error: ...'}, ...]，按文件名排序。
+        """
+        directory = self._relative_directory(directory)
+        results = []
+        for relpath in sorted(self.errors):
+            parent, name = os.path.split(relpath)
+            if directory is not None and parent != directory:
+                continue
+            results.append({'file': name, 'reason': f"header_error: {self.errors[relpath]['reason']}"})
+        return results
+
+    def _relative_directory(self, directory):
+        if directory is None:
+            return None
+        directory = os.path.relpath(os.path.abspath(directory), os.path.abspath(self.root)).replace(os.sep, '/')
+        return '' if directory == '.' else directory
+
+
+def load_or_update_index(root, use_hash=True):
+    """
+    读取并增量更新数据根目录的索引，有变化时写回。
+
+    Returns:
+        RecordingIndex: 最新的索引。
+    """
+    index = RecordingIndex(root, use_hash)
+    counts = index.update()
+    if any(counts.values()) or not os.path.exists(index.path):
+        index.save()
+    print(f"✅ 录制文件索引 {index.path}：{len(index.records)} 个文件"
+          f"（新增 {counts['added']}，更新 {counts['updated']}，移除 {counts['removed']}）")
+    if index.errors:
+        print(f"⚠️ {len(index.errors)} 个文件读取失败（本次新增 / 变化 {counts['failed']}），见 query_errors()")
+    return index
+
+
+if __name__ == "__main__":
+    DATA_ROOT = '../data'
+
+    index = load_or_update_index(DATA_ROOT)
+    for record in index.query(kind='sensor')[:5]:
+        print(record['file'], record['start'], record['end'], record['sample_rate'])
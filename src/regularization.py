@@ -0,0 +1,70 @@
+# regularization.py
+# 训练时的参数正则化选项：
+#   'legacy'       —— 原训练脚本的写法：Python 循环逐个参数求 L2 范数再相加（保留用于复现旧结果）；
+#   'fused'        —— 同一个惩罚项（各参数 L2 范数之和），范数和梯度都用 torch._foreach_* 批量计算；
+#   'weight_decay' —— 不在 loss 中加惩罚项，改用 AdamW 的解耦权重衰减（与范数惩罚不是同一个正则项）。
+import torch
+
+REGULARIZATION_MODES = ('legacy', 'fused', 'weight_decay')
+# 原训练脚本中范数惩罚的系数
+NORM_PENALTY = 0.0003
+# AdamW 的权重衰减系数（PyTorch 默认值）
+WEIGHT_DECAY = 0.01
+
+
+def legacy_norm_penalty(parameters, coef=NORM_PENALTY):
+    """原写法：coef * sum(||p||_2)，每个参数单独求范数。"""
+    return coef * sum(torch.norm(p, 2) for p in parameters)
+
+
+class _NormSum(torch.autograd.Function):
+    """
+    sum(||p||_2)：前向用一次 _foreach_norm 批量求范数，反向直接按解析梯度 p / ||p|| 批量计算，
+    不为每个参数构建 norm / add 的 autograd 节点。
+    """
+
+    @staticmethod
+    def forward(ctx, *parameters):
+        norms = torch.stack(torch._foreach_norm(parameters, 2))
+        # 范数为 0 的参数梯度取 0（与 torch.norm 的次梯度一致）
+        ctx.save_for_backward(norms.clamp_min(1e-12), *parameters)
+        return norms.sum()
+
+    @staticmethod
+    def backward(ctx, grad_output):
+        norms, *parameters = ctx.saved_tensors
+        return tuple(torch._foreach_mul(parameters, (grad_output / norms).unbind()))
+
+
+def fused_norm_penalty(parameters, coef=NORM_PENALTY):
+    """
+    与 legacy_norm_penalty 数值相同的惩罚项（梯度也相同），所有参数的范数和梯度都按列表批量计算。
+    """
+    parameters = list(parameters)
+    if not hasattr(torch, '_foreach_norm'):
+        return legacy_norm_penalty(parameters, coef)
+    return coef * _NormSum.apply(*parameters)
+
+
+def configure_regularization(model, mode='fused', lr=0.001, coef=NORM_PENALTY, weight_decay=WEIGHT_DECAY):
+    """
+    按正则化方式创建优化器和 loss 惩罚项。
+
+    Args:
+        model (torch.nn.Module): 待训练的模型。
+        mode (str): 'legacy' / 'fused' / 'weight_decay'。
+        lr (float): 学习率。
+        coef (float): 范数惩罚系数（'legacy' / 'fused'）。
+        weight_decay (float): AdamW 权重衰减系数（'weight_decay'）。
+
+    Returns:
+        (torch.optim.Optimizer, callable): 优化器，以及返回惩罚项的函数 penalty()
+        （'weight_decay' 模式下返回 0）。
+    """
+    if mode not in REGULARIZATION_MODES:
+        raise ValueError(f"❌ 未知的正则化方式: {mode}，可选 {REGULARIZATION_MODES}")
+    parameters = [p for p in model.parameters() if p.requires_grad]
+    if mode == 'weight_decay':
+        return torch.optim.AdamW(parameters, lr=lr, weight_decay=weight_decay), lambda: 0.0
+    penalty_fn = legacy_norm_penalty if mode == 'legacy' else fused_norm_penalty
+    return torch.optim.Adam(parameters, lr=lr), lambda: penalty_fn(parameters, coef)
@@ -0,0 +1,140 @@
+# segmentation.py
+# 动作周期切分：在角度曲线上检测波峰 / 谷值，相邻两个极值点之间为一个周期。
+# 周期以原数组上的下标区间 [start, end) 表示，不复制数据；整个目录的结果写入一个周期索引文件。
+# 03_merge_motion.concatenate_cycles 按索引直接拼接出带 clip_id 的训练文件；export_cycles 可选导出逐周期文件。
+import os
+from fnmatch import fnmatch
+import numpy as np
+import pandas as pd
+from scipy.signal import find_peaks
+
+CYCLE_INDEX_COLUMNS = ['source_file', 'cycle', 'start', 'end']
+# export_cycles 导出的周期文件后缀，split_directory 据此识别并跳过
+CYCLE_FILE_SUFFIX = '.cycle.csv'
+
+
+def detect_cycles(signal, boundary='valley', distance=500, height=None, prominence=None,
+                  min_length=None, max_length=None):
+    """
+    检测动作周期。
+
+    Args:
+        signal (numpy.ndarray): 一维角度曲线。
+        boundary (str): 'valley'（以谷值为周期边界）或 'peak'（以波峰为边界）。
+        distance (int): 相邻边界点的最小间隔（样本数）。
+        height, prominence: 传给 scipy.signal.find_peaks 的条件；'valley' 模式下作用于取反后的信号。
+        min_length, max_length (int): 可选，周期长度范围（样本数），超出范围的周期被丢弃。
+
+    Returns:
+        numpy.ndarray: 形状 [n_cycles, 2] 的 int64 数组，每行为一个周期的 [start, end)。
+    """
+    if boundary not in ('valley', 'peak'):
+        raise ValueError(f"❌ 未知的周期边界类型: {boundary}")
+    signal = np.asarray(signal, dtype=float)
+    boundaries, _ = find_peaks(-signal if boundary == 'valley' else signal,
+                               distance=distance, height=height, prominence=prominence)
+    cycles = np.column_stack([boundaries[:-1], boundaries[1:]]).astype(np.int64)
+    lengths = cycles[:, 1] - cycles[:, 0]
+    keep = np.ones(len(cycles), dtype=bool)
+    if min_length is not None:
+        keep &= lengths >= min_length
+    if max_length is not None:
+        keep &= lengths <= max_length
+    return cycles[keep]
+
+
+def segment_file(file_path, signal='angle4', **criteria):
+    """
+    读取一个对齐后的数据文件并检测周期（只读取信号列）。
+
+    Returns:
+        numpy.ndarray: [n_cycles, 2] 周期区间；文件中没有该信号列时返回 None。
+    """
+    if signal not in pd.read_csv(file_path, nrows=0).columns:
+        return None
+    values = pd.read_csv(file_path, usecols=[signal])[signal].to_numpy()
+    return detect_cycles(values, **criteria)
+
+
+def split_directory(input_dir, index_path, signal='angle4', exclude=(), **criteria):
+    """
+    切分目录下所有 CSV 文件，结果写入一个周期索引文件（source_file, cycle, start, end），
+    source_file 为相对索引文件所在目录的路径。
+
+    只读取原始文件，不在输入目录中生成新文件；索引文件本身和 *.cycle.csv 周期文件会被跳过，
+    重复运行结果相同。
+
+    Args:
+        exclude (iterable): 额外跳过的文件名模式（fnmatch），例如旧版脚本在输入目录中生成的
+            周期文件 '*_[0-9][0-9].csv'。不按文件名猜测，避免误跳过 subject_01.csv 这类原始文件。
+
+    Returns:
+        pandas.DataFrame: 周期索引。
+    """
+    index_name = os.path.abspath(index_path)
+    frames = []
+    for filename in sorted(os.listdir(input_dir)):
+        file_path = os.path.join(input_dir, filename)
+        if not filename.endswith('.csv') or os.path.abspath(file_path) == index_name:
+            continue
+        if filename.endswith(CYCLE_FILE_SUFFIX) or any(fnmatch(filename, pattern) for pattern in exclude):
+            continue
+
+        cycles = segment_file(file_path, signal, **criteria)
+        if cycles is None:
+            print(f"⚠️ 文件 {filename} 中未找到 '{signal}' 列，跳过")
+            continue
+        if len(cycles) == 0:
+            print(f"⚠️ 文件 {filename} 周期点不足，跳过")
+            continue
+        print(f"📂 {filename}: {len(cycles)} 个周期")
+        frames.append(pd.DataFrame({
+            'source_file': os.path.relpath(file_path, os.path.dirname(index_name)).replace(os.sep, '/'),
+            'cycle': np.arange(1, len(cycles) + 1),
+            'start': cycles[:, 0],
+            'end': cycles[:, 1],
+        }))
+
+    index = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=CYCLE_INDEX_COLUMNS)
+    os.makedirs(os.path.dirname(index_name), exist_ok=True)
+    tmp_path = f"{index_name}.tmp"
+    index.to_csv(tmp_path, index=False)
+    os.replace(tmp_path, index_name)
+    print(f"✅ 周期索引已保存: {index_path}（{len(index)} 个周期）")
+    return index
+
+
+def iter_cycles(index_path, data_dir=None):
+    """
+    按周期索引逐个取出周期数据；每个源文件只读取一次。
+
+    Args:
+        data_dir (str): 可选，源文件所在目录（源文件移动后使用），默认按索引中的相对路径查找。
+
+    Yields:
+        (str, int, pandas.DataFrame): 源文件名、周期编号、周期数据。
+    """
+    index = pd.read_csv(index_path)
+    index_dir = os.path.dirname(os.path.abspath(index_path))
+    for source_file, rows in index.groupby('source_file', sort=False):
+        if data_dir is None:
+            df = pd.read_csv(os.path.join(index_dir, source_file))
+        else:
+            df = pd.read_csv(os.path.join(data_dir, os.path.basename(source_file)))
+        for cycle, start, end in rows[['cycle', 'start', 'end']].itertuples(index=False):
+            yield source_file, cycle, df.iloc[start:end].reset_index(drop=True)
+
+
+def export_cycles(index_path, output_dir, data_dir=None):
+    """
+    按索引把每个周期写成单独的 CSV（<原名>_NN.cycle.csv），供仍需要逐周期文件的流程使用
+    （训练数据请用 03_merge_motion.concatenate_cycles）。输出目录与输入目录分开，重复运行只会覆盖同名文件。
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    n_written = 0
+    for source_file, cycle, cycle_df in iter_cycles(index_path, data_dir):
+        base_name = os.path.splitext(os.path.basename(source_file))[0]
+        cycle_df.to_csv(os.path.join(output_dir, f"{base_name}_{cycle:02d}{CYCLE_FILE_SUFFIX}"), index=False)
+        n_written += 1
+    print(f"✅ 已导出 {n_written} 个周期到 {output_dir}")
+    return n_written
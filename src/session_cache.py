@@ -0,0 +1,267 @@
+# session_cache.py
+# 对齐后的传感器 + 角度数据的二进制缓存：float32 的 .npy 数组 + 每个片段的偏移索引，
+# 训练 / 测试时以内存映射方式读取，避免每次重新解析大量 CSV。
+# 片段内的滑动窗口索引也保存在缓存目录中。
+import os
+import glob
+import json
+import hashlib
+import numpy as np
+import pandas as pd
+
+SENSOR_COLS = [f's{i}' for i in range(1, 7)]
+ANGLE_COLS = [f'angle{i}' for i in range(1, 10)]
+
+CACHE_DIRNAME = '.session_cache'
+CACHE_VERSION = 2
+MANIFEST_NAME = 'manifest.json'
+
+
+def file_sha1(filepath, chunk_size=1 << 20):
+    """计算文件的 SHA1。"""
+    h = hashlib.sha1()
+    with open(filepath, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def _file_signature(filepath, use_hash=False):
+    stat = os.stat(filepath)
+    signature = {'file': os.path.basename(filepath), 'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+    if use_hash:
+        signature['sha1'] = file_sha1(filepath)
+    return signature
+
+
+def _signature_matches(old, filepath):
+    """大小和修改时间不变即视为未变化；若记录了哈希，则修改时间变化但内容相同也视为未变化。"""
+    stat = os.stat(filepath)
+    if old['size'] != stat.st_size:
+        return False
+    if old['mtime_ns'] == stat.st_mtime_ns:
+        return True
+    return 'sha1' in old and old['sha1'] == file_sha1(filepath)
+
+
+def list_source_files(data_folder):
+    """数据目录下的全部 CSV（按文件名排序，保证缓存顺序确定）。"""
+    return sorted(glob.glob(os.path.join(data_folder, '*.csv')))
+
+
+class SessionCache:
+    """
+    内存映射的会话缓存。
+
+    Attributes:
+        sensor (numpy.ndarray): 所有片段首尾相接的传感器数据，形状 [N, n_sensor]，float32。
+        angle (numpy.ndarray): 对应的角度数据，形状 [N, n_angle]，float32。
+        offsets (numpy.ndarray): 片段起止偏移，形状 [n_clips + 1]，第 i 个片段为 offsets[i]:offsets[i+1]。
+        files (list): 各片段对应的源文件名（按 clip_id 切分的文件为 '<文件名>#<clip_id>'）。
+    """
+
+    def __init__(self, cache_dir, mmap_mode='r'):
+        self.cache_dir = cache_dir
+        with open(os.path.join(cache_dir, MANIFEST_NAME), 'r', encoding='utf-8') as f:
+            self.manifest = json.load(f)
+        self.sensor = np.load(os.path.join(cache_dir, 'sensor.npy'), mmap_mode=mmap_mode)
+        self.angle = np.load(os.path.join(cache_dir, 'angle.npy'), mmap_mode=mmap_mode)
+        self.offsets = np.load(os.path.join(cache_dir, 'offsets.npy'))
+        self.files = self.manifest['clip_files']
+        self.sensor_cols = self.manifest['sensor_cols']
+        self.angle_cols = self.manifest['angle_cols']
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def clip(self, i):
+        """返回第 i 个片段的 (sensor, angle) 视图。"""
+        start, end = self.offsets[i], self.offsets[i + 1]
+        return self.sensor[start:end], self.angle[start:end]
+
+    def window_index(self, window_length, time_steps):
+        """
+        片段内滑动窗口索引，首次计算后保存在缓存目录中（windows_w{窗口}_s{步长}.npz），
+        之后重新划分数据集不需要再扫描数据。
+
+        Returns:
+            (numpy.ndarray, numpy.ndarray): 窗口起点（全局偏移）和所属片段编号。
+        """
+        path = os.path.join(self.cache_dir, f'windows_w{window_length}_s{time_steps}.npz')
+        if os.path.exists(path):
+            with np.load(path) as index:
+                return index['starts'], index['clip_ids']
+        starts, clip_ids = clip_window_index(self.offsets, window_length, time_steps)
+        with open(path + '.tmp', 'wb') as f:
+            np.savez(f, starts=starts, clip_ids=clip_ids)
+        os.replace(path + '.tmp', path)
+        return starts, clip_ids
+
+
+def clip_window_index(offsets, window_length, time_steps):
+    """
+    只生成不跨越片段边界的窗口。
+
+    每个片段内与 create_dataset 规则相同：第 k 个窗口为 clip[k*time_steps : k*time_steps+window_length]，
+    目标为 clip[k*time_steps+window_length]，因此窗口和目标都在同一片段内。
+
+    Args:
+        offsets (numpy.ndarray): 片段起止偏移，形状 [n_clips + 1]。
+
+    Returns:
+        (numpy.ndarray, numpy.ndarray): 窗口起点（全局偏移）和所属片段编号。
+    """
+    offsets = np.asarray(offsets, dtype=np.int64)
+    lengths = np.diff(offsets)
+    n_windows = np.maximum((lengths - window_length) // time_steps, 0)
+    clip_ids = np.repeat(np.arange(len(lengths), dtype=np.int64), n_windows)
+    # 每个窗口在片段内的序号：0, 1, ..., n_windows[clip]-1
+    first_window = np.cumsum(n_windows) - n_windows
+    k = np.arange(len(clip_ids), dtype=np.int64) - np.repeat(first_window, n_windows)
+    starts = offsets[:-1][clip_ids] + k * time_steps
+    return starts, clip_ids
+
+
+def split_clips(n_clips, fractions=(0.8, 0.2), seed=42):
+    """
+    按片段随机划分数据集（如训练 / 验证 / 测试），同一片段的窗口不会出现在不同子集中。
+    比例大于 0 的子集至少分到一个片段（片段很少时按比例取整可能为 0），片段数不够时直接报错。
+
+    Returns:
+        list: 每个子集的片段编号数组。
+    """
+    fractions = np.asarray(fractions, dtype=float)
+    n_required = int(np.count_nonzero(fractions))
+    if n_clips < n_required:
+        raise ValueError(f"❌ 片段数 {n_clips} 少于需要划分的子集数 {n_required}，无法按片段划分数据集")
+    sizes = np.diff(np.round(np.cumsum(fractions) / fractions.sum() * n_clips).astype(int), prepend=0)
+    for i in np.flatnonzero((fractions > 0) & (sizes == 0)):
+        sizes[np.argmax(sizes)] -= 1
+        sizes[i] = 1
+    order = np.random.default_rng(seed).permutation(n_clips)
+    return [np.sort(part) for part in np.split(order, np.cumsum(sizes)[:-1])]
+
+
+def select_windows(starts, clip_ids, clips):
+    """取出属于指定片段的窗口起点。"""
+    return starts[np.isin(clip_ids, clips)]
+
+
+def build_cache(csv_files, cache_dir, sensor_cols=SENSOR_COLS, angle_cols=ANGLE_COLS, use_hash=False):
+    """
+    将若干 CSV 片段写成缓存目录：sensor.npy、angle.npy、offsets.npy 和 manifest.json。
+
+    缺少所需列的文件会被跳过并记录在 manifest 中。含 clip_id 列的文件（如 03_merge_motion 拼接的结果）
+    按 clip_id 变化切分为多个片段，滑动窗口不会跨越片段。
+
+    Returns:
+        SessionCache: 新建的缓存。
+    """
+    os.makedirs(cache_dir, exist_ok=True)
+    manifest_path = os.path.join(cache_dir, MANIFEST_NAME)
+    # manifest 最后写入，作为缓存完整的标志
+    if os.path.exists(manifest_path):
+        os.remove(manifest_path)
+
+    # 旧的窗口索引随数据一起失效
+    for stale_index in glob.glob(os.path.join(cache_dir, 'windows_*.npz')):
+        os.remove(stale_index)
+
+    sensors, angles, sources, skipped, clip_files = [], [], [], [], []
+    offsets = [0]
+    for file in csv_files:
+        columns = pd.read_csv(file, nrows=0).columns
+        missing_cols = [col for col in sensor_cols + angle_cols if col not in columns]
+        if missing_cols:
+            print(f"Warning: {file} is missing columns: {missing_cols}")
+            skipped.append({**_file_signature(file, use_hash), 'missing': missing_cols})
+            continue
+        has_clip_id = 'clip_id' in columns
+        df = pd.read_csv(file, usecols=sensor_cols + angle_cols + (['clip_id'] if has_clip_id else []),
+                         dtype={col: 'float32' for col in sensor_cols + angle_cols})
+        sensors.append(df[sensor_cols].to_numpy())
+        angles.append(df[angle_cols].to_numpy())
+        name = os.path.basename(file)
+        if has_clip_id and len(df):
+            clip_id = df['clip_id'].to_numpy()
+            starts = np.flatnonzero(np.r_[True, clip_id[1:] != clip_id[:-1]])
+            offsets.extend(offsets[-1] + np.r_[starts[1:], len(df)])
+            clip_files.extend(f"{name}#{clip}" for clip in clip_id[starts])
+        else:
+            offsets.append(offsets[-1] + len(df))
+            clip_files.append(name)
+        sources.append(_file_signature(file, use_hash))
+
+    n_rows = offsets[-1]
+    arrays = {
+        'sensor': np.concatenate(sensors) if sensors else np.empty((0, len(sensor_cols)), dtype=np.float32),
+        'angle': np.concatenate(angles) if angles else np.empty((0, len(angle_cols)), dtype=np.float32),
+        'offsets': np.asarray(offsets, dtype=np.int64),
+    }
+    for name, array in arrays.items():
+        tmp_path = os.path.join(cache_dir, f'{name}.npy.tmp')
+        with open(tmp_path, 'wb') as f:
+            np.save(f, array)
+        os.replace(tmp_path, os.path.join(cache_dir, f'{name}.npy'))
+
+    manifest = {
+        'version': CACHE_VERSION,
+        'sensor_cols': list(sensor_cols),
+        'angle_cols': list(angle_cols),
+        'n_rows': int(n_rows),
+        'sources': sources,
+        'skipped': skipped,
+        'clip_files': clip_files,
+    }
+    with open(manifest_path + '.tmp', 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=1)
+    os.replace(manifest_path + '.tmp', manifest_path)
+
+    print(f"✅ 缓存已写入 {cache_dir}：{len(sources)} 个文件，{len(clip_files)} 个片段，{n_rows} 帧")
+    return SessionCache(cache_dir)
+
+
+def is_cache_valid(cache_dir, csv_files, sensor_cols=SENSOR_COLS, angle_cols=ANGLE_COLS):
+    """
+    检查缓存是否与源文件一致：文件集合、列配置以及每个文件的大小 / 修改时间（或哈希）都需匹配。
+    """
+    manifest_path = os.path.join(cache_dir, MANIFEST_NAME)
+    if not os.path.exists(manifest_path):
+        return False
+    with open(manifest_path, 'r', encoding='utf-8') as f:
+        manifest = json.load(f)
+
+    if (manifest.get('version') != CACHE_VERSION
+            or manifest['sensor_cols'] != list(sensor_cols)
+            or manifest['angle_cols'] != list(angle_cols)):
+        return False
+
+    recorded = {s['file']: s for s in manifest['sources'] + manifest['skipped']}
+    if set(recorded) != {os.path.basename(f) for f in csv_files}:
+        return False
+    return all(_signature_matches(recorded[os.path.basename(f)], f) for f in csv_files)
+
+
+def load_or_build_cache(data_folder, cache_dir=None, sensor_cols=SENSOR_COLS, angle_cols=ANGLE_COLS,
+                        use_hash=False):
+    """
+    读取数据目录的缓存；缓存不存在或已过期时重新生成。
+
+    Args:
+        data_folder (str): 存放 CSV 片段的目录。
+        cache_dir (str): 缓存目录，默认 <data_folder>/.session_cache。
+        use_hash (bool): 是否记录文件 SHA1（修改时间变化但内容未变时不重建）。
+
+    Returns:
+        SessionCache: 内存映射的缓存。
+    """
+    if cache_dir is None:
+        cache_dir = os.path.join(data_folder, CACHE_DIRNAME)
+    csv_files = list_source_files(data_folder)
+
+    if is_cache_valid(cache_dir, csv_files, sensor_cols, angle_cols):
+        print(f"✅ 使用缓存 {cache_dir}")
+        return SessionCache(cache_dir)
+
+    print(f"🔄 缓存不存在或已过期，重新生成: {cache_dir}")
+    return build_cache(csv_files, cache_dir, sensor_cols, angle_cols, use_hash)
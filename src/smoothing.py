@@ -0,0 +1,163 @@
+# smoothing.py
+# 预测角度的后处理平滑：所有角度通道一起向量化计算。
+#   'ema'       —— 指数平滑，一阶 IIR，延迟固定；
+#   'one_euro'  —— One Euro 滤波：运动慢时强平滑（去抖），运动快时截止频率升高（低延迟）；
+#   'savgol'    —— Savitzky–Golay，居中窗口，只用于离线整段记录（在线使用需要等待半个窗口）。
+# 每个滤波器提供流式 update(chunk)（每个角度 O(1) 状态）和整段记录的 apply(x)，
+# 以及 latency_samples：引入的延迟（样本数），用于在抖动和延迟之间取舍。
+import numpy as np
+from scipy.signal import lfilter, lfilter_zi, savgol_filter
+
+SMOOTHING_FILTERS = ('none', 'ema', 'one_euro', 'savgol')
+
+
+class ExponentialFilter:
+    """
+    y[t] = alpha * x[t] + (1 - alpha) * y[t-1]，第一帧直接输出。
+
+    Args:
+        alpha (float): 平滑系数 (0, 1]，越小越平滑、延迟越大。
+    """
+
+    def __init__(self, alpha=0.3):
+        if not 0 < alpha <= 1:
+            raise ValueError(f"❌ alpha 应在 (0, 1] 内: {alpha}")
+        self.alpha = alpha
+        self._b, self._a = np.array([alpha]), np.array([1.0, alpha - 1.0])
+        self.reset()
+
+    @property
+    def latency_samples(self):
+        """低频信号的群延迟（样本数）：(1 - alpha) / alpha。"""
+        return (1 - self.alpha) / self.alpha
+
+    def reset(self):
+        self._zi = None
+
+    def update(self, x):
+        """流式：输入 [n, n_angles]，滤波器状态在调用之间保留。"""
+        x = np.asarray(x, dtype=float)
+        if len(x) == 0:
+            return x
+        if self._zi is None:
+            self._zi = lfilter_zi(self._b, self._a)[:, None] * x[:1]
+        y, self._zi = lfilter(self._b, self._a, x, axis=0, zi=self._zi)
+        return y
+
+    def apply(self, x):
+        """整段记录（与从头 update 的结果相同）。"""
+        self.reset()
+        y = self.update(x)
+        self.reset()
+        return y
+
+
+class OneEuroFilter:
+    """
+    One Euro 滤波（Casiez et al., 2012），状态为每个角度的上一输出值和导数估计。
+
+    Args:
+        rate (float): 输出频率（Hz）。
+        min_cutoff (float): 静止时的截止频率（Hz），越小越平滑。
+        beta (float): 截止频率随角速度（度/秒）升高的系数，越大快速运动时延迟越小。
+        d_cutoff (float): 角速度估计的截止频率（Hz）。
+    """
+
+    def __init__(self, rate=125.0, min_cutoff=1.0, beta=0.01, d_cutoff=1.0):
+        self.rate = rate
+        self.min_cutoff = min_cutoff
+        self.beta = beta
+        self.d_cutoff = d_cutoff
+        self.reset()
+
+    def _alpha(self, cutoff):
+        return 1.0 / (1.0 + self.rate / (2 * np.pi * cutoff))
+
+    @property
+    def latency_samples(self):
+        """静止 / 慢速运动时的延迟上限（样本数），快速运动时更小。"""
+        alpha = self._alpha(self.min_cutoff)
+        return (1 - alpha) / alpha
+
+    def reset(self):
+        self._x = None
+        self._dx = None
+
+    def update(self, x):
+        """流式：输入 [n, n_angles]，逐样本推进（每个样本对所有角度向量化计算）。"""
+        x = np.asarray(x, dtype=float)
+        y = np.empty_like(x)
+        alpha_d = self._alpha(self.d_cutoff)
+        for i, sample in enumerate(x):
+            if self._x is None:
+                self._x, self._dx = sample.copy(), np.zeros_like(sample)
+                y[i] = sample
+                continue
+            self._dx += alpha_d * ((sample - self._x) * self.rate - self._dx)
+            alpha = self._alpha(self.min_cutoff + self.beta * np.abs(self._dx))
+            self._x += alpha * (sample - self._x)
+            y[i] = self._x
+        return y
+
+    def apply(self, x):
+        """整段记录（与从头 update 的结果相同）。"""
+        self.reset()
+        y = self.update(x)
+        self.reset()
+        return y
+
+
+class SavitzkyGolayFilter:
+    """
+    离线 Savitzky–Golay 平滑（居中窗口，零相位）。
+
+    Args:
+        window (int): 窗口长度（奇数）。
+        polyorder (int): 拟合多项式阶数。
+    """
+
+    def __init__(self, window=25, polyorder=3):
+        if window % 2 == 0 or polyorder >= window:
+            raise ValueError(f"❌ Savitzky–Golay 窗口应为奇数且大于多项式阶数: window={window}, polyorder={polyorder}")
+        self.window = window
+        self.polyorder = polyorder
+
+    @property
+    def latency_samples(self):
+        """离线无相位延迟；若用于在线输出，需要等待半个窗口。"""
+        return (self.window - 1) / 2
+
+    def reset(self):
+        pass
+
+    def update(self, x):
+        raise ValueError("❌ Savitzky–Golay 只用于离线整段记录（apply），在线请使用 'ema' 或 'one_euro'")
+
+    def apply(self, x):
+        x = np.asarray(x, dtype=float)
+        if len(x) < self.window:
+            return x.copy()
+        return savgol_filter(x, self.window, self.polyorder, axis=0)
+
+
+def make_filter(kind, rate=125.0, **params):
+    """
+    按名称创建平滑滤波器。
+
+    Args:
+        kind (str): 'none' / 'ema' / 'one_euro' / 'savgol'。
+        rate (float): 预测输出频率（Hz），one_euro 使用。
+        **params: 对应滤波器的参数（alpha；min_cutoff / beta / d_cutoff；window / polyorder）。
+
+    Returns:
+        滤波器对象；'none' 返回 None。
+    """
+    if kind not in SMOOTHING_FILTERS:
+        raise ValueError(f"❌ 未知的平滑方式: {kind}，可选 {SMOOTHING_FILTERS}")
+    if kind == 'none':
+        return None
+    if kind == 'ema':
+        return ExponentialFilter(**params)
+    if kind == 'one_euro':
+        return OneEuroFilter(rate, **params)
+    return SavitzkyGolayFilter(**params)
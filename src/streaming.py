@@ -0,0 +1,156 @@
+# streaming.py
+# 流式推理：逐样本（或小块）推进 LSTM 状态，每个样本 O(1) 计算即可输出一次角度。
+import numpy as np
+import torch
+
+
+def append_history(history, x, window_length):
+    """
+    把新样本接到缓存的历史后面。
+
+    Returns:
+        (numpy.ndarray, int, numpy.ndarray): 拼接后的历史、其中原有的样本数、需要继续缓存的最近 window_length 个样本。
+    """
+    full = x if history is None else np.concatenate([history, x])
+    return full, len(full) - len(x), full[-window_length:]
+
+
+def refresh_due(counts, state_refresh, window_length):
+    """
+    'stateful' 模式下哪些样本之后需要用最近 window_length 个样本从零状态重建 LSTM 状态。
+
+    Args:
+        counts (numpy.ndarray): 各样本在数据流中的序号（从 1 开始）。
+        state_refresh (int): 重建间隔（样本数），None / 0 表示不重建。
+
+    Returns:
+        numpy.ndarray: 与 counts 等长的布尔数组。
+    """
+    if not state_refresh:
+        return np.zeros(len(counts), dtype=bool)
+    return (counts % state_refresh == 0) & (counts >= window_length)
+
+
+class StreamingPredictor:
+    """
+    单路数据流的实时角度预测器。
+
+    两种模式：
+        'stateful'：保留 LSTM 的 (h, c)，每来一个样本只推进一步，可按采样率（125 Hz）逐样本输出。
+            状态从数据流开始持续累积，输出与“截取窗口重新计算”的结果并不完全相同；模型只在零初始状态的
+            window_length 窗口上训练过，设置 state_refresh 后每隔 state_refresh 个样本用最近一个窗口
+            从零状态重建 (h, c)，使状态包含的历史不超过 window_length + state_refresh 个样本。
+        'windowed'：与原实时脚本一致，缓存最近 window_length 个样本，每 step_size 个样本
+            对整个窗口从零状态计算一次，结果与离线窗口预测完全一致，用于校验。
+
+    Args:
+        model (MultiHeadLSTM): 已加载权重的模型。
+        scaler_sensor, scaler_angle: 训练时保存的 StandardScaler；模型已用 fold_scalers 合并了标准化时传 None，
+            原始传感器值直接输入模型，输出即为角度（不需要 sklearn）。
+        window_length (int): 窗口长度（'windowed' 模式）。
+        mode (str): 'stateful' 或 'windowed'。
+        step_size (int): 每隔多少个样本输出一次预测。
+        device (torch.device): 推理设备，默认取模型所在设备。
+        smoother: 可选，smoothing.make_filter 创建的流式平滑滤波器，作用于输出角度。
+        state_refresh (int): 'stateful' 模式下重建 LSTM 状态的间隔（样本数）；None 表示状态不重置
+            （与 'windowed' 输出的偏差可用 bench_streaming.py 评估）。
+    """
+
+    def __init__(self, model, scaler_sensor, scaler_angle, window_length=80, mode='stateful', step_size=1,
+                 device=None, smoother=None, state_refresh=None):
+        if mode not in ('stateful', 'windowed'):
+            raise ValueError(f"❌ 未知的流式推理模式: {mode}")
+        self.model = model.eval()
+        self.scaler_sensor = scaler_sensor
+        self.scaler_angle = scaler_angle
+        self.window_length = window_length
+        self.mode = mode
+        self.step_size = step_size
+        self.device = device if device is not None else next(model.parameters()).device
+        self.smoother = smoother
+        self.state_refresh = state_refresh
+        self.reset()
+
+    def reset(self):
+        """清空状态（新的数据流开始时调用）。"""
+        self.n_samples = 0
+        self.state = None
+        self._history = None
+        if self.smoother is not None:
+            self.smoother.reset()
+
+    def push(self, sample):
+        """
+        输入一个样本，若该样本需要输出预测则返回角度（度），否则返回 None。
+        """
+        _, angles = self.push_chunk(np.asarray(sample, dtype=float).reshape(1, -1))
+        return angles[0] if len(angles) else None
+
+    def push_chunk(self, samples):
+        """
+        输入一小块连续样本 [n, C]。
+
+        Returns:
+            (numpy.ndarray, numpy.ndarray): 产生预测的样本在本块中的下标，以及对应角度 [k, output_size]。
+        """
+        if self.scaler_sensor is None:
+            x = np.asarray(samples, dtype=np.float32)
+        else:
+            x = self.scaler_sensor.transform(np.asarray(samples, dtype=float))
+
+        counts = self.n_samples + np.arange(1, len(x) + 1)
+        self.n_samples += len(x)
+        due = counts % self.step_size == 0
+
+        if self.mode == 'stateful':
+            preds_norm = self._step(x, counts)[due]
+        else:
+            due &= counts >= self.window_length
+            preds_norm = self._windows(x, np.flatnonzero(due))
+
+        indices = np.flatnonzero(due)
+        if len(indices) == 0:
+            return indices, np.empty((0, 0))
+        angles = preds_norm if self.scaler_angle is None else self.scaler_angle.inverse_transform(preds_norm)
+        if self.smoother is not None:
+            angles = self.smoother.update(angles)
+        return indices, angles
+
+    def _step(self, x, counts):
+        """
+        推进 LSTM 状态，返回每个样本对应的（标准化）预测。
+        设置了 state_refresh 时，在对应样本之后用最近 window_length 个样本从零状态重建状态。
+        """
+        if not self.state_refresh:
+            return self._advance(x)
+        history, n_prev, self._history = append_history(self._history, x, self.window_length)
+
+        refresh = np.flatnonzero(refresh_due(counts, self.state_refresh, self.window_length)) + 1
+        preds, start = [], 0
+        for end in refresh:
+            preds.append(self._advance(x[start:end]))
+            self.state = None
+            self._advance(history[n_prev + end - self.window_length:n_prev + end])
+            start = end
+        if start < len(x):
+            preds.append(self._advance(x[start:]))
+        return np.concatenate(preds)
+
+    def _advance(self, x):
+        """从当前状态出发处理一段连续样本，返回每个样本的（标准化）预测。"""
+        input_tensor = torch.as_tensor(x, dtype=torch.float32, device=self.device).unsqueeze(0)
+        with torch.no_grad():
+            preds, self.state = self.model.forward_step(input_tensor, self.state)
+        return preds[0].cpu().numpy()
+
+    def _windows(self, x, due_indices):
+        """对需要输出的位置取出各自的完整窗口，合成一个 batch 计算。"""
+        history, n_prev, self._history = append_history(self._history, x, self.window_length)
+        if len(due_indices) == 0:
+            return np.empty((0, 0))
+
+        ends = n_prev + due_indices + 1  # 窗口在 history 中的结束位置（不含）
+        windows = history[ends[:, None] - self.window_length + np.arange(self.window_length)]
+        input_tensor = torch.as_tensor(windows, dtype=torch.float32, device=self.device)
+        with torch.no_grad():
+            return self.model(input_tensor).cpu().numpy()
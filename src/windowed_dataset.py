@@ -0,0 +1,114 @@
+# windowed_dataset.py
+# 惰性滑动窗口数据集：只保存窗口起点，取 batch 时才按下标从原始信号中切出窗口，内存占用与信号长度同阶。
+import numpy as np
+import torch
+from torch.utils.data import Dataset, DataLoader, BatchSampler, RandomSampler, SequentialSampler
+
+
+def window_starts(n_samples, window_length, time_steps):
+    """
+    与原 create_dataset 相同的窗口起点：第 i 个窗口为 X[i*time_steps : i*time_steps+window_length]，
+    目标为 y[i*time_steps+window_length]。
+    """
+    n_windows = max(int((n_samples - window_length) / time_steps), 0)
+    return np.arange(n_windows, dtype=np.int64) * time_steps
+
+
+class SlidingWindowDataset(Dataset):
+    """
+    滑动窗口数据集。
+
+    Args:
+        X (numpy.ndarray): 传感器信号，形状 [N, C]（可以是内存映射数组）。
+        y (numpy.ndarray): 角度信号，形状 [N, n_angle]。
+        window_length (int): 窗口长度。
+        time_steps (int): 窗口步长（starts 为 None 时使用）。
+        starts (numpy.ndarray): 可选，显式指定的窗口起点。
+        x_mean, x_scale, y_mean, y_scale: 可选，标准化参数（如 StandardScaler 的 mean_ / scale_），
+            取数时按 (v - mean) / scale 标准化。
+        clean (bool): 取数时将 NaN / Inf 置 0（与原训练脚本的清洗一致）。
+
+    索引既可以是单个整数，也可以是整数数组（一次取出整个 batch）。
+    """
+
+    def __init__(self, X, y, window_length, time_steps=1, starts=None,
+                 x_mean=None, x_scale=None, y_mean=None, y_scale=None, clean=True):
+        self.X = X
+        self.y = y
+        self.window_length = window_length
+        self.starts = window_starts(len(X), window_length, time_steps) if starts is None else np.asarray(starts)
+        self.window_offsets = np.arange(window_length)
+        self.clean = clean
+        self.x_mean = None if x_mean is None else np.asarray(x_mean, dtype=np.float32)
+        self.x_scale = None if x_scale is None else np.asarray(x_scale, dtype=np.float32)
+        self.y_mean = None if y_mean is None else np.asarray(y_mean, dtype=np.float32)
+        self.y_scale = None if y_scale is None else np.asarray(y_scale, dtype=np.float32)
+
+    def __len__(self):
+        return len(self.starts)
+
+    def __getitem__(self, index):
+        starts = self.starts[index]
+        # 下标运算一次性取出 [..., window_length, C] 的连续副本
+        x = np.asarray(self.X[starts[..., None] + self.window_offsets], dtype=np.float32)
+        y = np.array(self.y[starts + self.window_length], dtype=np.float32)
+        if self.clean:
+            np.nan_to_num(x, copy=False, nan=0.0, posinf=0.0, neginf=0.0)
+            np.nan_to_num(y, copy=False, nan=0.0, posinf=0.0, neginf=0.0)
+        if self.x_mean is not None:
+            x = (x - self.x_mean) / self.x_scale
+        if self.y_mean is not None:
+            y = (y - self.y_mean) / self.y_scale
+        return torch.from_numpy(x), torch.from_numpy(y)
+
+    def __getstate__(self):
+        # 取数进程以 spawn 方式启动时（Windows / macOS）数据集会被 pickle：
+        # 内存映射的 .npy 只传文件路径，在子进程中重新映射，不复制整段信号
+        state = self.__dict__.copy()
+        for name in ('X', 'y'):
+            state[name] = _npy_reference(state[name])
+        return state
+
+    def __setstate__(self, state):
+        for name in ('X', 'y'):
+            if isinstance(state[name], _NpyReference):
+                state[name] = np.load(state[name].path, mmap_mode='r')
+        self.__dict__.update(state)
+
+
+class _NpyReference:
+    """可 pickle 的 .npy 内存映射引用（只保存路径）。"""
+
+    def __init__(self, path):
+        self.path = path
+
+
+def _npy_reference(array):
+    """整个 .npy 文件的只读内存映射返回其路径引用，其他数组原样返回。"""
+    if not isinstance(array, np.memmap) or array.filename is None or array.mode != 'r':
+        return array
+    reopened = np.load(array.filename, mmap_mode='r')
+    if reopened.shape != array.shape or reopened.dtype != array.dtype or reopened.offset != array.offset:
+        return array
+    return _NpyReference(array.filename)
+
+
+def make_loader(dataset, batch_size=256, shuffle=False, num_workers=0, pin_memory=False, prefetch_factor=2,
+                persistent_workers=None):
+    """
+    按 batch 取数的 DataLoader：每个 batch 只调用一次 dataset[indices]，避免逐样本拷贝和 collate。
+
+    Args:
+        num_workers (int): 取数进程数，0 表示在主进程中取数。
+        pin_memory (bool): 将 batch 放入锁页内存，配合 .to(device, non_blocking=True) 异步拷贝到 GPU。
+        prefetch_factor (int): 每个取数进程预取的 batch 数（num_workers > 0 时有效）。
+        persistent_workers (bool): epoch 之间保留取数进程，默认在 num_workers > 0 时开启。
+    """
+    sampler = RandomSampler(dataset) if shuffle else SequentialSampler(dataset)
+    batch_sampler = BatchSampler(sampler, batch_size=batch_size, drop_last=False)
+    worker_kwargs = {}
+    if num_workers > 0:
+        worker_kwargs = dict(prefetch_factor=prefetch_factor,
+                             persistent_workers=True if persistent_workers is None else persistent_workers)
+    return DataLoader(dataset, sampler=batch_sampler, batch_size=None, num_workers=num_workers,
+                      pin_memory=pin_memory, **worker_kwargs)